@@ -125,7 +125,7 @@ bool sendImageToServer(camera_fb_t *fb, float temperature, float humidity) {
         String response = http.getString();
         Serial.println("HTTP Response Code: " + String(httpResponseCode));
         Serial.println("Server-Antwort: " + response);
-        if (httpResponseCode == 200) { // Oder den erwarteten Erfolgscode prüfen
+        if (httpResponseCode == 200 || httpResponseCode == 202) { // 202: Bild angenommen, OCR läuft im Hintergrund
            success = true;
         }
     } else {
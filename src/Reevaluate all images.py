@@ -1,11 +1,18 @@
 import os
-from image_evaluator import evaluate_image
-import pandas as pd
+import argparse
+from image_evaluator import update_gas_csv, mark_rejected
+from ocr_jobs import recognize_many, OCR_WORKERS
+import readings_store
 from datetime import datetime
 
-def batch_evaluate_images():
+def batch_evaluate_images(workers=OCR_WORKERS):
     """
     Wertet alle Bilder im camera_images-Ordner aus und aktualisiert die CSV-Datei.
+    Die OCR läuft parallel in mehreren Worker-Prozessen, die CSV wird in
+    zeitlicher Reihenfolge geschrieben, damit der Verbrauch korrekt berechnet wird.
+    
+    Args:
+        workers: Anzahl der OCR-Worker-Prozesse
     """
     # Pfade definieren
     base_dir = os.path.dirname(os.path.dirname(__file__))
@@ -18,20 +25,23 @@ def batch_evaluate_images():
     
     print(f"Gefundene Bilder: {len(image_files)}")
     
-    # CSV-Datei laden oder erstellen
-    try:
-        df = pd.read_csv(csv_path)
-    except FileNotFoundError:
-        print("CSV-Datei nicht gefunden. Erstelle neue Datei.")
-        df = pd.DataFrame(columns=['Timestamp', 'Number', 'Verbrauch', 'Kosten_pro_Stunde'])
+    # Zählerstands-Datenbank öffnen (übernimmt beim ersten Mal die CSV-Datei)
+    readings_store.open_store(csv_path)
     
-    # Jedes Bild auswerten
-    for image_file in image_files:
-        image_path = os.path.join(camera_images_dir, image_file)
+    # Alle Bilder parallel auswerten, Ergebnisse kommen in der Reihenfolge der Bilder zurück
+    image_paths = [os.path.join(camera_images_dir, image_file) for image_file in image_files]
+    for image_path, number, reject_reason in recognize_many(image_paths, workers=workers,
+                                                              csv_path=csv_path):
+        image_file = os.path.basename(image_path)
         print(f"\nVerarbeite Bild: {image_file}")
         
-        # Bild auswerten
-        result = evaluate_image(image_path, csv_path)
+        if reject_reason:
+            print(f"Bild verworfen: {reject_reason}")
+            mark_rejected(image_path, csv_path, reject_reason)
+            continue
+        
+        # Erkannten Wert in die CSV eintragen
+        result = update_gas_csv(image_path, csv_path, number) if number else None
         
         if result:
             print(f"Erkannter Wert: {result}")
@@ -41,4 +51,9 @@ def batch_evaluate_images():
     print("\nBatch-Verarbeitung abgeschlossen.")
 
 if __name__ == "__main__":
-    batch_evaluate_images() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Alle Kamerabilder neu auswerten')
+    parser.add_argument('--workers', type=int, default=OCR_WORKERS,
+                        help=f'Anzahl der OCR-Worker-Prozesse (Standard: {OCR_WORKERS})')
+    args = parser.parse_args()
+    
+    batch_evaluate_images(workers=args.workers) 
\ No newline at end of file
@@ -0,0 +1,282 @@
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import pulse_log
+import readings_store
+import rollups
+
+# Optionales Langzeitarchiv im Parquet-Format (pip install pyarrow): Impulse, Gas-Zählerstände
+# und Verbrauchssummen mit festen Spaltentypen statt Texten wie "0.41 €" oder "12345,67", nach
+# Monaten aufgeteilt (<ARCHIVE_DIR>/<datensatz>/month=YYYY-MM/data.parquet). Leser laden nur die
+# Monate und Spalten, die sie brauchen; innerhalb eines Monats filtern die Statistiken der
+# Row Groups nach dem Zeitstempel. sync() ersetzt den laufenden Monat und schreibt einen
+# abgeschlossenen Monat noch einmal, sobald SEAL_DELAY_SECONDS nach seinem Ende vergangen sind
+# (verspätete Uploads, Ausfall über das Monatsende); danach gilt er als versiegelt und wird nicht
+# mehr verändert. Versiegelt ist ein Monat, dessen Datei erst nach dieser Frist geschrieben wurde.
+# Wochensummen liegen im Monat, in dem die Woche endet, da sie sich bis dahin noch ändern.
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(BASE_DIR, 'data', 'archive'))
+SEAL_DELAY_SECONDS = 86400  # So lange nach Monatsende wird ein Monat noch einmal geschrieben
+# --- Ende Konfiguration ---
+
+DATASETS = ['pulses', 'gas_readings', 'rollups']
+
+def is_available():
+    """True, wenn pyarrow installiert ist."""
+    return pa is not None
+
+def _schemas():
+    return {
+        # Impulse als Zeitpunkt in UTC, wie im Impulsprotokoll
+        'pulses': pa.schema([('timestamp', pa.timestamp('s', tz='UTC'))]),
+        # Zeitstempel der Zählerstände sind Ortszeit wie in der Datenbank
+        'gas_readings': pa.schema([
+            ('timestamp', pa.timestamp('s')),
+            ('temperature', pa.float32()),
+            ('humidity', pa.float32()),
+            ('image_file', pa.string()),
+            ('value', pa.float64()),             # Zählerstand in m³
+            ('consumption_w', pa.float64()),     # Spalte Verbrauch
+            ('cost_per_hour', pa.float64()),     # Spalte Kosten_pro_Stunde (Cent)
+            ('rejected', pa.string()),           # Spalte Verworfen
+        ]),
+        'rollups': pa.schema([
+            ('meter', pa.string()),
+            ('grain', pa.string()),
+            ('period', pa.string()),
+            ('period_start', pa.timestamp('s')),
+            ('kwh', pa.float64()),
+            ('cost', pa.float64()),              # Euro
+            ('pulses', pa.int64()),
+            ('reading_min', pa.float64()),
+            ('reading_max', pa.float64()),
+        ]),
+    }
+
+def _partition_file(dataset, month):
+    return os.path.join(ARCHIVE_DIR, dataset, f"month={month}", 'data.parquet')
+
+def _month_bounds(month):
+    """Beginn des Monats 'YYYY-MM' und des folgenden Monats (Ortszeit)."""
+    moment = datetime.strptime(month, '%Y-%m')
+    return moment, moment.replace(year=moment.year + moment.month // 12, month=moment.month % 12 + 1)
+
+def _months_between(first, last):
+    """Alle Monate 'YYYY-MM' von first bis last (datetime), beide eingeschlossen."""
+    months = []
+    moment = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while moment <= last:
+        months.append(moment.strftime('%Y-%m'))
+        moment = _month_bounds(months[-1])[1]
+    return months
+
+def _is_sealed(dataset, month):
+    """True, wenn die Datei des Monats erst SEAL_DELAY_SECONDS nach dessen Ende geschrieben wurde."""
+    path = _partition_file(dataset, month)
+    if not os.path.exists(path):
+        return False
+    return os.path.getmtime(path) >= _month_bounds(month)[1].timestamp() + SEAL_DELAY_SECONDS
+
+def _pending_months(dataset, months, current_month, force):
+    """Monate, die geschrieben werden müssen: laufender Monat, fehlende und noch nicht versiegelte."""
+    return [month for month in months
+            if force or month >= current_month or not _is_sealed(dataset, month)]
+
+def _write_month(dataset, month, table):
+    """Schreibt einen Monat über eine temporäre Datei."""
+    path = _partition_file(dataset, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+def _number(series):
+    """Texte wie "21.5", "N/A" oder leer als Zahl (NaN, wenn keine)."""
+    return pd.to_numeric(series.astype(str).str.replace(',', '.'), errors='coerce')
+
+def _pulse_months(electricity_csv, pending):
+    """
+    Impulse der Monate (Ortszeit), die pending(monate) auswählt: {'YYYY-MM': tabelle}. Die
+    Monatsgrenzen findet eine binäre Suche, andere Monate werden nicht gelesen.
+    """
+    timestamps = pulse_log.read_all(electricity_csv)
+    months = {}
+    if len(timestamps) == 0:
+        return months
+    schema = _schemas()['pulses']
+    for month in pending(_months_between(datetime.fromtimestamp(int(timestamps[0])),
+                                         datetime.fromtimestamp(int(timestamps[-1])))):
+        start, following = _month_bounds(month)
+        lo, hi = np.searchsorted(timestamps, [int(start.timestamp()), int(following.timestamp())])
+        if hi > lo:
+            months[month] = pa.table(
+                [pa.array(np.asarray(timestamps[lo:hi]), type=pa.int64()).cast(schema.field('timestamp').type)],
+                schema=schema)
+    return months
+
+def _gas_months(gas_csv, pending):
+    """Gas-Zählerstände der ausgewählten Monate mit festen Spaltentypen, pro Monat aus der Datenbank gelesen."""
+    first, last = readings_store.time_span(gas_csv)
+    months = {}
+    if first is None:
+        return months
+    schema = _schemas()['gas_readings']
+    for month in pending(_months_between(datetime.strptime(first, '%Y-%m-%d %H:%M:%S'),
+                                         datetime.strptime(last, '%Y-%m-%d %H:%M:%S'))):
+        start, following = _month_bounds(month)
+        df = readings_store.load_frame(gas_csv, start.strftime('%Y-%m-%d %H:%M:%S'),
+                                       following.strftime('%Y-%m-%d %H:%M:%S'))
+        frame = pd.DataFrame({
+            'timestamp': pd.to_datetime(df['Timestamp'], errors='coerce'),
+            'temperature': _number(df['Temperature']).astype('float32'),
+            'humidity': _number(df['Humidity']).astype('float32'),
+            'image_file': df['ImageFile'],
+            'value': _number(df['Number']),
+            'consumption_w': df['Verbrauch'],
+            'cost_per_hour': df['Kosten_pro_Stunde'],
+            'rejected': df['Verworfen'],
+        }).dropna(subset=['timestamp'])
+        if len(frame):
+            months[month] = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+    return months
+
+def _period_start(grain, period):
+    if grain == 'week':
+        return datetime.strptime(period + '-1', '%G-W%V-%u')
+    return datetime.strptime(period, {'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d', 'month': '%Y-%m'}[grain])
+
+def _archive_month(grain, period_start):
+    """Monat der Partition: der Monat, in dem der Zeitraum endet (bei Wochen nicht der des Montags)."""
+    if grain == 'week':
+        period_start += timedelta(days=6)
+    return period_start.strftime('%Y-%m')
+
+def _rollup_months(pending):
+    """Verbrauchssummen beider Zähler der ausgewählten Monate, nach dem Monat des Periodenendes."""
+    rows = []
+    for meter in ('electricity', 'gas'):
+        for grain in rollups.GRAINS:
+            for row in rollups.query(meter, grain):
+                period_start = _period_start(grain, row['period'])
+                rows.append(dict(row, meter=meter, grain=grain, period_start=period_start,
+                                 month=_archive_month(grain, period_start)))
+    if not rows:
+        return {}
+    frame = pd.DataFrame(rows)
+    frame = frame[frame['month'].isin(pending(sorted(set(frame['month']))))]
+    schema = _schemas()['rollups']
+    return {month: pa.Table.from_pandas(group[schema.names].sort_values(['period_start', 'meter', 'grain']),
+                                        schema=schema, preserve_index=False)
+            for month, group in frame.groupby('month')}
+
+def sync(electricity_csv, gas_csv, force=False):
+    """
+    Schreibt den laufenden Monat sowie fehlende und noch nicht versiegelte abgeschlossene Monate
+    aller Datensätze. Nur diese Monate werden aus den Quelldaten aufgebaut.
+
+    Args:
+        force: Auch versiegelte Monate neu schreiben (z.B. nach einer Korrektur)
+
+    Returns:
+        {datensatz: anzahl geschriebener monate}
+    """
+    if not is_available():
+        raise RuntimeError("pyarrow ist nicht installiert (pip install pyarrow)")
+    current_month = datetime.now().strftime('%Y-%m')
+    sources = {
+        'pulses': lambda pending: _pulse_months(electricity_csv, pending),
+        'gas_readings': lambda pending: _gas_months(gas_csv, pending),
+        'rollups': _rollup_months,
+    }
+    written = {}
+    for dataset in DATASETS:
+        months = sources[dataset](lambda months: _pending_months(dataset, months, current_month, force))
+        for month, table in months.items():
+            _write_month(dataset, month, table)
+        written[dataset] = len(months)
+    return written
+
+def read(dataset, start=None, end=None, columns=None):
+    """
+    Liest einen Datensatz als pyarrow.Table. Nur die Monate im Zeitraum werden geöffnet
+    (per memory map), nur die angegebenen Spalten gelesen.
+
+    Args:
+        dataset: 'pulses', 'gas_readings' oder 'rollups'
+        start, end: datetime (Ortszeit) für [start, end); None für offen
+        columns: Liste der Spalten oder None für alle
+    """
+    if not is_available():
+        raise RuntimeError("pyarrow ist nicht installiert (pip install pyarrow)")
+    if dataset not in DATASETS:
+        raise ValueError(f"Unbekannter Datensatz: {dataset}")
+    path = os.path.join(ARCHIVE_DIR, dataset)
+    schema = _schemas()[dataset]
+    if not os.path.exists(path):
+        return schema.empty_table() if columns is None else schema.empty_table().select(columns)
+    partitioning = ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive')
+    data = ds.dataset(path, schema=schema.append(pa.field('month', pa.string())), format='parquet',
+                      partitioning=partitioning, filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True),
+                      exclude_invalid_files=True)
+    time_column = 'period_start' if dataset == 'rollups' else 'timestamp'
+    time_type = schema.field(time_column).type
+
+    def _bound(moment):
+        if time_type.tz is not None:
+            moment = moment.astimezone(timezone.utc)
+        return pa.scalar(moment, type=time_type)
+
+    condition = None
+    if start is not None:
+        # Monatsgrenze für das Überspringen ganzer Partitionen, Zeitstempel für die Row Groups
+        condition = (ds.field('month') >= start.strftime('%Y-%m')) & (ds.field(time_column) >= _bound(start))
+    if end is not None:
+        # Wochensummen liegen im Monat ihres Endes, also bis zu sechs Tage nach period_start
+        last_month = (end + timedelta(days=6) if dataset == 'rollups' else end).strftime('%Y-%m')
+        upper = (ds.field('month') <= last_month) & (ds.field(time_column) < _bound(end))
+        condition = upper if condition is None else condition & upper
+    return data.to_table(columns=columns or schema.names, filter=condition)
+
+def clear(dataset=None):
+    """Löscht einen Datensatz (oder das ganze Archiv), z.B. vor einem vollständigen Neuaufbau."""
+    path = os.path.join(ARCHIVE_DIR, dataset) if dataset else ARCHIVE_DIR
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Monatsweises Parquet-Archiv der Impulse, Zählerstände und Verbrauchssummen')
+    parser.add_argument('command', choices=['sync', 'show'],
+                        help="'sync': fehlende Monate und den laufenden Monat schreiben, "
+                             "'show': Zeilen eines Datensatzes anzeigen")
+    parser.add_argument('--electricity-csv', type=str,
+                        default=os.path.join(os.path.dirname(__file__), 'electricity_data.csv'))
+    parser.add_argument('--gas-csv', type=str, default=os.path.join(os.path.dirname(__file__), 'gas_data.csv'))
+    parser.add_argument('--force', action='store_true', help='Auch versiegelte Monate neu schreiben')
+    parser.add_argument('--dataset', choices=DATASETS, default='rollups')
+    parser.add_argument('--start', type=str, help='Beginn (YYYY-MM-DD)')
+    parser.add_argument('--end', type=str, help='Ende, ausschließlich (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    if not is_available():
+        print("pyarrow ist nicht installiert (pip install pyarrow).")
+    elif args.command == 'sync':
+        written = sync(args.electricity_csv, args.gas_csv, force=args.force)
+        print(f"Archiv {ARCHIVE_DIR}: " + ", ".join(f"{dataset} {count} Monate" for dataset, count in written.items()))
+    else:
+        start = datetime.strptime(args.start, '%Y-%m-%d') if args.start else None
+        end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else None
+        print(read(args.dataset, start, end).to_pandas().to_string(index=False))
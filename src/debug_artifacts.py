@@ -0,0 +1,70 @@
+import os
+import queue
+import threading
+import atexit
+import cv2
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+DEBUG_DIR = os.getenv("DEBUG_ARTIFACTS_DIR", os.path.join(BASE_DIR, 'cache', 'debug'))
+QUEUE_SIZE = 200          # Höchstens so viele Bilder warten aufs Schreiben, weitere werden verworfen
+# --- Ende Konfiguration ---
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_writer = None
+_writer_lock = threading.Lock()
+
+def _write_loop():
+    """Schreibt die Debug-Bilder im Hintergrund auf die Festplatte."""
+    while True:
+        path, image, done = _queue.get()
+        try:
+            directory = os.path.dirname(path)
+            if not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            cv2.imwrite(path, image)
+            if done is not None:
+                done(path)
+        except Exception as e:
+            print(f"Warnung: Debug-Bild '{path}' konnte nicht geschrieben werden: {e}")
+        finally:
+            _queue.task_done()
+
+def _ensure_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name="debug-artifacts", daemon=True)
+            _writer.start()
+            atexit.register(flush)
+
+def save(job_name, filename, image):
+    """
+    Übergibt ein Debug-Bild an den Hintergrund-Schreiber. Jede Auswertung bekommt
+    ein eigenes Unterverzeichnis (job_name), damit sich parallele Auswertungen nicht
+    gegenseitig überschreiben. Die Bilder dürfen danach nicht mehr verändert werden.
+    """
+    if not write(os.path.join(DEBUG_DIR, job_name, filename), image):
+        print(f"Warnung: Debug-Bild '{filename}' verworfen, Schreib-Warteschlange ist voll.")
+
+def write(path, image, done=None):
+    """
+    Übergibt ein beliebiges Bild an den Hintergrund-Schreiber (z.B. Trainingsbeispiele).
+
+    Args:
+        done: Wird nach dem Schreiben mit dem Pfad aufgerufen (im Thread des Schreibers)
+
+    Returns:
+        False, wenn die Warteschlange voll ist und das Bild nicht geschrieben wird
+    """
+    _ensure_writer()
+    try:
+        _queue.put_nowait((path, image, done))
+        return True
+    except queue.Full:
+        return False
+
+def flush():
+    """Wartet, bis alle anstehenden Debug-Bilder geschrieben sind."""
+    if _writer is not None:
+        _queue.join()
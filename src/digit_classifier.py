@@ -0,0 +1,249 @@
+import os
+import re
+import glob
+import threading
+import time
+import uuid
+import cv2
+import numpy as np
+import debug_artifacts
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+SAMPLES_DIR = os.getenv("DIGIT_SAMPLES_DIR", os.path.join(BASE_DIR, 'data', 'digit_samples'))
+MODEL_FILE = os.getenv("DIGIT_MODEL_FILE", os.path.join(BASE_DIR, 'data', 'digit_model.npz'))
+FEATURE_SIZE = (20, 28)   # Breite, Höhe, auf die jeder Ausschnitt verkleinert wird
+# --- Ende Konfiguration ---
+
+_model = None
+_model_mtime = None
+_model_lock = threading.Lock()
+_next_slot = {}     # Pro Ziffer der nächste zu prüfende Platz für ein Trainingsbeispiel
+_slot_limit = {}    # Pro Ziffer die Anzahl der Plätze (Obergrenze abzüglich älterer Beispiele)
+_slot_lock = threading.Lock()
+
+def features(images):
+    """
+    Wandelt Ziffern-Ausschnitte in normierte Merkmalsvektoren um: verkleinern,
+    Mittelwert abziehen und auf Länge 1 normieren. Das Skalarprodukt zweier Vektoren
+    ist dann die normierte Kreuzkorrelation der beiden Ausschnitte.
+
+    Returns:
+        Array der Form (Anzahl, FEATURE_SIZE[0] * FEATURE_SIZE[1]), float32
+    """
+    vectors = np.stack([
+        cv2.resize(img, FEATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        for img in images
+    ])
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+def _load_model():
+    """Lädt das Modell und liest es neu ein, sobald die Datei neu trainiert wurde."""
+    global _model, _model_mtime
+    try:
+        mtime = os.path.getmtime(MODEL_FILE)
+    except OSError:
+        return None
+    with _model_lock:
+        if _model is None or mtime != _model_mtime:
+            with np.load(MODEL_FILE) as data:
+                _model = (data['features'], data['labels'])
+            _model_mtime = mtime
+        return _model
+
+def is_available():
+    """Prüft, ob ein trainiertes Modell vorhanden ist."""
+    return _load_model() is not None
+
+def classify_batch(images, min_margin):
+    """
+    Klassifiziert Ziffern-Ausschnitte per Nächster-Nachbar-Suche über die
+    gespeicherten Trainingsbeispiele (normierte Kreuzkorrelation, eine Matrixmultiplikation).
+
+    Args:
+        images: Liste von Graustufen-Ausschnitten
+        min_margin: Mindestabstand zwischen der besten und der zweitbesten Ziffer;
+                    ist er kleiner, wird nichts erkannt und die OCR übernimmt
+
+    Returns:
+        Liste von (text, konfidenz in Prozent) wie bei den OCR-Engines
+    """
+    model = _load_model()
+    if model is None or not images:
+        return [("", 0.0)] * len(images)
+    train_features, labels = model
+
+    similarity = features(images) @ train_features.T
+    # Beste Übereinstimmung pro Ziffer (10 Spalten), Ziffern ohne Beispiele bleiben bei -1
+    scores = np.full((len(images), 10), -1.0, dtype=np.float32)
+    for digit in range(10):
+        mask = labels == digit
+        if mask.any():
+            scores[:, digit] = similarity[:, mask].max(axis=1)
+
+    results = []
+    for row in scores:
+        order = np.argsort(row)[::-1]
+        best, second = row[order[0]], row[order[1]]
+        if best - second < min_margin:
+            results.append(("", 0.0))
+        else:
+            results.append((str(order[0]), float(max(best, 0.0)) * 100))
+    return results
+
+def _has_free_slot(digit, max_per_digit):
+    """
+    Prüft, ob für die Ziffer noch ein Platz frei sein kann. Beim ersten Aufruf werden ältere
+    Beispiele mit anderem Namen (z.B. aus bootstrap vor den Plätzen) gezählt sowie leere Plätze
+    (von früheren Versionen vor dem Schreiben angelegt) und übrig gebliebene temporäre Dateien
+    eines abgebrochenen Prozesses entfernt.
+    """
+    with _slot_lock:
+        if digit not in _slot_limit:
+            digit_dir = os.path.join(SAMPLES_DIR, digit)
+            os.makedirs(digit_dir, exist_ok=True)
+            for path in glob.glob(os.path.join(digit_dir, 'slot_*.png')):
+                if os.path.getsize(path) == 0:
+                    os.remove(path)
+            for path in glob.glob(os.path.join(digit_dir, '.sample_*.png')):
+                if os.path.getmtime(path) < time.time() - 3600:
+                    os.remove(path)
+            others = [path for path in glob.glob(os.path.join(digit_dir, '*.png'))
+                      if not os.path.basename(path).startswith('slot_')]
+            _slot_limit[digit] = max_per_digit - len(others)
+        return _next_slot.get(digit, 0) < _slot_limit[digit]
+
+def _store_sample(tmp_path, digit):
+    """
+    Legt ein fertig geschriebenes Beispiel per os.link unter dem ersten freien Namen
+    slot_NNNNN.png ab. os.link schlägt fehl, wenn der Platz schon belegt ist, so gilt die
+    Obergrenze auch über alle Worker-Prozesse hinweg. Die temporäre Datei wird danach entfernt;
+    stirbt der Prozess vorher, bleibt nur sie zurück und zählt nicht mit.
+
+    Returns:
+        True, wenn das Beispiel einen Platz bekommen hat
+    """
+    try:
+        with _slot_lock:
+            for index in range(_next_slot.get(digit, 0), _slot_limit[digit]):
+                path = os.path.join(os.path.dirname(tmp_path), f"slot_{index:05d}.png")
+                try:
+                    os.link(tmp_path, path)
+                except FileExistsError:
+                    continue
+                _next_slot[digit] = index + 1
+                return True
+            _next_slot[digit] = max(_slot_limit[digit], 0)
+            return False
+    finally:
+        os.remove(tmp_path)
+
+def add_sample(image, digit, max_per_digit, background=False):
+    """
+    Speichert einen sicher erkannten Ausschnitt als Trainingsbeispiel, solange die Obergrenze pro Ziffer nicht erreicht ist.
+    Das Bild wird erst unter einem temporären Namen geschrieben und danach einem Platz zugeordnet.
+
+    Args:
+        background: Über den Hintergrund-Schreiber von debug_artifacts schreiben (während der OCR)
+
+    Returns:
+        True, wenn das Beispiel gespeichert wird (im Hintergrund: zum Schreiben übergeben)
+    """
+    if not _has_free_slot(digit, max_per_digit):
+        return False
+    # Temporäre Dateien beginnen mit einem Punkt, glob('*.png') in train() übergeht sie
+    tmp_path = os.path.join(SAMPLES_DIR, digit, f".sample_{os.getpid()}_{uuid.uuid4().hex}.png")
+    if not background:
+        cv2.imwrite(tmp_path, image)
+        return _store_sample(tmp_path, digit)
+    return debug_artifacts.write(tmp_path, image.copy(), done=lambda path: _store_sample(path, digit))
+
+def train():
+    """
+    Erstellt das Modell aus allen Beispielen in SAMPLES_DIR/<ziffer>/*.png.
+
+    Returns:
+        Anzahl der Beispiele pro Ziffer
+    """
+    images = []
+    labels = []
+    counts = {}
+    for digit in '0123456789':
+        paths = sorted(glob.glob(os.path.join(SAMPLES_DIR, digit, '*.png')))
+        for path in paths:
+            img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if img is not None:
+                images.append(img)
+                labels.append(int(digit))
+        counts[digit] = labels.count(int(digit))
+
+    if not images:
+        print(f"Keine Trainingsbeispiele in '{SAMPLES_DIR}' gefunden.")
+        return counts
+
+    model_dir = os.path.dirname(MODEL_FILE)
+    if model_dir and not os.path.exists(model_dir):
+        os.makedirs(model_dir)
+    # Erst in eine temporäre Datei schreiben, damit laufende Worker nie ein halbes Modell laden
+    tmp_file = MODEL_FILE + '.tmp.npz'
+    np.savez(tmp_file, features=features(images), labels=np.array(labels, dtype=np.int8))
+    os.replace(tmp_file, MODEL_FILE)
+    return counts
+
+def bootstrap(images_dir, csv_path, max_per_digit):
+    """
+    Legt Trainingsbeispiele aus archivierten Kamerabildern an. Die Ziffern stammen
+    aus den Zählerständen zur CSV-Datei; es werden nur Stände verwendet, die zu
+    ihren Nachbarn passen (nicht kleiner als der vorherige, nicht größer als der nächste).
+    """
+    import pandas as pd
+    from image_evaluator import ROIS, load_gray_image, extract_rois, align_rois
+    import odometer
+    import readings_store
+
+    df = readings_store.values(csv_path)
+    values = df['Value']
+    plausible = (values >= values.shift(1).fillna(values)) & (values <= values.shift(-1).fillna(values))
+
+    added = 0
+    for timestamp, value, ok in zip(df['Timestamp'], values, plausible):
+        if not ok or pd.isna(value):
+            continue
+        digits = f"{odometer.to_units(value):0{len(ROIS)}d}"
+        if len(digits) != len(ROIS):
+            continue
+        image_file = os.path.join(images_dir, 'cam_' + re.sub(r'\D', '', timestamp)[:8] + '_' +
+                                  re.sub(r'\D', '', timestamp)[8:] + '.jpg')
+        gray_image = load_gray_image(image_file)
+        if gray_image is None:
+            continue
+        for roi_img, digit in zip(extract_rois(gray_image, align_rois(gray_image)), digits):
+            if roi_img is not None and add_sample(roi_img, digit, max_per_digit):
+                added += 1
+    return added
+
+
+if __name__ == "__main__":
+    import argparse
+    from ocr_config import load_config
+
+    parser = argparse.ArgumentParser(description='Ziffern-Klassifikator trainieren')
+    parser.add_argument('command', choices=['train', 'bootstrap'],
+                        help="'train': Modell aus den gesammelten Beispielen erstellen, "
+                             "'bootstrap': Beispiele aus archivierten Bildern und der CSV anlegen und trainieren")
+    parser.add_argument('--images', type=str, help='Ordner mit den Kamerabildern (für bootstrap)')
+    parser.add_argument('--csv', type=str, help='CSV-Datei mit den Zählerständen (für bootstrap)')
+    args = parser.parse_args()
+
+    if args.command == 'bootstrap':
+        images_dir = args.images or os.path.join(BASE_DIR, 'camera_images')
+        csv_path = args.csv or os.path.join(os.path.dirname(__file__), 'gas_data.csv')
+        max_per_digit = load_config()["classifier"]["max_samples_per_digit"]
+        print(f"{bootstrap(images_dir, csv_path, max_per_digit)} Trainingsbeispiele aus '{images_dir}' angelegt.")
+
+    counts = train()
+    print(f"Beispiele pro Ziffer: {counts}")
+    if any(counts.values()):
+        print(f"Modell gespeichert unter '{MODEL_FILE}'.")
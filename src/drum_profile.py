@@ -0,0 +1,164 @@
+import os
+import threading
+import cv2
+import numpy as np
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+PROFILE_FILE = os.getenv("DRUM_PROFILE_FILE", os.path.join(BASE_DIR, 'data', 'drum_profiles.npz'))
+PROFILE_ROWS = 48         # Länge eines Zeilenprofils nach dem Umrechnen auf eine feste Höhe
+PROFILE_BANDS = 4         # Senkrechte Streifen mit eigenem Zeilenprofil (unterscheidet z.B. 1 und 2)
+# --- Ende Konfiguration ---
+
+# Bruchteil der letzten Rolle aus dem senkrechten Helligkeitsverlauf: Pro Ziffer ist das mittlere
+# Zeilenprofil der zentriert stehenden Ziffer gespeichert (Helligkeit jeder Zeile, getrennt für
+# PROFILE_BANDS senkrechte Streifen, damit sich Ziffern mit ähnlicher Zeilenverteilung unterscheiden).
+# Die Profile 0 bis 9 untereinander ergeben den Umfang der Trommel. Jede Höhe des ROI-Fensters auf
+# dieser Trommel wird mit dem Profil des Ausschnitts verglichen, die beste Übereinstimmung ergibt
+# die Stellung, z.B. 3,4: Ziffer 3 ist zu 40 % nach oben gerollt, die 4 kommt von unten nach.
+# Voraussetzung ist, dass die ROI genau eine Ziffernteilung der Trommel hoch ist.
+
+_table = None
+_table_mtime = None
+_lock = threading.Lock()
+
+def _band_rows(image):
+    """Zeilenmittel jedes senkrechten Streifens, auf PROFILE_ROWS Zeilen umgerechnet (Form BANDS x ROWS)."""
+    bands = np.array_split(image.astype(np.float32), PROFILE_BANDS, axis=1)
+    rows = np.stack([band.mean(axis=1) for band in bands])
+    return cv2.resize(rows, (PROFILE_ROWS, PROFILE_BANDS), interpolation=cv2.INTER_AREA)
+
+def _normalize(profiles):
+    """Macht Profile (letzte Achse flach) mittelwertfrei und normiert sie auf Länge 1."""
+    profiles = profiles - profiles.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(profiles, axis=-1, keepdims=True)
+    return profiles / np.where(norms > 0, norms, 1)
+
+def profile(image):
+    """Zeilenprofil eines Ausschnitts: Streifenprofile hintereinander, mittelwertfrei und normiert."""
+    return _normalize(_band_rows(image).reshape(-1)).astype(np.float32)
+
+def _windows(digit_profiles):
+    """
+    Alle Fensterstellungen auf der Trommel in Schritten von einer Profilzeile, jeweils
+    normiert wie profile(). Zeile k entspricht der Stellung k / PROFILE_ROWS.
+
+    Args:
+        digit_profiles: Ungenormte Streifenprofile der Ziffern 0 bis 9 (Form 10 x BANDS x ROWS)
+    """
+    # Trommel pro Streifen: die Profile der Ziffern 0 bis 9 untereinander
+    drum = digit_profiles.transpose(1, 0, 2).reshape(PROFILE_BANDS, -1)
+    positions = np.arange(drum.shape[1])[:, None] + np.arange(PROFILE_ROWS)[None, :]
+    windows = drum[:, positions % drum.shape[1]].transpose(1, 0, 2)
+    return _normalize(windows.reshape(len(windows), -1))
+
+def _load_table():
+    """Lädt die Profiltabelle und liest sie neu ein, sobald sie neu erstellt wurde."""
+    global _table, _table_mtime
+    try:
+        mtime = os.path.getmtime(PROFILE_FILE)
+    except OSError:
+        return None
+    with _lock:
+        if _table is None or mtime != _table_mtime:
+            with np.load(PROFILE_FILE) as data:
+                digit_profiles = data['profiles']
+            _table = _windows(digit_profiles) if digit_profiles.shape == (10, PROFILE_BANDS, PROFILE_ROWS) else None
+            _table_mtime = mtime
+        return _table
+
+def is_available():
+    """True, wenn eine Profiltabelle vorhanden ist."""
+    return _load_table() is not None
+
+def estimate(image, min_margin=0.0):
+    """
+    Bestimmt die Stellung der Rolle auf dem Ausschnitt, ohne OCR.
+
+    Args:
+        image: Ausschnitt der Rolle (Graustufen)
+        min_margin: Mindestabstand der Korrelation zur besten Stellung, die mindestens eine halbe
+                    Ziffer entfernt ist; sonst ist die Stellung nicht eindeutig
+
+    Returns:
+        (Stellung zwischen 0 und 10, z.B. 3.4; Korrelation des besten Fensters) oder (None, 0.0)
+    """
+    windows = _load_table()
+    if windows is None:
+        return None, 0.0
+    scores = windows @ profile(image)
+    best = int(np.argmax(scores))
+    distance = np.abs((np.arange(len(scores)) - best + len(scores) // 2) % len(scores) - len(scores) // 2)
+    if scores[best] - scores[distance >= PROFILE_ROWS // 2].max() < min_margin:
+        return None, 0.0
+    # Zwischen zwei Profilzeilen per Parabel durch die Nachbarwerte verfeinern
+    left, right = scores[best - 1], scores[(best + 1) % len(scores)]
+    curvature = left - 2 * scores[best] + right
+    offset = 0.5 * (left - right) / curvature if curvature < 0 else 0.0
+    position = ((best + offset) / PROFILE_ROWS) % 10
+    return float(position), float(scores[best])
+
+def build(samples):
+    """
+    Erstellt die Profiltabelle aus Ausschnitten der letzten Rolle mit bekannter Ziffer. Pro Ziffer
+    wird der Median der Profile verwendet, damit Bilder mit halb gerollter Ziffer kaum stören.
+
+    Args:
+        samples: Iterierbar über (Ausschnitt, Ziffer als Text)
+
+    Returns:
+        Anzahl der Ausschnitte pro Ziffer; die Tabelle wird nur gespeichert, wenn jede Ziffer vorkommt
+    """
+    profiles = {str(digit): [] for digit in range(10)}
+    for image, digit in samples:
+        # Helligkeit pro Ausschnitt angleichen, die Form des Profils bleibt erhalten
+        rows = _band_rows(image)
+        profiles[digit].append((rows - rows.mean()) / max(float(rows.std()), 1e-6))
+    counts = {digit: len(values) for digit, values in profiles.items()}
+    if all(counts.values()):
+        digit_profiles = np.stack([np.median(profiles[str(digit)], axis=0) for digit in range(10)])
+        profile_dir = os.path.dirname(PROFILE_FILE)
+        if profile_dir and not os.path.exists(profile_dir):
+            os.makedirs(profile_dir)
+        tmp_file = PROFILE_FILE + '.tmp.npz'
+        np.savez(tmp_file, profiles=digit_profiles.astype(np.float32))
+        os.replace(tmp_file, PROFILE_FILE)
+    return counts
+
+def archive_samples(images_dir, csv_path):
+    """
+    Liefert (Ausschnitt der letzten Rolle, Ziffer) aus archivierten Kamerabildern. Die Ziffern
+    stammen aus den plausiblen Zählerständen der CSV-Datei.
+    """
+    from image_evaluator import ROIS, load_gray_image, extract_rois, align_rois, load_readings
+    import odometer
+
+    readings = load_readings(csv_path)
+    for timestamp, value in zip(readings['Timestamp'], readings['Value']):
+        image_file = os.path.join(images_dir, 'cam_' + timestamp.replace('-', '').replace(':', '').replace(' ', '_') + '.jpg')
+        if not os.path.exists(image_file):
+            continue
+        gray_image = load_gray_image(image_file)
+        if gray_image is None:
+            continue
+        crop = extract_rois(gray_image, align_rois(gray_image))[len(ROIS) - 1]
+        if crop is not None:
+            yield crop, f"{odometer.to_units(value):0{len(ROIS)}d}"[-1]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Profiltabelle der letzten Rolle erstellen')
+    parser.add_argument('--images', type=str, help='Ordner mit den Kamerabildern')
+    parser.add_argument('--csv', type=str, help='CSV-Datei mit den Zählerständen')
+    args = parser.parse_args()
+
+    images_dir = args.images or os.path.join(BASE_DIR, 'camera_images')
+    csv_path = args.csv or os.path.join(os.path.dirname(__file__), 'gas_data.csv')
+    counts = build(archive_samples(images_dir, csv_path))
+    print(f"Ausschnitte pro Ziffer: {counts}")
+    if all(counts.values()):
+        print(f"Profiltabelle gespeichert unter '{PROFILE_FILE}'.")
+    else:
+        print("Nicht für jede Ziffer ein Ausschnitt vorhanden, keine Profiltabelle gespeichert.")
@@ -2,6 +2,7 @@
 
 import pandas as pd
 import os
+import readings_store
 
 # --- Konfiguration ---
 input_csv_file = 'gas_data.csv'
@@ -29,21 +30,22 @@ output_cost_col = 'Kosten (€)' # Neue Spalte für Kosten
 
 def process_gas_data(input_file, output_file):
     """
-    Liest die Gasverbrauchs-CSV-Datei ein, transformiert die Daten
+    Liest die Zählerstände (Datenbank zur CSV-Datei, siehe readings_store.py) ein, transformiert die Daten
     (Timestamp anpassen, Spalten auswählen/umbenennen, kWh und Kosten berechnen)
     und speichert das Ergebnis in einer neuen CSV-Datei.
     """
     print(f"Lese Eingabedatei: {input_file}")
 
-    # Prüfen, ob die Eingabedatei existiert
-    if not os.path.exists(input_file):
+    # Prüfen, ob die Eingabedatei oder die daraus übernommene Datenbank existiert
+    if not os.path.exists(input_file) and not os.path.exists(readings_store.store_path(input_file)):
         print(f"Fehler: Eingabedatei '{input_file}' nicht gefunden.")
         return
 
     try:
-        # Lese die CSV-Datei mit Pandas. Wichtig: parse_dates sorgt dafür,
-        # dass die Timestamp-Spalte als Datum/Zeit-Objekt erkannt wird.
-        df = pd.read_csv(input_file, parse_dates=[timestamp_column])
+        # Alle Zeilen im Format der CSV-Datei lesen. Wichtig: die Timestamp-Spalte
+        # wird als Datum/Zeit-Objekt gebraucht.
+        df = readings_store.load_frame(input_file)
+        df[timestamp_column] = pd.to_datetime(df[timestamp_column])
 
         print(f"Verarbeite {len(df)} Zeilen...")
 
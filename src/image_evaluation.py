@@ -4,8 +4,12 @@ import os
 import numpy as np
 import csv
 import pandas as pd
-import easyocr  # easyocr statt pytesseract importieren
-import pytesseract  # pytesseract zusätzlich importieren
+from ocr_engines import get_reader, easyocr_recognize_batch  # EasyOCR über den geteilten Reader
+from ocr_engines import tesseract_recognize  # Tesseract (PSM 10, nur Ziffern) zusätzlich
+import pytesseract  # für die optionale Pfad-Konfiguration unten
+from ocr_config import load_config
+import roi_alignment  # Verschiebung der ROIs bei verrutschter Kamera
+import readings_store  # Zählerstände (Datenbank zur CSV-Datei)
 
 def berechne_verbrauch(df):
     """
@@ -70,6 +74,13 @@ except Exception as e:
     print(f"Ein Fehler ist beim Laden des Bildes aufgetreten: {e}")
     exit()
 
+# Verschiebung der ROIs gegenüber dem Referenzbild bestimmen (am ungedrehten Bild)
+alignment_config = load_config()["alignment"]
+roi_offset = (0, 0)
+if alignment_config["enabled"]:
+    roi_offset = roi_alignment.roi_offset(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), alignment_config)
+    print(f"ROI-Verschiebung: {roi_offset[0]}/{roi_offset[1]} px")
+
 # Bild um 180 Grad drehen
 image = cv2.rotate(image, cv2.ROTATE_180)
 
@@ -86,6 +97,7 @@ rois = [
     {"name": "ROI 5", "x": 565, "y": 375, "w": 80, "h": 100, "color": (255, 0, 255)},# ROI 5 in Magenta
     {"name": "ROI 6", "x": 720, "y": 365, "w": 80, "h": 120, "color": (0, 255, 255)} # ROI 6 in Gelb
 ]
+rois = roi_alignment.shift_rois(rois, roi_offset)
 
 # ROIs in Originalbild einzeichnen und extrahieren
 image_with_rois = image.copy()
@@ -153,12 +165,9 @@ cv2.imwrite(os.path.join(cache_dir, 'image_with_all_rois.png'), image_with_rois)
 
 # --- OCR mit EasyOCR und pytesseract ---
 try:
-    # EasyOCR Reader initialisieren (nur einmal, für bessere Performance)
+    # EasyOCR Reader laden (nur einmal, für bessere Performance)
     # Wir verwenden nur deutsche Sprache und schränken auf Zahlen ein
-    reader = easyocr.Reader(['de'], gpu=False, model_storage_directory=cache_dir)
-    
-    # Konfiguration für pytesseract
-    pytesseract_config = '--psm 10 -c tessedit_char_whitelist=0123456789'  # PSM 10 für einzelne Zeichen
+    get_reader()
     
     # Sammeln aller Erkennungsergebnisse
     all_recognition_results = []
@@ -173,115 +182,44 @@ try:
         # Erkennung mit verschiedenen Bildvorverarbeitungen durchführen
         results = {}
         
-        # 1. Original-ROI OCR mit EasyOCR
-        result_original = reader.readtext(roi_processed["original"], 
-                                          allowlist='0123456789', 
-                                          detail=1)
-        
-        # 2. Adaptive Threshold mit EasyOCR
-        result_adapt = reader.readtext(roi_processed["adaptive"], 
-                                       allowlist='0123456789', 
-                                       detail=1)
-        
-        # 3. Minimal verarbeitet mit EasyOCR
-        result_min = reader.readtext(roi_processed["minimal"], 
-                                     allowlist='0123456789', 
-                                     detail=1)
+        # EasyOCR: die vier Varianten direkt erkennen, ohne Textdetektion
+        # (die Position der Ziffer ist durch die ROI bereits bekannt)
+        (text_original, conf_original), (text_adapt, conf_adapt), \
+            (text_min, conf_min), (text_resized, conf_resized) = easyocr_recognize_batch(
+                [roi_processed["original"], roi_processed["adaptive"],
+                 roi_processed["minimal"], roi_processed["resized"]])
         
-        # 4. Vergrößerte Version mit EasyOCR
-        result_resized = reader.readtext(roi_processed["resized"], 
-                                         allowlist='0123456789', 
-                                         detail=1)
-        
-        # --- pytesseract OCR für die gleichen Bilder ---
-        # Hilfsfunktion für pytesseract Konfidenzberechnung
-        def extract_pytesseract_text_and_confidence(data):
-            texts = []
-            confs = []
-            
-            for i in range(len(data['text'])):
-                if data['text'][i].strip() and int(data['conf'][i]) > 0:  # Nur gültige Konfidenzwerte (> 0) und nicht-leere Texte
-                    texts.append(data['text'][i])
-                    confs.append(float(data['conf'][i]))
-            
-            if texts:
-                text = ' '.join(texts).strip()
-                avg_conf = sum(confs) / len(confs) if confs else 0
-                return text, avg_conf
-            else:
-                return "", 0.0
-                
-        # 1. Original mit pytesseract
+        # --- Tesseract OCR für die gleichen Bilder ---
+        # tesseract_recognize liefert Text und Konfidenz in einem Aufruf
+        # (im Prozess über tesserocr, sonst über pytesseract.image_to_data)
+        # 1. Original mit Tesseract
         try:
-            text_pytess_orig = pytesseract.image_to_string(roi_processed["original"], 
-                                                       config=pytesseract_config).strip()
-            # Berechnung der Konfidenz für pytesseract
-            pytess_orig_data = pytesseract.image_to_data(roi_processed["original"], 
-                                                     config=pytesseract_config, 
-                                                     output_type=pytesseract.Output.DICT)
-            text_pytess_orig, conf_pytess_orig = extract_pytesseract_text_and_confidence(pytess_orig_data)
-        except:
+            text_pytess_orig, conf_pytess_orig = tesseract_recognize(roi_processed["original"])
+        except Exception:
             text_pytess_orig = ""
             conf_pytess_orig = 0.0
             
-        # 2. Adaptive mit pytesseract
+        # 2. Adaptive mit Tesseract
         try:
-            text_pytess_adapt = pytesseract.image_to_string(roi_processed["adaptive"], 
-                                                        config=pytesseract_config).strip()
-            pytess_adapt_data = pytesseract.image_to_data(roi_processed["adaptive"], 
-                                                      config=pytesseract_config, 
-                                                      output_type=pytesseract.Output.DICT)
-            text_pytess_adapt, conf_pytess_adapt = extract_pytesseract_text_and_confidence(pytess_adapt_data)
-        except:
+            text_pytess_adapt, conf_pytess_adapt = tesseract_recognize(roi_processed["adaptive"])
+        except Exception:
             text_pytess_adapt = ""
             conf_pytess_adapt = 0.0
             
-        # 3. Minimal mit pytesseract
+        # 3. Minimal mit Tesseract
         try:
-            text_pytess_min = pytesseract.image_to_string(roi_processed["minimal"], 
-                                                      config=pytesseract_config).strip()
-            pytess_min_data = pytesseract.image_to_data(roi_processed["minimal"], 
-                                                    config=pytesseract_config, 
-                                                    output_type=pytesseract.Output.DICT)
-            text_pytess_min, conf_pytess_min = extract_pytesseract_text_and_confidence(pytess_min_data)
-        except:
+            text_pytess_min, conf_pytess_min = tesseract_recognize(roi_processed["minimal"])
+        except Exception:
             text_pytess_min = ""
             conf_pytess_min = 0.0
             
-        # 4. Resized mit pytesseract
+        # 4. Resized mit Tesseract
         try:
-            text_pytess_resized = pytesseract.image_to_string(roi_processed["resized"], 
-                                                          config=pytesseract_config).strip()
-            pytess_resized_data = pytesseract.image_to_data(roi_processed["resized"], 
-                                                        config=pytesseract_config, 
-                                                        output_type=pytesseract.Output.DICT)
-            text_pytess_resized, conf_pytess_resized = extract_pytesseract_text_and_confidence(pytess_resized_data)
-        except:
+            text_pytess_resized, conf_pytess_resized = tesseract_recognize(roi_processed["resized"])
+        except Exception:
             text_pytess_resized = ""
             conf_pytess_resized = 0.0
         
-        # Hilfsfunktion, um Text und Konfidenz aus den OCR-Daten zu extrahieren
-        def extract_text_and_confidence(result):
-            if not result:
-                return "", 0.0
-                
-            texts = []
-            confs = []
-            
-            for box in result:
-                texts.append(box[1])  # Text ist an zweiter Stelle
-                confs.append(box[2])  # Konfidenz ist an dritter Stelle
-            
-            text = ' '.join(texts).strip()
-            avg_conf = sum(confs) / len(confs) if confs else 0
-            return text, avg_conf * 100  # EasyOCR gibt Konfidenz zwischen 0-1, wir multiplizieren mit 100
-        
-        # Ergebnisse mit Konfidenzwerten extrahieren für EasyOCR
-        text_original, conf_original = extract_text_and_confidence(result_original)
-        text_adapt, conf_adapt = extract_text_and_confidence(result_adapt)
-        text_min, conf_min = extract_text_and_confidence(result_min)
-        text_resized, conf_resized = extract_text_and_confidence(result_resized)
-        
         # Ergebnisse sammeln für beide OCR-Engines
         results = {
             # EasyOCR Ergebnisse
@@ -396,46 +334,19 @@ if timestamp_match:
     formatted_timestamp = f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:]} {time_part[:2]}:{time_part[2:4]}:{time_part[4:]}"
     print(f"Extrahierter Zeitstempel aus Bildname: {formatted_timestamp}")
     
-    # CSV-Datei aktualisieren
+    # Zählerstand in die Datenbank zur CSV-Datei eintragen (siehe readings_store.py)
     try:
-        # CSV-Datei mit pandas lesen
-        print(f"Lese CSV-Datei von {csv_path}")
-        df = pd.read_csv(csv_path)
-        
-        # Finde die Zeile mit dem entsprechenden Zeitstempel
-        mask = df['Timestamp'] == formatted_timestamp
-        if mask.any():
-            # Aktualisiere nur den Number-Wert in der gefundenen Zeile
-            # Entferne Anführungszeichen und ersetze Komma durch Punkt
-            clean_value = str(csv_value).strip('"').replace(',', '.')
-            df.loc[mask, 'Number'] = clean_value
+        clean_value = str(csv_value).strip('"').replace(',', '.')
+        found, consumption = readings_store.set_number(csv_path, formatted_timestamp, clean_value)
+        if found:
             print(f"Aktualisiere Number auf {clean_value} für Zeitstempel {formatted_timestamp}")
-            
-            # Berechne Verbrauch und Kosten nur für die aktualisierte Zeile
-            row_idx = df[mask].index[0]
-            if row_idx > 0:  # Nur berechnen, wenn es einen vorherigen Eintrag gibt
-                prev_value = df.iloc[row_idx-1]['Number']
-                if not pd.isna(prev_value) and not pd.isna(clean_value):
-                    # Konvertiere die Werte in Float (ersetze Komma durch Punkt)
-                    current_value = float(str(clean_value).replace(',', '.'))
-                    prev_value = float(str(prev_value).replace(',', '.'))
-                    
-                    # Differenz im Zählerstand
-                    consumption_diff = current_value - prev_value
-                    
-                    # Verbrauch ist einfach die Differenz
-                    consumption = consumption_diff
-                    
-                    # Werte in DataFrame eintragen
-                    df.at[row_idx, 'Verbrauch'] = round(consumption, 2)
-        
-        # Aktualisierte Daten zurückschreiben
-        print(f"\nSchreibe aktualisierte Daten in {csv_path}")
-        df.to_csv(csv_path, index=False)
-        print("CSV-Datei erfolgreich aktualisiert.")
+            if consumption is not None:
+                print(f"Verbrauch: {consumption} Watt")
+        else:
+            print(f"Warnung: Kein Eintrag mit Zeitstempel {formatted_timestamp} gefunden.")
         
     except Exception as e:
-        print(f"Fehler beim Aktualisieren der CSV-Datei: {e}")
+        print(f"Fehler beim Aktualisieren der Zählerstände: {e}")
         print(f"Fehlerdetails: {str(e)}")
 else:
     print(f"Warnung: Konnte keinen Zeitstempel aus dem Bildnamen '{image_filename}' extrahieren.")
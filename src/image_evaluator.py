@@ -2,163 +2,466 @@ import cv2
 import pytesseract
 import re
 import os
-import pandas as pd
 import numpy as np
-import easyocr
+import threading
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from ocr_engines import (get_reader, easyocr_recognize_batch, tesseract_recognize, set_torch_threads,
+                         easyocr_recognize_strip, tesseract_recognize_strip, engine_version, strip_layout)
+from ocr_config import load_config
+import ocr_telemetry
+import digit_classifier
+import odometer
+import roi_fingerprints
+import debug_artifacts
+import roi_batch
+import image_quality
+import roi_alignment
+import drum_profile
+import onnx_recognizer
+import ocr_cache
+import readings_store
 
-def evaluate_image(image_path, csv_path):
+# Definition der 6 ROIs (Koordinaten im um 180 Grad gedrehten Bild)
+ROIS = [
+    {"name": "ROI 1", "x": 0, "y": 300, "w": 80, "h": 110, "color": (0, 255, 0)},    # ROI 1 in Grün
+    {"name": "ROI 2", "x": 140, "y": 315, "w": 80, "h": 110, "color": (255, 0, 0)},   # ROI 2 in Blau
+    {"name": "ROI 3", "x": 280, "y": 330, "w": 80, "h": 110, "color": (0, 0, 255)},   # ROI 3 in Rot
+    {"name": "ROI 4", "x": 430, "y": 345, "w": 80, "h": 110, "color": (255, 255, 0)},# ROI 4 in Cyan
+    {"name": "ROI 5", "x": 565, "y": 375, "w": 80, "h": 100, "color": (255, 0, 255)},# ROI 5 in Magenta
+    {"name": "ROI 6", "x": 720, "y": 365, "w": 80, "h": 120, "color": (0, 255, 255)} # ROI 6 in Gelb
+]
+
+# ROI-Geometrie einmalig als Arrays für das Ausschneiden aller ROIs in einem Schritt
+ROI_GEOMETRY = roi_batch.compile_rois(ROIS)
+# Kompilierte Geometrie der verschobenen ROIs pro Verschiebung (siehe roi_alignment.py)
+_shifted_geometry = {(0, 0): ROI_GEOMETRY}
+
+# Thread-Pool für die parallele Tesseract-Erkennung der ROIs eines Bildes
+_roi_pool = None
+_roi_pool_lock = threading.Lock()
+# Anzahl Kerne, die dieser Prozess nutzen darf (im Worker-Pool: Kerne / Anzahl Worker)
+_cpu_share = os.cpu_count() or 1
+# Warnung über das fehlende ONNX-Modell nur einmal pro Prozess ausgeben
+_onnx_warned = False
+
+# OCR-Methoden in der Reihenfolge der Kaskade: (Name, Engine, Bildvariante)
+# Zuerst der trainierte Ziffern-Klassifikator (falls ein Modell vorhanden ist), dann
+# günstige OCR-Methoden, die 3x vergrößerte Variante erst ganz am Ende
+OCR_METHODS = [
+    ("Ziffern-Klassifikator", "classifier", "original"),
+    ("Pytesseract Minimal", "tesseract", "minimal"),
+    ("Pytesseract Original", "tesseract", "original"),
+    ("Pytesseract Adaptive", "tesseract", "adaptive"),
+    ("EasyOCR Original", "easyocr", "original"),
+    ("EasyOCR Minimal", "easyocr", "minimal"),
+    ("EasyOCR Adaptive", "easyocr", "adaptive"),
+    ("Pytesseract Vergrößert", "tesseract", "resized"),
+    ("EasyOCR Vergrößert", "easyocr", "resized"),
+]
+
+def decode_gray(image_data):
     """
-    Wertet ein Bild aus und aktualisiert die CSV-Datei mit dem erkannten Zahlenwert.
+    Dekodiert ein JPEG aus dem Speicher direkt in Graustufen. libjpeg liefert dabei nur
+    den Helligkeitskanal, die Farbumrechnung entfällt. None, wenn die Daten nicht lesbar sind.
+    """
+    return cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+def load_gray_image(image_path):
+    """Lädt ein Kamerabild ungedreht in Graustufen (None, wenn es nicht lesbar ist)."""
+    return decode_gray(np.fromfile(image_path, dtype=np.uint8))
+
+def align_rois(gray_image):
+    """
+    Bestimmt die Verschiebung der ROIs für ein ungedrehtes Graustufenbild gegenüber dem
+    Referenzbild, (0, 0), wenn die Ausrichtung abgeschaltet ist oder fehlschlägt.
+    """
+    config = load_config()["alignment"]
+    if not config["enabled"]:
+        return 0, 0
+    try:
+        return roi_alignment.roi_offset(gray_image, config)
+    except Exception as e:
+        print(f"Warnung: ROI-Ausrichtung fehlgeschlagen: {e}")
+        return 0, 0
+
+def extract_rois(gray_image, offset=(0, 0)):
+    """
+    Schneidet alle ROIS aus dem ungedrehten Graustufenbild aus. Die ROI-Koordinaten beziehen
+    sich auf das um 180 Grad gedrehte Bild; statt das ganze Bild zu drehen, wird nur jeder
+    Ausschnitt gedreht und in einen gemeinsamen Stapel geschrieben.
     
     Args:
-        image_path: Pfad zum Bild
-        csv_path: Pfad zur CSV-Datei mit den Sensordaten
+        gray_image: Ungedrehtes Graustufenbild
+        offset: Verschiebung (dx, dy) der ROIs, siehe align_rois
     
     Returns:
-        Erkannter Zahlenwert oder None im Fehlerfall
+        Liste der Ausschnitte (None für ROIs außerhalb des Bildes)
+    """
+    geometry = _shifted_geometry.get(offset)
+    if geometry is None:
+        geometry = roi_batch.compile_rois(roi_alignment.shift_rois(ROIS, offset))
+        _shifted_geometry[offset] = geometry
+    _, crops = roi_batch.extract_stack(geometry, gray_image)
+    return crops
+
+def get_variants(roi_processed_list, variant):
+    """
+    Gibt eine Bildvariante für mehrere ROIs zurück. Fehlende Varianten werden erst berechnet,
+    wenn sie gebraucht werden, und dann für alle diese ROIs gemeinsam in einem Stapel.
+    """
+    missing = [roi_processed for roi_processed in roi_processed_list if variant not in roi_processed]
+    if missing:
+        computed = roi_batch.preprocess_batch([roi_processed["original"] for roi_processed in missing], variant)
+        for roi_processed, variant_img in zip(missing, computed):
+            roi_processed[variant] = variant_img
+    return [roi_processed[variant] for roi_processed in roi_processed_list]
+
+def easyocr_backend():
+    """
+    Gibt das Backend für EasyOCR zurück: "onnx", wenn konfiguriert und das exportierte Modell
+    samt onnxruntime vorhanden ist, sonst "torch".
+    """
+    global _onnx_warned
+    if load_config()["easyocr"]["backend"] != "onnx":
+        return "torch"
+    if onnx_recognizer.is_available():
+        return "onnx"
+    if not _onnx_warned:
+        _onnx_warned = True
+        print(f"Warnung: ONNX-Backend nicht verfügbar (onnxruntime oder '{onnx_recognizer.MODEL_FILE}' fehlt), "
+              "EasyOCR läuft mit PyTorch.")
+    return "torch"
+
+def configure_threads(cpu_share=None):
+    """
+    Legt fest, wie viele Threads die OCR in diesem Prozess nutzt, damit mehrere Worker-Prozesse
+    die Kerne nicht mehrfach belegen. Werte aus dem Abschnitt "threads" der Konfiguration
+    haben Vorrang; 0 bedeutet automatisch (Anteil des Prozesses an den Kernen).
+    
+    Args:
+        cpu_share: Anzahl Kerne, die dieser Prozess nutzen darf
+    """
+    global _cpu_share
+    if cpu_share:
+        _cpu_share = cpu_share
+    threads = load_config()["threads"]
+    if easyocr_backend() == "onnx":
+        # PyTorch wird mit dem ONNX-Backend nicht geladen
+        onnx_recognizer.set_threads(threads["torch"] or _cpu_share)
+    else:
+        try:
+            set_torch_threads(threads["torch"] or _cpu_share)
+        except Exception as e:
+            print(f"Warnung: Anzahl der PyTorch-Threads konnte nicht gesetzt werden: {e}")
+    # Die ROIs sind klein, OpenCV-interne Threads lohnen sich neben dem ROI-Pool nicht
+    cv2.setNumThreads(threads["opencv"] or 1)
+
+def _get_roi_pool():
+    """Gibt den Thread-Pool für die ROIs zurück (None, wenn nur ein Thread konfiguriert ist)."""
+    global _roi_pool
+    if _roi_pool is None:
+        with _roi_pool_lock:
+            if _roi_pool is None:
+                size = load_config()["threads"]["roi"] or min(_cpu_share, len(ROIS))
+                if size <= 1:
+                    return None
+                _roi_pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="ocr-roi")
+    return _roi_pool
+
+def _tesseract_or_empty(img):
+    try:
+        return tesseract_recognize(img)
+    except Exception:
+        return ("", 0.0)
+
+def run_ocr_method(engine, images, mode="roi"):
+    """
+    Führt eine OCR-Engine für mehrere ROI-Ausschnitte aus. Im Modus "strip" werden die
+    Ausschnitte auf einen Streifen gelegt und von EasyOCR bzw. Tesseract mit einem einzigen
+    Zeilen-Aufruf erkannt; der Klassifikator arbeitet immer pro Ausschnitt.
+    
+    Returns:
+        Liste von (text, konfidenz) in der Reihenfolge der Ausschnitte
+    """
+    if engine == "classifier":
+        try:
+            return digit_classifier.classify_batch(images, load_config()["classifier"]["min_margin"])
+        except Exception as e:
+            print(f"Fehler beim Ziffern-Klassifikator: {e}")
+            return [("", 0.0)] * len(images)
+    
+    if mode == "strip":
+        try:
+            if engine == "easyocr":
+                return easyocr_recognize_strip(images, easyocr_backend())
+            return tesseract_recognize_strip(images)
+        except Exception as e:
+            print(f"Fehler bei der Zeilen-Erkennung ({engine}): {e}")
+            return [("", 0.0)] * len(images)
+    
+    if engine == "easyocr":
+        # Alle Ausschnitte in einem Aufruf, ohne Textdetektion
+        try:
+            return easyocr_recognize_batch(images, easyocr_backend())
+        except Exception as e:
+            print(f"Fehler bei der EasyOCR-Erkennung: {e}")
+            return [("", 0.0)] * len(images)
+    
+    # Tesseract gibt während der Erkennung den GIL frei (jeder Thread hat sein eigenes
+    # API-Handle), daher laufen die ROIs parallel im Thread-Pool
+    pool = _get_roi_pool() if len(images) > 1 else None
+    if pool is None:
+        return [_tesseract_or_empty(img) for img in images]
+    return list(pool.map(_tesseract_or_empty, images))
+
+def run_cached_ocr_method(engine, variant, images, mode="roi"):
+    """
+    Wie run_ocr_method, aber mit dem OCR-Cache (siehe ocr_cache.py): Nur Ausschnitte, deren
+    Ergebnis für diese Engine, Variante und diesen Modus noch nicht bekannt ist, werden erkannt.
+    Im Modus "strip" wird bei einem fehlenden Ergebnis der ganze Streifen neu erkannt.
+
+    Returns:
+        (Liste von (text, konfidenz) in der Reihenfolge der Ausschnitte, Anzahl tatsächlich erkannter Ausschnitte)
+    """
+    cache_config = load_config()["ocr_cache"]
+    # Der Klassifikator ist schneller als jeder Nachschlag und ändert sich mit jedem Training
+    if engine == "classifier" or not cache_config["enabled"]:
+        return run_ocr_method(engine, images, mode), len(images)
+
+    try:
+        backend = easyocr_backend() if engine == "easyocr" else "torch"
+        strip = strip_layout(images) if mode == "strip" else None
+        keys = ocr_cache.make_keys(engine_version(engine, backend), variant, images, mode, strip)
+        results = ocr_cache.get_many(keys, cache_config)
+    except Exception as e:
+        print(f"Warnung: OCR-Cache konnte nicht gelesen werden: {e}")
+        return run_ocr_method(engine, images, mode), len(images)
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if mode == "strip" and missing:
+        missing = list(range(len(images)))
+    if missing:
+        for i, result in zip(missing, run_ocr_method(engine, [images[i] for i in missing], mode)):
+            results[i] = result
+        try:
+            # Leere Ergebnisse nicht speichern, sie können auch von einem Fehler der Engine stammen
+            ocr_cache.put_many([(keys[i], results[i]) for i in missing if results[i][0]], cache_config)
+        except Exception as e:
+            print(f"Warnung: OCR-Cache konnte nicht gespeichert werden: {e}")
+    return results, len(missing)
+
+def extract_digit(text):
+    """Reduziert einen erkannten Text auf eine einzelne Ziffer (leer, wenn keine Ziffer enthalten ist)."""
+    # Bereinigen - nur Ziffern behalten, bei mehreren Ziffern nur die erste
+    digits = re.sub(r'\D', '', text)
+    return digits[0] if digits else ""
+
+def recognize_rois(roi_processed_images, timings=None, mode=None):
     """
-    # Basis- und Cache-Verzeichnis bestimmen
-    base_dir = os.path.dirname(os.path.dirname(__file__))
-    cache_dir = os.path.join(base_dir, 'cache')
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
+    Erkennt die Ziffern aller ROIs mit einer Konfidenz-Kaskade: Die Methoden aus
+    OCR_METHODS werden der Reihe nach ausgeführt, und eine ROI scheidet aus, sobald
+    eine Methode ihre Konfidenzschwelle erreicht. Jede Methode läuft dabei für alle
+    noch offenen ROIs gemeinsam. Ist die Kaskade abgeschaltet, laufen alle Methoden.
+    Im adaptiven Modus wird die Reihenfolge anhand der OCR-Statistik angepasst.
+    
+    Args:
+        roi_processed_images: Pro ROI ein Dictionary der Bildvarianten
+        timings: Optionales Dictionary, in das pro Methode (Anzahl erkannter ROIs ohne Treffer im
+                 OCR-Cache, Laufzeit in Sekunden) eingetragen wird
+        mode: "roi" oder "strip" (siehe run_ocr_method), Standard aus der Konfiguration
+    
+    Returns:
+        Pro ROI ein Dictionary {Methode: {"text": ..., "conf": ...}} der ausgeführten Methoden
+    """
+    config = load_config()
+    cascade = config["cascade"]
+    mode = mode or config["recognition"]["mode"]
+    results_per_roi = [{} for _ in roi_processed_images]
+    pending = list(range(len(roi_processed_images)))
+    
+    for method, engine, variant in ocr_telemetry.order_methods(OCR_METHODS, config["telemetry"]["adaptive"]):
+        if not pending:
+            break
+        # Ohne trainiertes Modell wird der Klassifikator übersprungen
+        if engine == "classifier" and not (config["classifier"]["enabled"] and digit_classifier.is_available()):
+            continue
+        
+        start = time.perf_counter()
+        images = get_variants([roi_processed_images[i] for i in pending], variant)
+        results, recognized = run_cached_ocr_method(engine, variant, images, mode)
+        for i, (text, conf) in zip(pending, results):
+            results_per_roi[i][method] = {"text": text, "conf": conf}
+        # Ergebnisse aus dem OCR-Cache zählen nicht als Lauf der Methode
+        if timings is not None and recognized:
+            timings[method] = (recognized, time.perf_counter() - start)
+        
+        if cascade["enabled"]:
+            threshold = cascade["thresholds"].get(method, cascade["default_threshold"])
+            pending = [i for i in pending
+                       if not (extract_digit(results_per_roi[i][method]["text"]) and
+                               results_per_roi[i][method]["conf"] >= threshold)]
+    
+    return results_per_roi
+
+def warm_up():
+    """
+    Lädt die OCR-Modelle vorab und führt eine Probeerkennung aus, damit die
+    erste echte Bildauswertung nicht auf das Laden der Modelle warten muss.
+    """
+    start = time.time()
+    try:
+        backend = easyocr_backend()
+        if backend == "torch":
+            get_reader()
+        easyocr_recognize_batch([np.zeros((110, 80), dtype=np.uint8)], backend)
+        tesseract_recognize(np.zeros((110, 80), dtype=np.uint8))
+        print(f"OCR-Modelle geladen ({time.time() - start:.1f} s)")
+    except Exception as e:
+        print(f"Warnung: OCR-Modelle konnten nicht vorgeladen werden: {e}")
+
+def recognize_reading(image_path, previous=None, image_data=None):
+    """
+    Erkennt den Zählerstand auf einem Bild, ohne die CSV-Datei zu verändern.
+    Wird auch in den OCR-Worker-Prozessen verwendet.
+    
+    Ist der vorherige Zählerstand bekannt, werden nur Stände zugelassen, die seitdem
+    physikalisch möglich sind: Führende Rollen, die sich nicht geändert haben können,
+    werden ohne OCR übernommen, und aus den OCR-Ergebnissen der übrigen Rollen wird
+    der passendste mögliche Stand gewählt.
     
+    Args:
+        image_path: Pfad zum Bild
+        previous: Optional (Zeitstempel "YYYY-MM-DD HH:MM:SS", Zählerstand) des letzten erkannten Standes
+        image_data: Optional der JPEG-Inhalt aus dem Speicher; ohne wird das Bild von image_path gelesen
+    
+    Returns:
+        Erkannter Zahlenwert (z.B. "1234,56") oder None im Fehlerfall
+    
+    Raises:
+        image_quality.ImageRejected: Wenn das Bild die Qualitätsprüfung nicht besteht
+    """
     # Prüfen, ob das Bild existiert
-    if not os.path.exists(image_path):
+    if image_data is None and not os.path.exists(image_path):
         print(f"Fehler: Bilddatei nicht gefunden unter '{image_path}'")
         return None
     
     try:
         # Bild laden
-        image = cv2.imread(image_path)
-        if image is None:
+        if image_data is None:
+            with open(image_path, 'rb') as f:
+                image_data = f.read()
+        
+        # Direkt in Graustufen dekodieren; das Bild wird nicht um 180 Grad gedreht,
+        # stattdessen rechnet extract_rois die ROI-Koordinaten um
+        gray_image = decode_gray(image_data)
+        if gray_image is None:
             print(f"Fehler: Bild konnte nicht geladen werden: '{image_path}'")
             return None
-            
-        # Bild um 180 Grad drehen
-        image = cv2.rotate(image, cv2.ROTATE_180)
         
-        # Konvertierung in Graustufen
-        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Unbrauchbare Bilder (z.B. Blitz ausgefallen) vor der OCR verwerfen
+        quality_config = load_config()["quality_gate"]
+        if quality_config["enabled"]:
+            reason = image_quality.check_frame(gray_image, quality_config)
+            if reason:
+                raise image_quality.ImageRejected(reason)
+        
+        # ROIs an eine verrutschte Kamera anpassen (Verschiebung wird zwischengespeichert)
+        offset = align_rois(gray_image)
+        rois = roi_alignment.shift_rois(ROIS, offset) if offset != (0, 0) else ROIS
         
-        # Definition der 6 ROIs
-        rois = [
-            {"name": "ROI 1", "x": 0, "y": 300, "w": 80, "h": 110, "color": (0, 255, 0)},    # ROI 1 in Grün
-            {"name": "ROI 2", "x": 140, "y": 315, "w": 80, "h": 110, "color": (255, 0, 0)},   # ROI 2 in Blau
-            {"name": "ROI 3", "x": 280, "y": 330, "w": 80, "h": 110, "color": (0, 0, 255)},   # ROI 3 in Rot
-            {"name": "ROI 4", "x": 430, "y": 345, "w": 80, "h": 110, "color": (255, 255, 0)},# ROI 4 in Cyan
-            {"name": "ROI 5", "x": 565, "y": 375, "w": 80, "h": 100, "color": (255, 0, 255)},# ROI 5 in Magenta
-            {"name": "ROI 6", "x": 720, "y": 365, "w": 80, "h": 120, "color": (0, 255, 255)} # ROI 6 in Gelb
-        ]
+        # Debug-Bilder nur auf Wunsch, in einem eigenen Unterordner pro Bild und im Hintergrund geschrieben
+        debug = load_config()["debug_artifacts"]["enabled"]
+        job_name = os.path.splitext(os.path.basename(image_path))[0]
         
-        # ROIs in Originalbild einzeichnen und extrahieren
-        image_with_rois = image.copy()
+        # Alle ROIs in einem Schritt extrahieren
         roi_images = []
         roi_processed_images = []
         
-        for roi in rois:
-            # ROI einzeichnen
-            cv2.rectangle(image_with_rois, 
-                         (roi["x"], roi["y"]), 
-                         (roi["x"] + roi["w"], roi["y"] + roi["h"]), 
-                         roi["color"], 2)
-            cv2.putText(image_with_rois, roi["name"], 
-                        (roi["x"], roi["y"] - 5), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, roi["color"], 2)
-            
-            # Prüfen, ob die ROI innerhalb des Bildes liegt
-            if (roi["x"] >= 0 and roi["y"] >= 0 and 
-                roi["x"] + roi["w"] <= image.shape[1] and 
-                roi["y"] + roi["h"] <= image.shape[0]):
-                
-                # ROI extrahieren
-                roi_img = gray_image[roi["y"]:roi["y"]+roi["h"], roi["x"]:roi["x"]+roi["w"]]
+        for roi, roi_img in zip(rois, extract_rois(gray_image, offset)):
+            # Nur ROIs verwenden, die innerhalb des Bildes liegen
+            if roi_img is not None:
+                roi_images.append(roi_img)
                 
-                # Prüfen, ob ROI nicht leer ist
-                if roi_img.size > 0:
-                    roi_images.append(roi_img)
-                    
-                    # ROI verarbeiten
-                    # 1. Adaptive Threshold
-                    roi_adapt = cv2.adaptiveThreshold(roi_img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                                    cv2.THRESH_BINARY_INV, 11, 2)
-                    
-                    # 2. Minimale Verarbeitung mit Otsu-Thresholding
-                    roi_min = cv2.GaussianBlur(roi_img, (3, 3), 0)
-                    _, roi_min_thresh = cv2.threshold(roi_min, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-                    
-                    # 3. Vergrößerte Version für bessere OCR
-                    roi_resized = cv2.resize(roi_img, (roi_img.shape[1]*3, roi_img.shape[0]*3), 
-                                           interpolation=cv2.INTER_CUBIC)
-                    _, roi_resized_thresh = cv2.threshold(roi_resized, 0, 255, 
-                                                        cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-                    
-                    # Speichern der verarbeiteten ROIs
-                    roi_processed = {
-                        "original": roi_img,
-                        "adaptive": roi_adapt,
-                        "minimal": roi_min_thresh,
-                        "resized": roi_resized_thresh
-                    }
-                    roi_processed_images.append(roi_processed)
-                    
-                    # Speichern der ROIs als separate Bilder
-                    cv2.imwrite(os.path.join(cache_dir, f'{roi["name"].replace(" ", "_")}_original.png'), roi_img)
-                    cv2.imwrite(os.path.join(cache_dir, f'{roi["name"].replace(" ", "_")}_adaptive.png'), roi_adapt)
-                    cv2.imwrite(os.path.join(cache_dir, f'{roi["name"].replace(" ", "_")}_minimal.png'), roi_min_thresh)
-                    cv2.imwrite(os.path.join(cache_dir, f'{roi["name"].replace(" ", "_")}_resized.png'), roi_resized_thresh)
-                else:
-                    print(f"Warnung: ROI {roi['name']} ist leer oder außerhalb des Bildes.")
+                # Die übrigen Varianten (adaptive, minimal, resized) werden erst
+                # berechnet, wenn die OCR-Kaskade sie tatsächlich braucht
+                roi_processed_images.append({"original": roi_img})
             else:
                 print(f"Warnung: ROI {roi['name']} liegt außerhalb des Bildes und wird übersprungen.")
         
-        # Speichern des Bildes mit allen ROIs im Cache-Ordner
-        cv2.imwrite(os.path.join(cache_dir, 'image_with_all_rois.png'), image_with_rois)
+        if debug:
+            # ROIs in das gedrehte Farbbild einzeichnen (wird nur dafür dekodiert)
+            image_with_rois = cv2.rotate(cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR),
+                                         cv2.ROTATE_180)
+            for roi in rois:
+                cv2.rectangle(image_with_rois, 
+                             (roi["x"], roi["y"]), 
+                             (roi["x"] + roi["w"], roi["y"] + roi["h"]), 
+                             roi["color"], 2)
+                cv2.putText(image_with_rois, roi["name"], 
+                            (roi["x"], roi["y"] - 5), 
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, roi["color"], 2)
+            debug_artifacts.save(job_name, 'image_with_all_rois.png', image_with_rois)
         
-        # OCR-Konfigurationen für pytesseract
-        config_single_char = r'--oem 3 --psm 10 -c tessedit_char_whitelist=0123456789'
+        if quality_config["enabled"]:
+            reason = image_quality.check_rois(roi_images, quality_config)
+            if reason:
+                raise image_quality.ImageRejected(reason)
         
-        # EasyOCR Reader initialisieren
-        reader = easyocr.Reader(['de'], gpu=False, model_storage_directory=cache_dir)
+        # Führende Rollen, die sich seit dem letzten Stand nicht ändern konnten, werden übernommen
+        odometer_config = load_config()["odometer"]
+        timestamp = image_timestamp(image_path)
+        decoding = None
+        fixed = 0
+        if (odometer_config["enabled"] and previous is not None and timestamp is not None and
+                len(roi_processed_images) == len(rois)):
+            hours = (datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S') -
+                     datetime.strptime(previous[0], '%Y-%m-%d %H:%M:%S')).total_seconds() / 3600
+            previous_units = odometer.to_units(previous[1])
+            max_increase = odometer.max_increase_units(hours, odometer_config)
+            fixed = odometer.stable_prefix_length(previous_units, max_increase, len(rois))
+            decoding = (previous_units, max_increase)
         
-        # Sammeln aller Erkennungsergebnisse
-        all_recognition_results = []
+        # Unveränderte ROIs erkennen: Ziffer und Konfidenz werden vom letzten Bild übernommen
+        change_config = load_config()["change_detection"]
+        roi_originals = [roi_processed["original"] for roi_processed in roi_processed_images]
+        carried = [None] * len(roi_processed_images)
+        if change_config["enabled"] and roi_originals:
+            carried = roi_fingerprints.find_unchanged(roi_originals, change_config["min_correlation"])
         
-        # Hilfsfunktion für pytesseract Text und Konfidenz Extraktion
-        def extract_pytess_text_and_confidence(data):
-            texts = []
-            confs = []
-            
-            for i in range(len(data['text'])):
-                if data['text'][i].strip() and int(data['conf'][i]) > 0:  # Nur gültige Konfidenzwerte (> 0)
-                    texts.append(data['text'][i])
-                    confs.append(float(data['conf'][i]))
-            
-            if texts:
-                text = ' '.join(texts).strip()
-                avg_conf = sum(confs) / len(confs) if confs else 0
-                return text, avg_conf
-            else:
-                return "", 0.0
+        # Stellung der letzten Rolle (mit Bruchteil) aus dem Zeilenprofil, ohne OCR
+        timings = {}
+        drum_config = load_config()["fractional_wheel"]
+        last = len(roi_processed_images) - 1
+        drum_position = None
+        if (drum_config["enabled"] and len(roi_processed_images) == len(rois) and last >= fixed and
+                drum_profile.is_available()):
+            start = time.perf_counter()
+            position, score = drum_profile.estimate(roi_originals[last], drum_config["min_margin"])
+            timings["Trommelprofil"] = (1, time.perf_counter() - start)
+            if position is not None and score >= drum_config["min_correlation"]:
+                drum_position = position
+                drum_digit = str(int(position) % 10)
         
-        # Hilfsfunktion für EasyOCR Text und Konfidenz Extraktion
-        def extract_easyocr_text_and_confidence(result):
-            if not result:
-                return "", 0.0
-                
-            texts = []
-            confs = []
-            
-            for box in result:
-                texts.append(box[1])  # Text ist an zweiter Stelle
-                confs.append(box[2])  # Konfidenz ist an dritter Stelle
-            
-            text = ' '.join(texts).strip()
-            avg_conf = sum(confs) / len(confs) if confs else 0
-            return text, avg_conf * 100  # EasyOCR gibt Konfidenz zwischen 0-1, multiplizieren mit 100
+        # OCR-Kaskade nur für die übrigen ROIs ausführen
+        results_per_roi = [{} for _ in roi_processed_images]
+        ocr_indices = [i for i in range(fixed, len(roi_processed_images))
+                       if carried[i] is None and not (i == last and drum_position is not None)]
+        ocr_results = recognize_rois([roi_processed_images[i] for i in ocr_indices], timings)
+        for i, results in zip(ocr_indices, ocr_results):
+            results_per_roi[i] = results
+        for i in range(fixed, len(roi_processed_images)):
+            if carried[i] is not None:
+                results_per_roi[i] = {"Unverändert": {"text": carried[i][0], "conf": carried[i][1]}}
+        if drum_position is not None and carried[last] is None:
+            results_per_roi[last] = {"Trommelprofil": {"text": drum_digit, "conf": score * 100}}
+        
+        # Sammeln aller Erkennungsergebnisse
+        all_recognition_results = []
+        classifier_config = load_config()["classifier"]
         
-        # OCR für jede ROI durchführen
+        # Ergebnisse für jede ROI auswerten
         for i, roi in enumerate(rois):
             if i >= len(roi_processed_images):
                 print(f"Überspringe ROI {roi['name']}, da sie nicht erfolgreich verarbeitet wurde.")
@@ -167,89 +470,24 @@ def evaluate_image(image_path, csv_path):
             roi_processed = roi_processed_images[i]
             
             try:
-                # --- pytesseract OCR ---
-                # 1. Original mit pytesseract
-                try:
-                    data_original = pytesseract.image_to_data(roi_processed["original"], config=config_single_char, 
-                                                            output_type=pytesseract.Output.DICT)
-                    text_pytess_orig, conf_pytess_orig = extract_pytess_text_and_confidence(data_original)
-                except:
-                    text_pytess_orig, conf_pytess_orig = "", 0.0
-                
-                # 2. Adaptive mit pytesseract
-                try:
-                    data_adapt = pytesseract.image_to_data(roi_processed["adaptive"], config=config_single_char, 
-                                                        output_type=pytesseract.Output.DICT)
-                    text_pytess_adapt, conf_pytess_adapt = extract_pytess_text_and_confidence(data_adapt)
-                except:
-                    text_pytess_adapt, conf_pytess_adapt = "", 0.0
-                
-                # 3. Minimal mit pytesseract
-                try:
-                    data_min = pytesseract.image_to_data(roi_processed["minimal"], config=config_single_char, 
-                                                      output_type=pytesseract.Output.DICT)
-                    text_pytess_min, conf_pytess_min = extract_pytess_text_and_confidence(data_min)
-                except:
-                    text_pytess_min, conf_pytess_min = "", 0.0
+                # Speichern der berechneten ROI-Varianten als separate Bilder
+                if debug:
+                    for variant, variant_img in roi_processed.items():
+                        debug_artifacts.save(job_name, f'{roi["name"].replace(" ", "_")}_{variant}.png', variant_img)
                 
-                # 4. Vergrößert mit pytesseract
-                try:
-                    data_resized = pytesseract.image_to_data(roi_processed["resized"], config=config_single_char, 
-                                                          output_type=pytesseract.Output.DICT)
-                    text_pytess_resized, conf_pytess_resized = extract_pytess_text_and_confidence(data_resized)
-                except:
-                    text_pytess_resized, conf_pytess_resized = "", 0.0
+                results = results_per_roi[i]
                 
-                # --- EasyOCR ---
-                # 1. Original mit EasyOCR
-                try:
-                    result_original = reader.readtext(roi_processed["original"], 
-                                                    allowlist='0123456789', 
-                                                    detail=1)
-                    text_easyocr_orig, conf_easyocr_orig = extract_easyocr_text_and_confidence(result_original)
-                except:
-                    text_easyocr_orig, conf_easyocr_orig = "", 0.0
-                
-                # 2. Adaptive mit EasyOCR
-                try:
-                    result_adapt = reader.readtext(roi_processed["adaptive"], 
-                                               allowlist='0123456789', 
-                                               detail=1)
-                    text_easyocr_adapt, conf_easyocr_adapt = extract_easyocr_text_and_confidence(result_adapt)
-                except:
-                    text_easyocr_adapt, conf_easyocr_adapt = "", 0.0
-                
-                # 3. Minimal mit EasyOCR
-                try:
-                    result_min = reader.readtext(roi_processed["minimal"], 
-                                             allowlist='0123456789', 
-                                             detail=1)
-                    text_easyocr_min, conf_easyocr_min = extract_easyocr_text_and_confidence(result_min)
-                except:
-                    text_easyocr_min, conf_easyocr_min = "", 0.0
-                
-                # 4. Vergrößert mit EasyOCR
-                try:
-                    result_resized = reader.readtext(roi_processed["resized"], 
-                                                 allowlist='0123456789', 
-                                                 detail=1)
-                    text_easyocr_resized, conf_easyocr_resized = extract_easyocr_text_and_confidence(result_resized)
-                except:
-                    text_easyocr_resized, conf_easyocr_resized = "", 0.0
-                
-                # Ergebnis mit der besten Erkennung verwenden
-                results = {
-                    # pytesseract Ergebnisse
-                    "Pytesseract Original": {"text": text_pytess_orig, "conf": conf_pytess_orig},
-                    "Pytesseract Adaptive": {"text": text_pytess_adapt, "conf": conf_pytess_adapt},
-                    "Pytesseract Minimal": {"text": text_pytess_min, "conf": conf_pytess_min},
-                    "Pytesseract Vergrößert": {"text": text_pytess_resized, "conf": conf_pytess_resized},
-                    # EasyOCR Ergebnisse
-                    "EasyOCR Original": {"text": text_easyocr_orig, "conf": conf_easyocr_orig},
-                    "EasyOCR Adaptive": {"text": text_easyocr_adapt, "conf": conf_easyocr_adapt},
-                    "EasyOCR Minimal": {"text": text_easyocr_min, "conf": conf_easyocr_min},
-                    "EasyOCR Vergrößert": {"text": text_easyocr_resized, "conf": conf_easyocr_resized}
-                }
+                if i < fixed:
+                    previous_digit = f"{decoding[0]:0{len(rois)}d}"[i]
+                    all_recognition_results.append({
+                        "roi_name": roi["name"],
+                        "results": results,
+                        "best_method": "Vorheriger Stand",
+                        "best_confidence": 100.0,
+                        "detected_text": previous_digit,
+                        "extracted_digits": previous_digit
+                    })
+                    continue
                 
                 # Beste Methode auswählen
                 best_method = None
@@ -264,24 +502,20 @@ def evaluate_image(image_path, csv_path):
                 
                 # Wenn keine Methode erfolgreich war, Standard-Fallback
                 if not best_text:
-                    best_text = text_easyocr_orig if text_easyocr_orig else ""
+                    fallback = results.get("EasyOCR Original", {"text": "", "conf": 0.0})
+                    best_text = fallback["text"]
                     best_method = "EasyOCR Original"
-                    best_conf = conf_easyocr_orig
+                    best_conf = fallback["conf"]
                     
-                # Bereinigen - nur Ziffern behalten
-                extracted_digits = re.sub(r'\D', '', best_text)
-                
-                # Wenn keine Ziffer erkannt wurde, verwende 9 als Fallback
-                if not extracted_digits:
-                    extracted_digits = "9"
-                # Beschränke auf eine einzelne Ziffer (0-9)
-                elif len(extracted_digits) > 1:
-                    # Wenn mehrere Ziffern erkannt wurden, nimm nur die erste und begrenze auf 0-9
-                    extracted_digits = extracted_digits[0]
+                # Bereinigen - nur eine Ziffer behalten
+                extracted_digits = extract_digit(best_text)
                 
-                # Stelle sicher, dass nur Werte von 0-9 verwendet werden
-                if extracted_digits and (not extracted_digits.isdigit() or int(extracted_digits) > 9):
-                    extracted_digits = "9"  # Fallback, wenn ungültige Ziffer
+                # Sicher erkannte Ziffern als Trainingsbeispiele für den Klassifikator sammeln
+                if (extracted_digits and classifier_config["collect_samples"] and
+                    best_method not in ("Ziffern-Klassifikator", "Unverändert", "Trommelprofil") and
+                    best_conf >= classifier_config["collect_min_confidence"]):
+                    digit_classifier.add_sample(roi_processed["original"], extracted_digits,
+                                                classifier_config["max_samples_per_digit"], background=True)
                 
                 # Ergebnisse speichern
                 all_recognition_results.append({
@@ -300,9 +534,47 @@ def evaluate_image(image_path, csv_path):
                     "best_method": "Error",
                     "best_confidence": 0,
                     "detected_text": "",
-                    "extracted_digits": "9"  # Fallback-Wert
+                    "extracted_digits": ""
                 })
         
+        # Laufzeiten, gewinnende Methoden und Konfidenzen für die OCR-Statistik festhalten
+        if load_config()["telemetry"]["enabled"]:
+            try:
+                ocr_telemetry.record(timings, all_recognition_results)
+            except Exception as e:
+                print(f"Warnung: OCR-Statistik konnte nicht gespeichert werden: {e}")
+        
+        # Plausiblen Stand aus den OCR-Ergebnissen und dem vorherigen Stand bestimmen
+        if decoding is not None:
+            ocr_digits = "".join(result["extracted_digits"] or "?" for result in all_recognition_results)
+            value, _ = odometer.decode(decoding[0], decoding[1], odometer.digit_scores(results_per_roi, extract_digit))
+            confident = all(result["extracted_digits"] and
+                            result["best_confidence"] >= odometer_config["override_confidence"]
+                            for result in all_recognition_results[fixed:])
+            if confident and (value is None or f"{value:0{len(rois)}d}" != ocr_digits):
+                # Alle Rollen eindeutig erkannt: dem Bild mehr vertrauen als dem (evtl. falschen) vorherigen Stand
+                print(f"Warnung: Erkannter Stand {ocr_digits} passt nicht zum vorherigen Stand {previous[1]}, wird trotzdem übernommen.")
+            elif value is not None:
+                if f"{value:0{len(rois)}d}" != ocr_digits:
+                    print(f"OCR-Ergebnis {ocr_digits} zum plausiblen Stand {value:0{len(rois)}d} korrigiert.")
+                for result, digit in zip(all_recognition_results, f"{value:0{len(rois)}d}"):
+                    result["extracted_digits"] = digit
+        
+        # Ohne erkannte Ziffer kein Stand, statt einen falschen Wert einzutragen
+        if any(not result["extracted_digits"] for result in all_recognition_results):
+            print(f"Fehler: Nicht alle Ziffern erkannt ({''.join(r['extracted_digits'] or '?' for r in all_recognition_results)}).")
+            return None
+        
+        # Neu bestimmte Ausschnitte als Vergleichsbasis für das nächste Bild speichern
+        if change_config["enabled"] and len(roi_originals) == len(all_recognition_results):
+            try:
+                roi_fingerprints.store(roi_originals,
+                                       [result["extracted_digits"] for result in all_recognition_results],
+                                       [result["best_confidence"] for result in all_recognition_results],
+                                       [carried[i] is None for i in range(len(roi_originals))])
+            except Exception as e:
+                print(f"Warnung: ROI-Fingerabdrücke konnten nicht gespeichert werden: {e}")
+        
         # --- Zusammenfassung aller erkannten Zahlen ---
         all_digits = [(result["extracted_digits"], result["best_confidence"]) for result in all_recognition_results]
         
@@ -312,100 +584,22 @@ def evaluate_image(image_path, csv_path):
             if i < len(all_recognition_results):
                 combined_digits += digits
         
+        # Bruchteil der letzten Rolle als zusätzliche Nachkommastelle, wenn die Stellung zur Ziffer passt
+        fraction = ""
+        if drum_position is not None and combined_digits[-1:] == drum_digit:
+            fraction = str(int((drum_position % 1) * 10))
+        
         # Komma an vorvorletzter Stelle einfügen, wenn die Zahl lang genug ist
         if len(combined_digits) >= 3:
-            combined_digits_with_comma = combined_digits[:-2] + ',' + combined_digits[-2:]
+            combined_digits_with_comma = combined_digits[:-2] + ',' + combined_digits[-2:] + fraction
             csv_value = combined_digits_with_comma
         else:
             csv_value = combined_digits
         
-        # Extrahieren des Zeitstempels aus dem Bildnamen
-        image_filename = os.path.basename(image_path)
-        timestamp_match = re.search(r'cam_(\d{8})_(\d{6})\.jpg', image_filename)
-        
-        if timestamp_match:
-            date_part = timestamp_match.group(1)
-            time_part = timestamp_match.group(2)
-            
-            # Formatieren als YYYY-MM-DD HH:MM:SS
-            formatted_timestamp = f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:]} {time_part[:2]}:{time_part[2:4]}:{time_part[4:]}"
-            
-            # CSV-Datei aktualisieren
-            try:
-                # CSV-Datei mit pandas lesen
-                df = pd.read_csv(csv_path)
-                
-                # Prüfen, ob die nötigen Spalten existieren, falls nicht, hinzufügen
-                if 'Number' not in df.columns:
-                    df['Number'] = ""
-                
-                if 'Verbrauch' not in df.columns:
-                    df['Verbrauch'] = np.nan
-                
-                # Zeile mit dem Zeitstempel finden
-                matching_rows = df[df['Timestamp'] == formatted_timestamp]
-                
-                if len(matching_rows) > 0:
-                    # Zeitstempel gefunden, 'Number' mit erkannter Zahl aktualisieren
-                    row_index = matching_rows.index[0]
-                    
-                    # Anführungszeichen entfernen und Komma durch Punkt ersetzen
-                    clean_value = str(csv_value).strip('"').replace(',', '.')
-                    df.at[row_index, 'Number'] = clean_value
-                    
-                    # Verbrauch berechnen
-                    # Aktuellen Zählerstand in eine Fließkommazahl umwandeln
-                    current_value = float(clean_value)
-                    
-                    # Den Index der aktuellen Zeile in der sortierten DataFrame ermitteln
-                    df_sorted = df.sort_values(by='Timestamp')
-                    current_idx = df_sorted.index.get_loc(row_index)
-                    
-                    # Wenn es einen vorherigen Eintrag gibt, berechne Verbrauch
-                    if current_idx > 0 and current_idx < len(df_sorted):
-                        # Vorherigen Zählerstand holen
-                        prev_idx = df_sorted.index[current_idx - 1]
-                        prev_value_str = str(df_sorted.at[prev_idx, 'Number']).strip('"').replace(',', '.')
-                        prev_timestamp_str = df_sorted.at[prev_idx, 'Timestamp']
-                        
-                        # Prüfen, ob der vorherige Wert vorhanden ist
-                        if prev_value_str and prev_value_str != 'nan':
-                            prev_value = float(prev_value_str)
-                            
-                            # Zeitdifferenz berechnen
-                            current_timestamp = datetime.strptime(formatted_timestamp, '%Y-%m-%d %H:%M:%S')
-                            prev_timestamp = datetime.strptime(prev_timestamp_str, '%Y-%m-%d %H:%M:%S')
-                            time_diff_seconds = (current_timestamp - prev_timestamp).total_seconds()
-                            
-                            if time_diff_seconds > 0:
-                                # Differenz im Zählerstand (kWh)
-                                consumption_diff_kwh = current_value - prev_value
-                                
-                                # Verbrauch in Watt = (Differenz in kWh) * 1000 / (Zeit in Stunden)
-                                consumption_watts = (consumption_diff_kwh * 1000) / (time_diff_seconds / 3600)
-                                
-                                # In DataFrame eintragen
-                                df.at[row_index, 'Verbrauch'] = round(consumption_watts, 2)
-                    
-                    # Aktualisierte Daten zurückschreiben
-                    df.to_csv(csv_path, index=False)
-                    print(f"CSV-Datei erfolgreich aktualisiert. Nummer {clean_value} für Zeitstempel {formatted_timestamp} eingetragen.")
-                    
-                    # Ausgabe des berechneten Verbrauchs, wenn vorhanden
-                    if not pd.isna(df.at[row_index, 'Verbrauch']):
-                        print(f"Verbrauch: {df.at[row_index, 'Verbrauch']} Watt")
-                else:
-                    print(f"Warnung: Kein Eintrag mit Zeitstempel {formatted_timestamp} in der CSV-Datei gefunden.")
-                    
-            except Exception as e:
-                print(f"Fehler beim Aktualisieren der CSV-Datei: {e}")
-                return None
-        else:
-            print(f"Warnung: Konnte keinen Zeitstempel aus dem Bildnamen '{image_filename}' extrahieren.")
-            return None
-            
         return csv_value
         
+    except image_quality.ImageRejected:
+        raise
     except pytesseract.TesseractNotFoundError:
         print("Fehler: Tesseract wurde nicht gefunden.")
         print("Stellen Sie sicher, dass Tesseract OCR installiert ist und der Pfad ggf.")
@@ -415,6 +609,118 @@ def evaluate_image(image_path, csv_path):
         print(f"Ein Fehler ist während der Bildauswertung aufgetreten: {e}")
         return None
 
+def image_timestamp(image_path):
+    """Liest den Aufnahmezeitpunkt aus dem Bildnamen (cam_YYYYMMDD_HHMMSS.jpg) als "YYYY-MM-DD HH:MM:SS" oder None."""
+    timestamp_match = re.search(r'cam_(\d{8})_(\d{6})\.jpg', os.path.basename(image_path))
+    if not timestamp_match:
+        return None
+    date_part = timestamp_match.group(1)
+    time_part = timestamp_match.group(2)
+    return f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:]} {time_part[:2]}:{time_part[2:4]}:{time_part[4:]}"
+
+def load_readings(csv_path):
+    """
+    Liest die bisher erkannten Zählerstände (siehe readings_store.py), sortiert nach Zeitstempel.
+    Ausreißer nach oben (größer als der nächste Stand) werden verworfen, da der Zähler nur steigen kann.
+    
+    Returns:
+        DataFrame mit den Spalten Timestamp und Value (leer, wenn keine Stände vorhanden sind)
+    """
+    df = readings_store.values(csv_path)
+    return df[df['Value'] <= df['Value'].shift(-1).fillna(df['Value'])].reset_index(drop=True)
+
+def previous_reading(readings, image_path):
+    """Gibt (Zeitstempel, Zählerstand) des letzten Standes vor der Aufnahme des Bildes zurück oder None."""
+    timestamp = image_timestamp(image_path)
+    if timestamp is None or readings.empty:
+        return None
+    position = readings['Timestamp'].searchsorted(timestamp) - 1
+    if position < 0:
+        return None
+    return readings.at[position, 'Timestamp'], float(readings.at[position, 'Value'])
+
+def find_previous_reading(csv_path, image_path):
+    """Sucht den letzten Zählerstand vor der Aufnahme des Bildes über den Index (None, wenn keiner bekannt ist)."""
+    timestamp = image_timestamp(image_path)
+    if timestamp is None:
+        return None
+    try:
+        return readings_store.previous_value(csv_path, timestamp)
+    except Exception as e:
+        print(f"Warnung: Vorheriger Zählerstand konnte nicht gelesen werden: {e}")
+        return None
+
+def update_gas_csv(image_path, csv_path, csv_value):
+    """
+    Trägt einen erkannten Zählerstand in die Zählerstands-Datenbank zur CSV-Datei ein (siehe
+    readings_store.py) und berechnet den Verbrauch zum vorherigen Stand. Die Zeile wird über
+    den Zeitstempel im Bildnamen gefunden.
+    
+    Args:
+        image_path: Pfad zum Bild (cam_YYYYMMDD_HHMMSS.jpg)
+        csv_path: Pfad zur CSV-Datei mit den Sensordaten
+        csv_value: Erkannter Zahlenwert (z.B. "1234,56")
+    
+    Returns:
+        Der eingetragene Zahlenwert oder None im Fehlerfall
+    """
+    formatted_timestamp = image_timestamp(image_path)
+    if not formatted_timestamp:
+        print(f"Warnung: Konnte keinen Zeitstempel aus dem Bildnamen '{os.path.basename(image_path)}' extrahieren.")
+        return None
+    
+    try:
+        found, consumption = readings_store.set_number(csv_path, formatted_timestamp, csv_value)
+    except Exception as e:
+        print(f"Fehler beim Eintragen des Zählerstandes: {e}")
+        return None
+    if not found:
+        print(f"Warnung: Kein Eintrag mit Zeitstempel {formatted_timestamp} gefunden.")
+        return csv_value
+    print(f"Nummer {str(csv_value).replace(',', '.')} für Zeitstempel {formatted_timestamp} eingetragen.")
+    if consumption is not None:
+        print(f"Verbrauch: {consumption} Watt")
+    return csv_value
+
+def mark_rejected(image_path, csv_path, reason):
+    """
+    Trägt den Grund, aus dem ein Bild vor der OCR verworfen wurde, in der Spalte
+    'Verworfen' der zugehörigen Zeile ein.
+    
+    Returns:
+        True, wenn die Zeile gefunden und aktualisiert wurde
+    """
+    formatted_timestamp = image_timestamp(image_path)
+    if not formatted_timestamp:
+        return False
+    try:
+        return readings_store.set_rejected(csv_path, formatted_timestamp, reason)
+    except Exception as e:
+        print(f"Fehler beim Eintragen des Ablehnungsgrundes: {e}")
+        return False
+
+def evaluate_image(image_path, csv_path):
+    """
+    Wertet ein Bild aus und aktualisiert die CSV-Datei mit dem erkannten Zahlenwert.
+    
+    Args:
+        image_path: Pfad zum Bild
+        csv_path: Pfad zur CSV-Datei mit den Sensordaten
+    
+    Returns:
+        Erkannter Zahlenwert oder None im Fehlerfall
+    """
+    try:
+        csv_value = recognize_reading(image_path, find_previous_reading(csv_path, image_path))
+    except image_quality.ImageRejected as e:
+        print(f"Bild verworfen: {e.args[0]}")
+        mark_rejected(image_path, csv_path, e.args[0])
+        return None
+    if csv_value is None:
+        return None
+    
+    return update_gas_csv(image_path, csv_path, csv_value)
+
 if __name__ == "__main__":
     # Beim direkten Ausführen des Skripts können Bild und CSV-Pfad als Argumente übergeben werden
     import argparse
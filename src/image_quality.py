@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+
+# Schnelle Qualitätsprüfung direkt nach dem Dekodieren: Bilder, auf denen die Ziffern nicht
+# lesbar sein können (Blitz ausgefallen, überbelichtet, verwackelt, ROI ohne Kontrast),
+# werden in wenigen Millisekunden verworfen, statt die ganze OCR-Kaskade zu durchlaufen.
+# Die Schwellen stehen im Abschnitt "quality_gate" der OCR-Konfiguration.
+
+class ImageRejected(Exception):
+    """Das Bild hat die Qualitätsprüfung nicht bestanden; args[0] enthält den Grund."""
+
+def check_frame(gray_image, config):
+    """
+    Prüft die Helligkeit des ganzen Bildes anhand des Histogramms.
+
+    Returns:
+        Grund der Ablehnung oder None, wenn das Bild brauchbar ist
+    """
+    histogram = cv2.calcHist([gray_image], [0], None, [256], [0, 256]).ravel()
+    total = histogram.sum()
+    if not total:
+        return "Leeres Bild"
+    brightness = float(np.dot(histogram, np.arange(256)) / total)
+    if brightness < config["min_brightness"]:
+        return f"Zu dunkel (Helligkeit {brightness:.0f} < {config['min_brightness']})"
+    overexposed = float(histogram[250:].sum() / total)
+    if overexposed > config["max_overexposed"]:
+        return f"Überbelichtet ({overexposed * 100:.0f} % gesättigte Pixel)"
+    return None
+
+def check_rois(roi_images, config):
+    """
+    Prüft Schärfe (Varianz des Laplace-Filters) und Kontrast (Abstand 5. zu 95. Perzentil)
+    der ROI-Ausschnitte. Die Schärfe wird über alle ROIs gemittelt, der Kontrast muss in
+    jeder ROI reichen.
+
+    Returns:
+        Grund der Ablehnung oder None, wenn die Ausschnitte brauchbar sind
+    """
+    if not roi_images:
+        return None
+    sharpness = float(np.mean([cv2.Laplacian(img, cv2.CV_32F).var() for img in roi_images]))
+    if sharpness < config["min_sharpness"]:
+        return f"Unscharf (Laplace-Varianz {sharpness:.0f} < {config['min_sharpness']})"
+    for i, img in enumerate(roi_images):
+        low, high = np.percentile(img, (5, 95))
+        if high - low < config["min_roi_contrast"]:
+            return f"Kein Kontrast in ROI {i + 1} ({high - low:.0f} < {config['min_roi_contrast']})"
+    return None
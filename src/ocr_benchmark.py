@@ -0,0 +1,80 @@
+import os
+import time
+import odometer
+from image_evaluator import (ROIS, OCR_METHODS, load_gray_image, extract_rois, align_rois, get_variants,
+                             run_ocr_method, extract_digit, image_timestamp, load_readings)
+
+# Vergleicht die Erkennung pro ROI ("roi") mit der Zeilen-Erkennung über alle Rollen ("strip")
+# auf archivierten Kamerabildern. Als Soll-Wert dient der Zählerstand aus der CSV-Datei zum
+# Aufnahmezeitpunkt des Bildes; Bilder ohne plausiblen Stand werden übersprungen.
+
+MODES = ["roi", "strip"]
+
+def benchmark(image_paths, csv_path, limit=None):
+    """
+    Führt jede OCR-Methode (ohne Klassifikator) in beiden Modi für alle ROIs der Bilder aus.
+
+    Returns:
+        Dictionary {(Methode, Modus): {"images", "digits", "correct", "seconds"}}
+    """
+    readings = load_readings(csv_path)
+    expected = {timestamp: f"{odometer.to_units(value):0{len(ROIS)}d}"
+                for timestamp, value in zip(readings['Timestamp'], readings['Value'])}
+    methods = [(method, engine, variant) for method, engine, variant in OCR_METHODS if engine != "classifier"]
+    stats = {(method, mode): {"images": 0, "digits": 0, "correct": 0, "seconds": 0.0}
+             for method, _, _ in methods for mode in MODES}
+
+    evaluated = 0
+    for image_path in image_paths:
+        digits = expected.get(image_timestamp(image_path))
+        if digits is None or len(digits) != len(ROIS):
+            continue
+        gray_image = load_gray_image(image_path)
+        if gray_image is None:
+            continue
+        crops = extract_rois(gray_image, align_rois(gray_image))
+        if any(crop is None for crop in crops):
+            continue
+        roi_processed_images = [{"original": crop} for crop in crops]
+
+        for method, engine, variant in methods:
+            images = get_variants(roi_processed_images, variant)
+            for mode in MODES:
+                start = time.perf_counter()
+                results = run_ocr_method(engine, images, mode)
+                entry = stats[(method, mode)]
+                entry["seconds"] += time.perf_counter() - start
+                entry["images"] += 1
+                entry["digits"] += len(digits)
+                entry["correct"] += sum(extract_digit(text) == digit for (text, _), digit in zip(results, digits))
+
+        evaluated += 1
+        if limit and evaluated >= limit:
+            break
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    from image_evaluator import configure_threads
+
+    parser = argparse.ArgumentParser(description='Erkennung pro ROI und als Zeile vergleichen')
+    parser.add_argument('--images', type=str, help='Ordner mit den Kamerabildern')
+    parser.add_argument('--csv', type=str, help='CSV-Datei mit den Zählerständen')
+    parser.add_argument('--limit', type=int, default=None, help='Höchstens so viele Bilder auswerten')
+    args = parser.parse_args()
+
+    images_dir = args.images or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'camera_images')
+    csv_path = args.csv or os.path.join(os.path.dirname(__file__), 'gas_data.csv')
+    image_paths = sorted(os.path.join(images_dir, f) for f in os.listdir(images_dir)
+                         if f.startswith('cam_') and f.endswith('.jpg'))
+
+    configure_threads()
+    stats = benchmark(image_paths, csv_path, args.limit)
+    for (method, mode), s in stats.items():
+        if not s["images"]:
+            continue
+        print(f"{method:<24} {mode:<6} Bilder: {s['images']:>5}  "
+              f"Richtig: {s['correct'] / s['digits'] * 100:5.1f} %  Ø {s['seconds'] / s['images'] * 1000:7.1f} ms/Bild")
+    if not any(s["images"] for s in stats.values()):
+        print(f"Keine Bilder mit passendem Zählerstand in '{csv_path}' gefunden.")
@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+CACHE_DB = os.getenv("OCR_CACHE_DB", os.path.join(BASE_DIR, 'data', 'ocr_cache.sqlite3'))
+SIZE_CHECK_INTERVAL = 500  # Nach so vielen neuen Einträgen pro Prozess wird die Größe der Datei geprüft
+EVICT_TARGET = 0.9         # Beim Überschreiten der Größe bis auf diesen Anteil von max_disk_mb löschen
+# --- Ende Konfiguration ---
+
+# OCR-Ergebnisse nach Inhalt: Der Schlüssel ist ein Hash über die Bytes des Ausschnitts, die
+# Bildvariante, den Erkennungsmodus und die Engine samt Version. Ein unveränderter Ausschnitt
+# wird daher nie zweimal von derselben Engine erkannt, etwa beim erneuten Auswerten des Archivs.
+# Vor der SQLite-Datei (von allen Worker-Prozessen geteilt) liegt pro Prozess ein LRU-Speicher.
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+_inserts = 0
+
+def _connect():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(CACHE_DB, timeout=30, isolation_level=None)
+        _local.conn = conn
+    return conn
+
+def _init_db():
+    """Legt die Tabelle an (einmal pro Prozess)."""
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        db_dir = os.path.dirname(CACHE_DB)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        conn = _connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_results (
+                key BLOB PRIMARY KEY,
+                text TEXT NOT NULL,
+                conf REAL NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_results_last_used ON ocr_results (last_used)")
+        _initialized = True
+
+def _digest(image):
+    """Hash über Form und Bytes eines Ausschnitts."""
+    image = np.ascontiguousarray(image)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(image.shape).encode())
+    h.update(image.data)
+    return h.digest()
+
+def make_keys(engine_id, variant, images, mode, strip=None):
+    """
+    Schlüssel für die Ergebnisse einer Engine auf mehreren Ausschnitten.
+
+    Args:
+        engine_id: Engine samt Version und Einstellungen (siehe ocr_engines.engine_version)
+        variant: Name der Bildvariante
+        images: Ausschnitte der Variante
+        mode: "roi" oder "strip"
+        strip: Im Zeilen-Modus (streifen, x-bereiche) aus ocr_engines.strip_layout. Jedes Ergebnis
+               hängt dort von den Nachbarn auf dem Streifen ab, der Schlüssel enthält daher den
+               ganzen Streifen, die Lage der Ausschnitte und die Position
+
+    Returns:
+        Liste von Schlüsseln (bytes) in der Reihenfolge der Ausschnitte
+    """
+    prefix = f"{engine_id}\0{variant}\0{mode}\0".encode()
+    if mode == "strip":
+        canvas, slots = strip
+        layout = _digest(canvas) + repr(slots).encode()
+        digests = [layout + f"\0{i}".encode() for i in range(len(images))]
+    else:
+        digests = [_digest(img) for img in images]
+    return [hashlib.blake2b(prefix + d, digest_size=16).digest() for d in digests]
+
+def _write(conn, sql, rows):
+    """Schreibt mehrere Zeilen in einer Transaktion."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(sql, rows)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _remember(key, value, memory_entries):
+    with _memory_lock:
+        _memory[key] = value
+        _memory.move_to_end(key)
+        while len(_memory) > memory_entries:
+            _memory.popitem(last=False)
+
+def get_many(keys, config):
+    """
+    Sucht Ergebnisse zuerst im Speicher, dann in der Datei.
+
+    Args:
+        config: Abschnitt "ocr_cache" der OCR-Konfiguration
+
+    Returns:
+        Pro Schlüssel (text, konfidenz) oder None
+    """
+    results = [None] * len(keys)
+    missing = []
+    with _memory_lock:
+        for i, key in enumerate(keys):
+            value = _memory.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                _memory.move_to_end(key)
+                results[i] = value
+    if not missing or not config["max_disk_mb"]:
+        return results
+
+    _init_db()
+    conn = _connect()
+    wanted = [keys[i] for i in missing]
+    rows = conn.execute(f"SELECT key, text, conf FROM ocr_results WHERE key IN ({','.join('?' * len(wanted))})",
+                        wanted).fetchall()
+    found = {bytes(key): (text, conf) for key, text, conf in rows}
+    if found:
+        # Zugriffszeit für die Verdrängung aktualisieren; Treffer im Speicher ändern die Datei nicht,
+        # dort ist die Zugriffszeit daher nur ungefähr
+        now = time.time()
+        _write(conn, "UPDATE ocr_results SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+    for i in missing:
+        value = found.get(keys[i])
+        if value is not None:
+            results[i] = value
+            _remember(keys[i], value, config["memory_entries"])
+    return results
+
+def put_many(items, config):
+    """
+    Speichert Ergebnisse im Speicher und in der Datei.
+
+    Args:
+        items: Liste von (schlüssel, (text, konfidenz))
+        config: Abschnitt "ocr_cache" der OCR-Konfiguration
+    """
+    global _inserts
+    if not items:
+        return
+    for key, value in items:
+        _remember(key, value, config["memory_entries"])
+    if not config["max_disk_mb"]:
+        return
+
+    _init_db()
+    conn = _connect()
+    now = time.time()
+    _write(conn, "INSERT OR REPLACE INTO ocr_results (key, text, conf, last_used) VALUES (?, ?, ?, ?)",
+           [(key, text, float(conf), now) for key, (text, conf) in items])
+    _inserts += len(items)
+    if _inserts >= SIZE_CHECK_INTERVAL:
+        _inserts = 0
+        _evict(conn, config["max_disk_mb"])
+
+def _evict(conn, max_disk_mb):
+    """Löscht die am längsten nicht genutzten Einträge, sobald die Datei größer als max_disk_mb ist."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    used_pages = conn.execute("PRAGMA page_count").fetchone()[0] - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    size = used_pages * page_size
+    limit = max_disk_mb * 1024 * 1024
+    if size <= limit:
+        return
+    count = conn.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+    # Einträge sind etwa gleich groß: anteilig löschen, freie Seiten werden wiederverwendet
+    remove = count - int(count * EVICT_TARGET * limit / size)
+    conn.execute("DELETE FROM ocr_results WHERE key IN "
+                 "(SELECT key FROM ocr_results ORDER BY last_used LIMIT ?)", (remove,))
+    print(f"OCR-Cache: {remove} alte Einträge gelöscht ({size / 1024 / 1024:.1f} MB > {max_disk_mb} MB).")
+
+def clear():
+    """Leert den Speicher und die Datei (z.B. nach einem Wechsel der Tesseract-Sprachdaten)."""
+    with _memory_lock:
+        _memory.clear()
+    _init_db()
+    _connect().execute("DELETE FROM ocr_results")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='OCR-Cache anzeigen oder leeren')
+    parser.add_argument('--clear', action='store_true', help='Alle gespeicherten Ergebnisse löschen')
+    args = parser.parse_args()
+
+    if args.clear:
+        clear()
+        print(f"OCR-Cache geleert ({CACHE_DB}).")
+    else:
+        _init_db()
+        conn = _connect()
+        count = conn.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+        size = os.path.getsize(CACHE_DB) / 1024 / 1024
+        print(f"OCR-Cache: {count} Ergebnisse, {size:.1f} MB ({CACHE_DB})")
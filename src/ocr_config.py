@@ -0,0 +1,159 @@
+import os
+import json
+import copy
+import threading
+
+# Pfad zur OCR-Konfigurationsdatei (JSON). Fehlt die Datei, gelten die Standardwerte unten.
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+CONFIG_FILE = os.getenv("OCR_CONFIG_FILE", os.path.join(BASE_DIR, 'ocr_config.json'))
+
+# Standardwerte; die Datei muss nur die Werte enthalten, die davon abweichen
+DEFAULT_CONFIG = {
+    # Konfidenz-Kaskade: Methoden werden der Reihe nach ausprobiert, bis eine ihre Schwelle erreicht
+    "cascade": {
+        "enabled": True,
+        "default_threshold": 90,
+        "thresholds": {
+            "Ziffern-Klassifikator": 80,
+            "Pytesseract Minimal": 85,
+            "Pytesseract Original": 85,
+            "Pytesseract Adaptive": 85,
+            "EasyOCR Original": 90,
+            "EasyOCR Minimal": 90,
+            "EasyOCR Adaptive": 90,
+            "Pytesseract Vergrößert": 85,
+            "EasyOCR Vergrößert": 90
+        }
+    },
+    # Erkennung des Gaszählers: "roi" erkennt jede Rolle einzeln, "strip" legt alle Rollen auf einen
+    # Streifen und erkennt sie mit einem Zeilen-Aufruf pro Methode (Vergleich: ocr_benchmark.py)
+    "recognition": {
+        "mode": "roi"
+    },
+    # Backend des EasyOCR-Erkenners: "torch" (EasyOCR mit PyTorch) oder "onnx" (nach ONNX exportiertes
+    # int8-Modell ohne PyTorch, siehe onnx_recognizer.py; fehlt es, wird PyTorch verwendet)
+    "easyocr": {
+        "backend": "torch"
+    },
+    # Qualitätsprüfung vor der OCR (siehe image_quality.py): mittlere Helligkeit 0-255, Anteil
+    # gesättigter Pixel, Schärfe als Varianz des Laplace-Filters über die ROIs, Kontrast je ROI
+    "quality_gate": {
+        "enabled": False,
+        "min_brightness": 25,
+        "max_overexposed": 0.5,
+        "min_sharpness": 15,
+        "min_roi_contrast": 30
+    },
+    # ROI-Ausrichtung bei verrutschter Kamera (siehe roi_alignment.py): Vergleich mit dem Referenzbild
+    # auf einem um "scale" verkleinerten Bild. Die gespeicherte Verschiebung gilt, solange die
+    # Korrelation der Kantenbilder mindestens min_correlation erreicht; eine neu bestimmte
+    # Verschiebung wird nur übernommen, wenn die Phasenkorrelation min_response erreicht
+    # und die Verschiebung höchstens max_shift Pixel beträgt
+    "alignment": {
+        "enabled": False,
+        "scale": 0.25,
+        "min_correlation": 0.88,
+        "min_response": 0.1,
+        "max_shift": 80
+    },
+    # Bruchteil der letzten Rolle aus dem Zeilenprofil (siehe drum_profile.py): ersetzt die OCR der
+    # letzten Rolle, wenn das Profil mindestens min_correlation erreicht und um min_margin besser passt als
+    # jede mindestens eine halbe Ziffer entfernte Stellung, und ergänzt eine dritte Nachkommastelle
+    "fractional_wheel": {
+        "enabled": True,
+        "min_correlation": 0.9,
+        "min_margin": 0.02
+    },
+    # Zählwerk-Plausibilität: der Stand kann seit dem letzten Stand nur um einen begrenzten Verbrauch steigen
+    "odometer": {
+        "enabled": True,
+        # Größter möglicher Verbrauch in m³ pro Stunde, zuzüglich eines festen Spielraums in m³
+        "max_increase_per_hour": 5.0,
+        "min_increase": 0.5,
+        # Sind alle Rollen mindestens so sicher erkannt, gilt das Bild auch entgegen dem vorherigen Stand
+        "override_confidence": 98
+    },
+    # Unveränderte ROIs überspringen: Korrelation mit dem zuletzt erkannten Ausschnitt derselben ROI
+    "change_detection": {
+        "enabled": False,
+        "min_correlation": 0.98
+    },
+    # Trainierter Ziffern-Klassifikator, siehe digit_classifier.py
+    "classifier": {
+        "enabled": True,
+        # Mindestabstand der Korrelation zwischen bester und zweitbester Ziffer, sonst übernimmt die OCR
+        "min_margin": 0.05,
+        # Sicher erkannte Ziffern als Trainingsbeispiele speichern
+        "collect_samples": False,
+        "collect_min_confidence": 95,
+        "max_samples_per_digit": 300
+    },
+    # Threads pro OCR-Prozess (0 = automatisch: Kerne / Anzahl Worker-Prozesse).
+    # "roi": parallele Tesseract-Erkennung der ROIs eines Bildes (wirkt nach einem Neustart),
+    # "torch": Threads für EasyOCR (auch mit dem ONNX-Backend), "opencv": Threads für die Bildvorverarbeitung (automatisch 1)
+    "threads": {
+        "roi": 0,
+        "torch": 0,
+        "opencv": 0
+    },
+    # OCR-Ergebnisse nach Inhalt des Ausschnitts speichern (siehe ocr_cache.py): bis zu memory_entries
+    # pro Prozess im Speicher, dazu in einer SQLite-Datei von höchstens max_disk_mb MB (0 = nur im Speicher)
+    "ocr_cache": {
+        "enabled": True,
+        "memory_entries": 20000,
+        "max_disk_mb": 200
+    },
+    # Debug-Bilder (eingezeichnete ROIs und alle ROI-Varianten) unter cache/debug/<bildname>/ speichern
+    "debug_artifacts": {
+        "enabled": False
+    },
+    # OCR-Statistik pro Methode (Laufzeit, Siege, Konfidenzverteilung), siehe ocr_telemetry.py
+    "telemetry": {
+        "enabled": True,
+        # Adaptiver Modus: Methoden, die nach min_runs Läufen seltener als min_win_rate
+        # gewinnen, ans Ende schieben ("deprioritize") oder ganz weglassen ("drop")
+        "adaptive": {
+            "enabled": False,
+            "mode": "deprioritize",
+            "min_runs": 500,
+            "min_win_rate": 0.01
+        }
+    }
+}
+
+_config = None
+_config_mtime = None
+_config_lock = threading.Lock()
+
+def _merge(base, override):
+    """Überschreibt die Werte in base rekursiv mit denen aus override."""
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+def load_config():
+    """
+    Gibt die OCR-Konfiguration zurück. Die Datei wird nur neu gelesen, wenn sie
+    sich geändert hat, Anpassungen greifen also ohne Neustart des Servers.
+    """
+    global _config, _config_mtime
+    try:
+        mtime = os.path.getmtime(CONFIG_FILE)
+    except OSError:
+        mtime = None
+
+    with _config_lock:
+        if _config is None or mtime != _config_mtime:
+            config = copy.deepcopy(DEFAULT_CONFIG)
+            if mtime is not None:
+                try:
+                    with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                        _merge(config, json.load(f))
+                except (OSError, ValueError) as e:
+                    print(f"Warnung: OCR-Konfiguration '{CONFIG_FILE}' konnte nicht gelesen werden: {e}")
+            _config = config
+            _config_mtime = mtime
+        return _config
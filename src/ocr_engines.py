@@ -0,0 +1,299 @@
+import os
+import threading
+import numpy as np
+import pytesseract
+from roi_batch import make_strip
+import onnx_recognizer
+
+# Optionale direkte Anbindung an die Tesseract-C-API (pip install tesserocr).
+# Ohne tesserocr wird auf pytesseract zurückgegriffen, das pro Aufruf einen tesseract-Prozess startet.
+# Auch andere Fehler beim Import (z.B. cysignals außerhalb des Hauptthreads) führen zu pytesseract.
+try:
+    import tesserocr
+except Exception:
+    tesserocr = None
+
+# Basis- und Cache-Verzeichnis (dort liegen auch die EasyOCR-Modelle)
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+
+# Erlaubte Zeichen für alle Engines
+DIGITS = '0123456789'
+
+# OCR-Konfiguration für pytesseract: einzelnes Zeichen, nur Ziffern
+TESSERACT_CONFIG = r'--oem 3 --psm 10 -c tessedit_char_whitelist=0123456789'
+# Dasselbe für eine ganze Zeile (Zeilen-Modus über alle Rollen)
+TESSERACT_LINE_CONFIG = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789'
+
+# Abstand zwischen den Ausschnitten auf dem Streifen für die Zeilen-Erkennung
+STRIP_GAP = 16
+
+# Abstand zwischen den Ausschnitten auf der Leinwand für die Batch-Erkennung
+BATCH_GAP = 8
+
+# Prozessweit geteilter EasyOCR-Reader, wird beim ersten Gebrauch geladen
+_reader = None
+_reader_lock = threading.Lock()
+
+def get_reader():
+    """
+    Gibt den EasyOCR-Reader des Prozesses zurück. Die Modelle werden nur beim
+    ersten Aufruf von der Festplatte geladen und danach von allen Auswertungen geteilt.
+    """
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                # Erst hier importiert: mit dem ONNX-Backend wird PyTorch gar nicht geladen
+                import easyocr
+                if not os.path.exists(CACHE_DIR):
+                    os.makedirs(CACHE_DIR)
+                _reader = easyocr.Reader(['de'], gpu=False, model_storage_directory=CACHE_DIR)
+    return _reader
+
+# Tesseract-API-Handle pro Thread (die API ist nicht threadsicher)
+_tess_local = threading.local()
+
+def _get_tesseract_api(line=False):
+    """
+    Gibt das Tesseract-API-Handle des aktuellen Threads zurück. Es wird einmal mit
+    PSM 10 (einzelnes Zeichen) bzw. PSM 7 (eine Zeile, für line=True) und der
+    Ziffern-Whitelist initialisiert und danach für alle Erkennungen wiederverwendet.
+
+    Returns:
+        Das Handle oder None, wenn tesserocr fehlt oder sich nicht initialisieren lässt
+        (z.B. falscher TESSDATA_PREFIX); dann wird pytesseract verwendet.
+    """
+    if tesserocr is None:
+        return None
+    name = 'line_api' if line else 'api'
+    api = getattr(_tess_local, name, None)
+    if api is None:
+        # TESSDATA_PREFIX zeigt auf das tessdata-Verzeichnis, falls tesserocr es nicht selbst findet
+        tessdata = os.getenv("TESSDATA_PREFIX")
+        kwargs = {'path': tessdata} if tessdata else {}
+        psm = tesserocr.PSM.SINGLE_LINE if line else tesserocr.PSM.SINGLE_CHAR
+        try:
+            api = tesserocr.PyTessBaseAPI(psm=psm, oem=tesserocr.OEM.DEFAULT, **kwargs)
+            api.SetVariable('tessedit_char_whitelist', DIGITS)
+        except RuntimeError as e:
+            # Nur einmal pro Thread versuchen und melden, danach gleich pytesseract nehmen
+            print(f"Warnung: tesserocr konnte nicht initialisiert werden ({e}), verwende pytesseract.")
+            api = False
+        setattr(_tess_local, name, api)
+    return api or None
+
+# Versionskennung pro Engine für den OCR-Cache, einmal pro Prozess bestimmt
+_engine_versions = {}
+
+def engine_version(engine, backend="torch"):
+    """
+    Kennung einer Engine samt Version und Einstellungen. Ändert sie sich (Update, anderes
+    Backend, neu exportiertes Modell), passen die gespeicherten OCR-Ergebnisse nicht mehr.
+    """
+    key = (engine, backend)
+    if key not in _engine_versions:
+        if engine == "easyocr" and backend == "onnx":
+            stat = os.stat(onnx_recognizer.MODEL_FILE)
+            version = f"easyocr-onnx {stat.st_size} {stat.st_mtime_ns}"
+        elif engine == "easyocr":
+            from importlib.metadata import version as package_version
+            version = f"easyocr {package_version('easyocr')}"
+        elif tesserocr is not None:
+            version = f"tesserocr {tesserocr.tesseract_version().split()[1]} {os.getenv('TESSDATA_PREFIX', '')}"
+        else:
+            version = f"pytesseract {pytesseract.get_tesseract_version()}"
+        _engine_versions[key] = f"{version} {DIGITS} {TESSERACT_CONFIG} {TESSERACT_LINE_CONFIG}"
+    return _engine_versions[key]
+
+def set_torch_threads(threads):
+    """Begrenzt die Threads, die PyTorch (EasyOCR) pro Prozess für eine Berechnung nutzt."""
+    import torch
+    torch.set_num_threads(threads)
+
+def extract_pytess_text_and_confidence(data):
+    """Fasst die Ergebnisse von pytesseract.image_to_data zu Text und Konfidenz zusammen."""
+    texts = []
+    confs = []
+
+    for i in range(len(data['text'])):
+        if data['text'][i].strip() and int(data['conf'][i]) > 0:  # Nur gültige Konfidenzwerte (> 0)
+            texts.append(data['text'][i])
+            confs.append(float(data['conf'][i]))
+
+    if texts:
+        text = ' '.join(texts).strip()
+        avg_conf = sum(confs) / len(confs) if confs else 0
+        return text, avg_conf
+    else:
+        return "", 0.0
+
+def tesseract_recognize(image):
+    """
+    Erkennt eine einzelne Ziffer mit Tesseract. Mit tesserocr wird der NumPy-Puffer
+    direkt an das initialisierte API-Handle übergeben, ohne Prozessstart und temporäre Datei.
+
+    Args:
+        image: Graustufen-Ausschnitt (NumPy-Array, uint8)
+
+    Returns:
+        (text, konfidenz in Prozent), wie bei pytesseract.image_to_data
+    """
+    api = _get_tesseract_api()
+    if api is None:
+        data = pytesseract.image_to_data(image, config=TESSERACT_CONFIG, output_type=pytesseract.Output.DICT)
+        return extract_pytess_text_and_confidence(data)
+
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width = image.shape[:2]
+    # SetImageBytes kopiert die Pixel in ein eigenes Bild von Tesseract
+    api.SetImageBytes(image.tobytes(), width, height, 1, width)
+    api.Recognize()
+    words = api.MapWordConfidences()
+    return extract_pytess_text_and_confidence({
+        'text': [word for word, _ in words],
+        'conf': [conf for _, conf in words]
+    })
+
+def extract_easyocr_text_and_confidence(result):
+    """Fasst EasyOCR-Ergebnisse (box, text, konfidenz) zu Text und Konfidenz in Prozent zusammen."""
+    if not result:
+        return "", 0.0
+
+    texts = []
+    confs = []
+
+    for box in result:
+        texts.append(box[1])  # Text ist an zweiter Stelle
+        confs.append(box[2])  # Konfidenz ist an dritter Stelle
+
+    text = ' '.join(texts).strip()
+    avg_conf = sum(confs) / len(confs) if confs else 0
+    return text, avg_conf * 100  # EasyOCR gibt Konfidenz zwischen 0-1, multiplizieren mit 100
+
+def easyocr_recognize_batch(images, backend="torch"):
+    """
+    Erkennt bekannte Einzelziffer-Ausschnitte direkt mit dem EasyOCR-Erkenner.
+    Der CRAFT-Textdetektor wird übersprungen, da die Position der Ziffern bereits
+    feststeht: Alle Ausschnitte werden nebeneinander auf eine Leinwand gelegt und
+    als fertige Boxen in einem einzigen recognize()-Aufruf übergeben.
+
+    Args:
+        images: Liste von Graustufen-Ausschnitten (NumPy-Arrays, beliebige Größe)
+        backend: "torch" (EasyOCR-Reader) oder "onnx" (exportiertes int8-Modell, siehe onnx_recognizer.py)
+
+    Returns:
+        Liste von (text, konfidenz in Prozent) in der Reihenfolge der Eingabe
+    """
+    if not images:
+        return []
+    if backend == "onnx":
+        return onnx_recognizer.recognize_batch(images, DIGITS)
+
+    height = max(img.shape[0] for img in images)
+    width = sum(img.shape[1] for img in images) + BATCH_GAP * (len(images) - 1)
+    canvas = np.zeros((height, width), dtype=np.uint8)
+
+    # Boxen im EasyOCR-Format [x_min, x_max, y_min, y_max]
+    boxes = []
+    x = 0
+    for img in images:
+        h, w = img.shape[:2]
+        canvas[:h, x:x + w] = img
+        boxes.append([x, x + w, 0, h])
+        x += w + BATCH_GAP
+
+    result = get_reader().recognize(canvas, horizontal_list=boxes, free_list=[],
+                                    allowlist=DIGITS, detail=1, batch_size=len(boxes))
+
+    # Ergebnisse über die linke Kante der Box wieder den Ausschnitten zuordnen
+    index_by_x = {box[0]: i for i, box in enumerate(boxes)}
+    per_image = [[] for _ in images]
+    for entry in result:
+        i = index_by_x.get(int(entry[0][0][0]))
+        if i is not None:
+            per_image[i].append(entry)
+
+    return [extract_easyocr_text_and_confidence(entries) for entries in per_image]
+
+def _assign_to_slots(symbols, slots):
+    """
+    Ordnet erkannte Zeichen (zeichen, konfidenz, x_mitte) über ihre Position den Ausschnitten
+    auf dem Streifen zu. Pro Ausschnitt zählt das Zeichen mit der höchsten Konfidenz.
+    """
+    results = [("", 0.0)] * len(slots)
+    for char, conf, x_center in symbols:
+        for i, (x0, x1) in enumerate(slots):
+            if x0 - STRIP_GAP / 2 <= x_center < x1 + STRIP_GAP / 2:
+                if char.strip() and conf > results[i][1]:
+                    results[i] = (char.strip(), float(conf))
+                break
+    return results
+
+def strip_layout(images):
+    """
+    Streifen, wie ihn die Zeilen-Erkennung sieht: alle Ausschnitte nebeneinander mit STRIP_GAP.
+
+    Returns:
+        (Streifen, Liste der x-Bereiche (x0, x1) der Ausschnitte)
+    """
+    return make_strip(images, STRIP_GAP)
+
+def tesseract_recognize_strip(images):
+    """
+    Erkennt alle Ausschnitte mit einem einzigen Tesseract-Aufruf: Sie werden nebeneinander
+    auf einen Streifen gelegt und als eine Zeile erkannt. Über die Zeichenboxen wird jedes
+    Zeichen wieder seinem Ausschnitt zugeordnet.
+
+    Returns:
+        Liste von (text, konfidenz in Prozent) in der Reihenfolge der Eingabe
+    """
+    if not images:
+        return []
+    strip, slots = strip_layout(images)
+
+    api = _get_tesseract_api(line=True)
+    if api is None:
+        # pytesseract liefert Zeichenboxen ohne Konfidenz; die Konfidenz kommt aus der Wortebene
+        boxes = pytesseract.image_to_boxes(strip, config=TESSERACT_LINE_CONFIG, output_type=pytesseract.Output.DICT)
+        _, conf = extract_pytess_text_and_confidence(
+            pytesseract.image_to_data(strip, config=TESSERACT_LINE_CONFIG, output_type=pytesseract.Output.DICT))
+        symbols = [(char, conf, (left + right) / 2)
+                   for char, left, right in zip(boxes.get('char', []), boxes.get('left', []), boxes.get('right', []))]
+        return _assign_to_slots(symbols, slots)
+
+    height, width = strip.shape[:2]
+    # SetImageBytes kopiert die Pixel in ein eigenes Bild von Tesseract
+    api.SetImageBytes(strip.tobytes(), width, height, 1, width)
+    api.Recognize()
+    level = tesserocr.RIL.SYMBOL
+    symbols = []
+    for symbol in tesserocr.iterate_level(api.GetIterator(), level):
+        box = symbol.BoundingBox(level)
+        if box:
+            symbols.append((symbol.GetUTF8Text(level), symbol.Confidence(level), (box[0] + box[2]) / 2))
+    return _assign_to_slots(symbols, slots)
+
+def easyocr_recognize_strip(images, backend="torch"):
+    """
+    Erkennt alle Ausschnitte als eine Zeile mit einem einzigen EasyOCR-Aufruf. EasyOCR liefert
+    keine Zeichenboxen; passt die Anzahl der erkannten Ziffern zur Anzahl der Ausschnitte,
+    erhält jeder Ausschnitt seine Ziffer mit der Konfidenz der Zeile, sonst bleibt alles leer.
+
+    Returns:
+        Liste von (text, konfidenz in Prozent) in der Reihenfolge der Eingabe
+    """
+    if not images:
+        return []
+    strip, _ = strip_layout(images)
+    if backend == "onnx":
+        text, conf = onnx_recognizer.recognize_batch([strip], DIGITS)[0]
+    else:
+        height, width = strip.shape[:2]
+        result = get_reader().recognize(strip, horizontal_list=[[0, width, 0, height]], free_list=[],
+                                        allowlist=DIGITS, detail=1)
+        text, conf = extract_easyocr_text_and_confidence(result)
+    digits = [char for char in text if char.isdigit()]
+    if len(digits) != len(images):
+        return [("", 0.0)] * len(images)
+    return [(digit, conf) for digit in digits]
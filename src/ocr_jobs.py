@@ -0,0 +1,375 @@
+import os
+import sqlite3
+import threading
+import queue
+import atexit
+import multiprocessing
+import uuid
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+QUEUE_DB = os.getenv("OCR_QUEUE_DB", os.path.join(BASE_DIR, 'data', 'ocr_jobs.sqlite3'))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+MAX_ATTEMPTS = 3          # So oft wird ein Job nach einem Absturz des Worker-Prozesses erneut versucht
+POLL_SECONDS = 5          # Fallback-Intervall, in dem die Warteschlange auf neue Jobs geprüft wird
+MAX_BUFFERED_IMAGES = 20  # So viele empfangene Bilder bleiben für die OCR im Speicher, weitere werden von der Festplatte gelesen
+# --- Ende Konfiguration ---
+
+_pool = None
+_pool_lock = threading.Lock()
+_dispatch_threads = []
+_start_lock = threading.Lock()
+_db_ready = False
+_db_lock = threading.Lock()
+_pending = threading.Semaphore(0)
+
+# Empfangene Bilder pro Job im Speicher, damit die OCR sie nicht erst von der Festplatte lesen muss
+_image_data = {}
+_image_data_lock = threading.Lock()
+_archive_queue = queue.Queue()
+_archive_thread = None
+_archive_lock = threading.Lock()
+
+
+# --- Funktionen, die in den Worker-Prozessen laufen ---
+
+def _init_worker(cpu_share=None):
+    """Verteilt die Kerne auf die Worker-Prozesse und lädt die OCR-Modelle einmal pro Prozess."""
+    from image_evaluator import configure_threads, warm_up
+    configure_threads(cpu_share)
+    warm_up()
+
+def _ping():
+    """Leerer Auftrag, um die Worker-Prozesse beim Start vorzuwärmen."""
+    return os.getpid()
+
+def _recognize(image_path, previous=None, image_data=None):
+    """
+    Führt die OCR für ein Bild in einem Worker-Prozess aus.
+
+    Returns:
+        (erkannter Zahlenwert oder None, Grund der Ablehnung durch die Qualitätsprüfung oder None)
+    """
+    from image_evaluator import recognize_reading
+    from image_quality import ImageRejected
+    try:
+        return recognize_reading(image_path, previous, image_data), None
+    except ImageRejected as e:
+        return None, e.args[0]
+
+
+# --- Persistente Warteschlange (SQLite) ---
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _connect():
+    """Öffnet eine eigene Verbindung pro Aufruf, da SQLite-Verbindungen nicht zwischen Threads geteilt werden."""
+    conn = sqlite3.connect(QUEUE_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _ensure_db():
+    """Legt die Job-Tabelle einmal pro Prozess an, auch ohne laufenden Worker-Pool."""
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_lock:
+        if _db_ready:
+            return
+        db_dir = os.path.dirname(QUEUE_DB)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        conn = _connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    image_file TEXT NOT NULL,
+                    csv_path TEXT NOT NULL,
+                    number TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    queued_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, queued_at)")
+        finally:
+            conn.close()
+        _db_ready = True
+
+def init_db():
+    """Legt die Job-Tabelle an und setzt Jobs, die beim letzten Beenden noch liefen, wieder auf 'queued'."""
+    _ensure_db()
+    conn = _connect()
+    try:
+        recovered = conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+        if recovered:
+            print(f"OCR-Warteschlange: {recovered} unterbrochene Jobs werden erneut ausgeführt")
+    finally:
+        conn.close()
+
+def _archive_loop():
+    """Schreibt empfangene Bilder im Hintergrund auf die Festplatte (Archiv und Rückfall für die OCR)."""
+    while True:
+        job_id, image_path, image_data = _archive_queue.get()
+        try:
+            image_dir = os.path.dirname(image_path)
+            if image_dir and not os.path.exists(image_dir):
+                os.makedirs(image_dir, exist_ok=True)
+            with open(image_path, 'wb') as f:
+                f.write(image_data)
+            # Erst wenn das Bild auf der Festplatte liegt, darf es bei langer Warteschlange aus dem Speicher
+            with _image_data_lock:
+                if len(_image_data) > MAX_BUFFERED_IMAGES:
+                    _image_data.pop(job_id, None)
+        except Exception as e:
+            print(f"Fehler beim Speichern von {image_path}: {e}")
+        finally:
+            _archive_queue.task_done()
+
+def _flush_archive():
+    """Wartet beim Beenden, bis alle empfangenen Bilder gespeichert sind."""
+    _archive_queue.join()
+
+def _ensure_archive_thread():
+    global _archive_thread
+    with _archive_lock:
+        if _archive_thread is None:
+            _archive_thread = threading.Thread(target=_archive_loop, name="image-archive", daemon=True)
+            _archive_thread.start()
+            atexit.register(_flush_archive)
+
+def enqueue(image_path, csv_path, image_data=None):
+    """
+    Legt einen neuen OCR-Job in der persistenten Warteschlange an.
+
+    Args:
+        image_path: Pfad, unter dem das Bild liegt bzw. gespeichert wird
+        csv_path: CSV-Datei, in die der erkannte Stand eingetragen wird
+        image_data: Optional der JPEG-Inhalt aus der Anfrage. Die OCR arbeitet dann direkt
+                    auf diesen Daten, und das Bild wird im Hintergrund unter image_path gespeichert.
+
+    Returns:
+        Die ID des neuen Jobs
+    """
+    _ensure_db()
+    job_id = uuid.uuid4().hex
+    if image_data is not None:
+        with _image_data_lock:
+            _image_data[job_id] = image_data
+        _ensure_archive_thread()
+        _archive_queue.put((job_id, image_path, image_data))
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT INTO jobs (job_id, status, image_file, csv_path, queued_at) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, image_path, csv_path, _now())
+        )
+    finally:
+        conn.close()
+    _pending.release()
+    return job_id
+
+def get_job(job_id):
+    """Gibt den Status eines Jobs als Dictionary zurück oder None, wenn er unbekannt ist."""
+    _ensure_db()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT job_id, status, image_file, number, error, attempts, queued_at, started_at, finished_at "
+            "FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+def purge_finished(max_age_seconds):
+    """Löscht abgeschlossene Jobs, die älter als max_age_seconds sind."""
+    grenze = datetime.fromtimestamp(datetime.now().timestamp() - max_age_seconds).strftime("%Y-%m-%d %H:%M:%S")
+    _ensure_db()
+    conn = _connect()
+    try:
+        return conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (grenze,)
+        ).rowcount
+    finally:
+        conn.close()
+
+def _claim_next_job():
+    """Holt den ältesten wartenden Job und markiert ihn atomar als 'running'."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT job_id, image_file, csv_path, attempts FROM jobs WHERE status = 'queued' "
+            "ORDER BY queued_at, rowid LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE job_id = ?",
+                (_now(), row['job_id'])
+            )
+        conn.execute("COMMIT")
+        return dict(row) if row else None
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def _requeue_job(job_id):
+    conn = _connect()
+    try:
+        conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE job_id = ?", (job_id,))
+    finally:
+        conn.close()
+    _pending.release()
+
+def _finish_job(job_id, status, number=None, error=None):
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = ?, number = ?, error = ?, finished_at = ? WHERE job_id = ?",
+            (status, number, error, _now(), job_id)
+        )
+    finally:
+        conn.close()
+
+
+# --- Worker-Pool ---
+
+def _cpu_share(workers):
+    """Anzahl Kerne pro Worker-Prozess, damit die Prozesse die CPU nicht überbelegen."""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+def _get_pool():
+    """Gibt den Prozess-Pool zurück und erstellt ihn bei Bedarf."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' statt 'fork', da der Server bereits Threads laufen hat
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker,
+                                        initargs=(_cpu_share(OCR_WORKERS),))
+        return _pool
+
+def _restart_pool(broken_pool):
+    """Ersetzt einen Pool, dessen Worker-Prozess abgestürzt ist."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken_pool:
+            print("OCR-Worker-Prozess abgestürzt, Pool wird neu gestartet")
+            _pool = None
+    broken_pool.shutdown(wait=False)
+
+def _process_job(job):
+    """Führt einen Job im Pool aus und trägt das Ergebnis im Hauptprozess in die CSV ein."""
+    from image_evaluator import update_gas_csv, find_previous_reading, mark_rejected
+    # Der vorherige Stand wird im Hauptprozess gelesen (Index-Abfrage, siehe readings_store.py)
+    previous = find_previous_reading(job['csv_path'], job['image_file'])
+    with _image_data_lock:
+        image_data = _image_data.pop(job['job_id'], None)
+    pool = _get_pool()
+    try:
+        number, reject_reason = pool.submit(_recognize, job['image_file'], previous, image_data).result()
+    except BrokenProcessPool:
+        _restart_pool(pool)
+        if image_data is not None:
+            with _image_data_lock:
+                _image_data[job['job_id']] = image_data
+        if job['attempts'] + 1 >= MAX_ATTEMPTS:
+            _finish_job(job['job_id'], 'failed', error='OCR-Worker-Prozess wiederholt abgestürzt')
+        else:
+            _requeue_job(job['job_id'])
+        return
+
+    if reject_reason:
+        # Unbrauchbares Bild: Grund in der Sensor-Zeile vermerken, statt einen Stand einzutragen
+        print(f"Bild verworfen: {reject_reason} (Job {job['job_id']})")
+        mark_rejected(job['image_file'], job['csv_path'], reject_reason)
+        _finish_job(job['job_id'], 'failed', error=f'Bild verworfen: {reject_reason}')
+        return
+
+    if not number:
+        _finish_job(job['job_id'], 'failed', error='Keine Nummer erkannt')
+        return
+
+    # Nur der Hauptprozess schreibt den Zählerstand, die Worker greifen nicht auf die Datenbank zu
+    result = update_gas_csv(job['image_file'], job['csv_path'], number)
+    if result:
+        print(f"Bildauswertung abgeschlossen. Erkannte Nummer: {result} (Job {job['job_id']})")
+        _finish_job(job['job_id'], 'done', number=result)
+    else:
+        _finish_job(job['job_id'], 'failed', number=number, error='Zählerstand konnte nicht eingetragen werden')
+
+def _dispatch_loop():
+    """Holt Jobs aus der Warteschlange und verteilt sie an den Worker-Pool."""
+    while True:
+        try:
+            job = _claim_next_job()
+        except Exception as e:
+            print(f"Fehler beim Lesen der OCR-Warteschlange: {e}")
+            job = None
+        if job is None:
+            _pending.acquire(timeout=POLL_SECONDS)
+            continue
+        try:
+            _process_job(job)
+        except Exception as e:
+            print(f"Fehler bei der Bildauswertung (Job {job['job_id']}): {e}")
+            _finish_job(job['job_id'], 'failed', error=str(e))
+
+def start():
+    """
+    Startet den Worker-Pool und die Verteiler-Threads (nur einmal pro Prozess).
+    Wartende und unterbrochene Jobs aus der Datenbank werden danach abgearbeitet.
+
+    Nur beim Start des Servers im Hauptthread aufrufen, nicht aus einer Anfrage: Bis dahin
+    eingereihte Jobs bleiben in der Warteschlange liegen.
+    """
+    with _start_lock:
+        if _dispatch_threads:
+            return
+        # image_evaluator (und damit tesserocr/cysignals) im Hauptthread laden: signal.signal ist
+        # nur dort erlaubt, der erste Import in einem Verteiler-Thread würde fehlschlagen
+        import image_evaluator
+        init_db()
+        pool = _get_pool()
+        # Worker-Prozesse vorwärmen, damit das erste Bild nicht auf das Laden der Modelle wartet
+        for _ in range(OCR_WORKERS):
+            pool.submit(_ping)
+        for i in range(OCR_WORKERS):
+            thread = threading.Thread(target=_dispatch_loop, name=f"ocr-dispatch-{i + 1}", daemon=True)
+            thread.start()
+            _dispatch_threads.append(thread)
+        print(f"OCR-Worker-Pool gestartet ({OCR_WORKERS} Prozesse, Warteschlange: {QUEUE_DB})")
+
+def recognize_many(image_paths, workers=OCR_WORKERS, csv_path=None):
+    """
+    Erkennt die Zählerstände vieler Bilder parallel in einem eigenen Worker-Pool.
+    Die Ergebnisse werden in der Reihenfolge der Eingabe geliefert. Mit csv_path
+    werden die bisherigen Stände aus der CSV zur Plausibilitätsprüfung verwendet.
+
+    Yields:
+        Tupel (image_path, erkannter Zahlenwert oder None, Grund der Ablehnung oder None)
+    """
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(_cpu_share(workers),)) as pool:
+        previous = [None] * len(image_paths)
+        if csv_path:
+            from image_evaluator import load_readings, previous_reading
+            readings = load_readings(csv_path)
+            previous = [previous_reading(readings, image_path) for image_path in image_paths]
+        for image_path, (number, reject_reason) in zip(image_paths, pool.map(_recognize, image_paths, previous)):
+            yield image_path, number, reject_reason
@@ -0,0 +1,171 @@
+import os
+import sqlite3
+import threading
+import time
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+TELEMETRY_DB = os.getenv("OCR_TELEMETRY_DB", os.path.join(BASE_DIR, 'data', 'ocr_telemetry.sqlite3'))
+CONF_BINS = 10            # Konfidenz-Histogramm in 10er-Schritten (0-9, 10-19, ..., 90-100)
+STATS_REFRESH_SECONDS = 60  # So lange wird die Statistik für die Methoden-Reihenfolge zwischengespeichert
+# --- Ende Konfiguration ---
+
+_init_lock = threading.Lock()
+_initialized = False
+_stats_cache = None
+_stats_cache_time = 0.0
+
+def _connect():
+    conn = sqlite3.connect(TELEMETRY_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _init_db():
+    """Legt die Statistik-Tabellen an (einmal pro Prozess)."""
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        db_dir = os.path.dirname(TELEMETRY_DB)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        conn = _connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS method_stats (
+                    method TEXT PRIMARY KEY,
+                    runs INTEGER NOT NULL DEFAULT 0,
+                    total_ms REAL NOT NULL DEFAULT 0,
+                    wins INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS method_confidence (
+                    method TEXT NOT NULL,
+                    bin INTEGER NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (method, bin)
+                )
+            """)
+        finally:
+            conn.close()
+        _initialized = True
+
+def record(timings, recognition_results):
+    """
+    Speichert die Messwerte einer Bildauswertung.
+
+    Args:
+        timings: {Methode: (Anzahl ROIs, Laufzeit in Sekunden)} der ausgeführten Methoden
+        recognition_results: Ergebnisliste aus recognize_reading (mit "results" und "best_method")
+    """
+    _init_db()
+    wins = {}
+    confidences = []
+    for result in recognition_results:
+        if result.get("best_method") in timings:
+            wins[result["best_method"]] = wins.get(result["best_method"], 0) + 1
+        for method, res in result.get("results", {}).items():
+            conf_bin = min(CONF_BINS - 1, max(0, int(res["conf"] // (100 / CONF_BINS))))
+            confidences.append((method, conf_bin))
+
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for method, (runs, seconds) in timings.items():
+            conn.execute(
+                "INSERT INTO method_stats (method, runs, total_ms, wins) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(method) DO UPDATE SET runs = runs + excluded.runs, "
+                "total_ms = total_ms + excluded.total_ms, wins = wins + excluded.wins",
+                (method, runs, seconds * 1000, wins.get(method, 0))
+            )
+        for method, conf_bin in confidences:
+            conn.execute(
+                "INSERT INTO method_confidence (method, bin, count) VALUES (?, ?, 1) "
+                "ON CONFLICT(method, bin) DO UPDATE SET count = count + 1",
+                (method, conf_bin)
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def get_stats():
+    """
+    Liest die gesammelte Statistik.
+
+    Returns:
+        {Methode: {"runs", "wins", "win_rate", "avg_ms", "confidence_histogram"}}
+    """
+    _init_db()
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT method, runs, total_ms, wins FROM method_stats").fetchall()
+        hist_rows = conn.execute("SELECT method, bin, count FROM method_confidence").fetchall()
+    finally:
+        conn.close()
+
+    stats = {}
+    for row in rows:
+        stats[row['method']] = {
+            "runs": row['runs'],
+            "wins": row['wins'],
+            "win_rate": row['wins'] / row['runs'] if row['runs'] else 0.0,
+            "avg_ms": row['total_ms'] / row['runs'] if row['runs'] else 0.0,
+            "confidence_histogram": [0] * CONF_BINS
+        }
+    for row in hist_rows:
+        if row['method'] in stats:
+            stats[row['method']]["confidence_histogram"][row['bin']] = row['count']
+    return stats
+
+def _cached_stats():
+    global _stats_cache, _stats_cache_time
+    if _stats_cache is None or time.time() - _stats_cache_time > STATS_REFRESH_SECONDS:
+        _stats_cache = get_stats()
+        _stats_cache_time = time.time()
+    return _stats_cache
+
+def order_methods(methods, adaptive):
+    """
+    Passt die Reihenfolge der OCR-Methoden an die gesammelte Statistik an. Methoden,
+    die nach mindestens min_runs Durchläufen seltener als min_win_rate gewinnen,
+    werden ans Ende verschoben (mode "deprioritize") oder weggelassen (mode "drop").
+    Mindestens eine Methode bleibt immer erhalten.
+
+    Args:
+        methods: Liste von (Name, Engine, Variante) in der Standard-Reihenfolge
+        adaptive: Abschnitt "adaptive" aus der OCR-Konfiguration
+    """
+    if not adaptive.get("enabled"):
+        return methods
+    try:
+        stats = _cached_stats()
+    except Exception as e:
+        print(f"Warnung: OCR-Statistik konnte nicht gelesen werden: {e}")
+        return methods
+
+    def rarely_wins(method):
+        s = stats.get(method[0])
+        return bool(s) and s["runs"] >= adaptive["min_runs"] and s["win_rate"] < adaptive["min_win_rate"]
+
+    keep = [m for m in methods if not rarely_wins(m)]
+    pruned = [m for m in methods if rarely_wins(m)]
+    if not keep:
+        return methods
+    if adaptive.get("mode") == "drop":
+        return keep
+    return keep + pruned
+
+
+if __name__ == "__main__":
+    # Übersicht der gesammelten Statistik ausgeben
+    stats = get_stats()
+    if not stats:
+        print(f"Noch keine OCR-Statistik vorhanden ({TELEMETRY_DB}).")
+    for method, s in sorted(stats.items(), key=lambda item: -item[1]["win_rate"]):
+        print(f"{method:<24} Läufe: {s['runs']:>7}  Gewonnen: {s['wins']:>7} ({s['win_rate'] * 100:5.1f} %)  "
+              f"Ø {s['avg_ms']:7.1f} ms  Konfidenz: {s['confidence_histogram']}")
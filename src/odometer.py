@@ -0,0 +1,76 @@
+import numpy as np
+
+# Plausibilitätsprüfung für das Rollenzählwerk des Gaszählers.
+# Der Zählerstand wird als ganze Zahl in der kleinsten Einheit der letzten Rolle
+# geführt (bei 6 Rollen mit 2 Nachkommastellen also in 0,01 m³). Er kann nur steigen,
+# und zwar höchstens um den Verbrauch, der seit dem letzten Stand physikalisch möglich ist.
+
+def to_units(value, decimals=2):
+    """
+    Wandelt einen Zählerstand (z.B. 1234.56) in ganze Einheiten der letzten Rolle um. Weitere
+    Nachkommastellen (Bruchteil der letzten Rolle, z.B. 1234.564) werden abgeschnitten.
+    """
+    return int(np.floor(float(value) * 10 ** decimals + 1e-6))
+
+def max_increase_units(hours, config, decimals=2):
+    """Größte Zunahme (in Einheiten der letzten Rolle), die in der vergangenen Zeit möglich ist."""
+    return to_units(config["min_increase"] + max(hours, 0) * config["max_increase_per_hour"], decimals)
+
+def stable_prefix_length(previous, max_increase, n_digits):
+    """
+    Anzahl der führenden Rollen, die für alle möglichen Stände zwischen previous und
+    previous + max_increase gleich bleiben. Diese Rollen müssen nicht erkannt werden.
+    """
+    low = f"{previous:0{n_digits}d}"
+    high = f"{previous + max_increase:0{n_digits}d}"
+    if len(high) > n_digits:
+        # Überlauf des Zählwerks: keine Rolle ist sicher
+        return 0
+    length = 0
+    while length < n_digits and low[length] == high[length]:
+        length += 1
+    return length
+
+def digit_scores(results_per_roi, extract_digit):
+    """
+    Fasst die OCR-Ergebnisse zu einer Punktetabelle zusammen: pro Rolle und Ziffer
+    die höchste Konfidenz, mit der eine Methode diese Ziffer erkannt hat.
+
+    Args:
+        results_per_roi: Pro Rolle ein Dictionary {Methode: {"text", "conf"}}
+        extract_digit: Funktion, die einen erkannten Text auf eine Ziffer reduziert
+
+    Returns:
+        Array der Form (Anzahl Rollen, 10)
+    """
+    scores = np.zeros((len(results_per_roi), 10), dtype=np.float64)
+    for position, results in enumerate(results_per_roi):
+        for result in results.values():
+            digit = extract_digit(result["text"])
+            if digit:
+                scores[position, int(digit)] = max(scores[position, int(digit)], result["conf"])
+    return scores
+
+def decode(previous, max_increase, scores):
+    """
+    Wählt unter allen Ständen von previous bis previous + max_increase den, dessen
+    Ziffern am besten zu den OCR-Ergebnissen passen. Bei Gleichstand gewinnt der
+    kleinere Stand, also der mit dem geringeren Verbrauch.
+
+    Args:
+        previous: Letzter akzeptierter Stand in Einheiten der letzten Rolle
+        max_increase: Größte mögliche Zunahme in denselben Einheiten
+        scores: Punktetabelle aus digit_scores
+
+    Returns:
+        (Stand, Punktzahl) oder (None, 0), wenn die OCR keine verwertbare Ziffer geliefert hat
+    """
+    n_digits = scores.shape[0]
+    candidates = np.arange(previous, min(previous + max_increase, 10 ** n_digits - 1) + 1, dtype=np.int64)
+    powers = 10 ** np.arange(n_digits - 1, -1, -1, dtype=np.int64)
+    digits = (candidates[:, None] // powers) % 10
+    totals = scores[np.arange(n_digits), digits].sum(axis=1)
+    best = int(np.argmax(totals))
+    if totals[best] <= 0:
+        return None, 0.0
+    return int(candidates[best]), float(totals[best])
@@ -0,0 +1,240 @@
+import os
+import json
+import math
+import threading
+import numpy as np
+import cv2
+from PIL import Image
+
+# Optionaler Ersatz für den EasyOCR-Erkenner ohne PyTorch (pip install onnxruntime).
+# Das Erkennungsnetz von EasyOCR wird einmal nach ONNX exportiert und auf int8 quantisiert
+# (export() braucht dafür zusätzlich torch, easyocr und onnx). Vorverarbeitung, Auswahl der
+# erlaubten Zeichen und Dekodierung entsprechen Reader.recognize() mit horizontal_list.
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+MODEL_FILE = os.getenv("EASYOCR_ONNX_MODEL", os.path.join(CACHE_DIR, 'easyocr_recognizer_int8.onnx'))
+META_FILE = MODEL_FILE + '.json'  # Zeichensatz und Bildhöhe des exportierten Modells
+CONTRAST_THS = 0.1        # Wie bei EasyOCR: unsichere Ergebnisse mit erhöhtem Kontrast wiederholen
+ADJUST_CONTRAST = 0.5
+# --- Ende Konfiguration ---
+
+_session = None
+_meta = None
+_threads = None
+_session_lock = threading.Lock()
+
+def is_available():
+    """True, wenn onnxruntime installiert ist und ein exportiertes Modell vorliegt."""
+    return onnxruntime is not None and os.path.exists(MODEL_FILE) and os.path.exists(META_FILE)
+
+def set_threads(threads):
+    """Legt die Threads für die ONNX-Sitzung fest (wirkt, bevor die Sitzung geladen wird)."""
+    global _threads
+    _threads = threads
+
+def _get_session():
+    """Lädt die ONNX-Sitzung und den Zeichensatz einmal pro Prozess."""
+    global _session, _meta
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                with open(META_FILE, 'r', encoding='utf-8') as f:
+                    _meta = json.load(f)
+                options = onnxruntime.SessionOptions()
+                if _threads:
+                    options.intra_op_num_threads = _threads
+                _session = onnxruntime.InferenceSession(MODEL_FILE, options, providers=['CPUExecutionProvider'])
+    return _session, _meta
+
+def _resize(image, img_h):
+    """
+    Skaliert einen Ausschnitt wie EasyOCR (get_image_list) auf die Modellhöhe.
+
+    Returns:
+        (skaliertes Bild, Breite, auf die der Stapel aufgefüllt wird)
+    """
+    height, width = image.shape[:2]
+    ratio = width / height
+    if ratio < 1.0:
+        # Hohe Ausschnitte (wie die Ziffern) werden auf Modellhöhe als Breite gebracht
+        ratio = 1.0 / ratio
+        resized = cv2.resize(image, (img_h, int(img_h * ratio)), interpolation=cv2.INTER_LINEAR)
+    else:
+        resized = cv2.resize(image, (int(img_h * ratio), img_h), interpolation=cv2.INTER_LINEAR)
+    return resized, math.ceil(max(ratio, 1.0)) * img_h
+
+def _adjust_contrast(image, target):
+    """Kontrasterhöhung wie easyocr.recognition.adjust_contrast_grey."""
+    high, low = np.percentile(image, 90), np.percentile(image, 10)
+    if (high - low) / np.maximum(10, high + low) < target:
+        ratio = 200.0 / np.maximum(10, high - low)
+        image = np.clip((image.astype(int) - low + 25) * ratio, 0, 255).astype(np.uint8)
+    return image
+
+def _to_input(resized, img_h, max_width, adjust_contrast=0.0):
+    """Normiert ein skaliertes Bild wie AlignCollate/NormalizePAD und füllt rechts mit der letzten Spalte auf."""
+    if adjust_contrast > 0:
+        resized = _adjust_contrast(resized, adjust_contrast)
+    image = Image.fromarray(resized, 'L')
+    width, height = image.size
+    resized_w = min(max_width, math.ceil(img_h * width / height))
+    pixels = np.asarray(image.resize((resized_w, img_h), Image.BICUBIC), dtype=np.float32) / 255.0
+    padded = np.empty((1, img_h, max_width), dtype=np.float32)
+    padded[0, :, :resized_w] = (pixels - 0.5) / 0.5
+    padded[0, :, resized_w:] = padded[0, :, resized_w - 1:resized_w]
+    return padded
+
+def _decode(preds, characters, ignore_idx):
+    """
+    Greedy-CTC-Dekodierung wie EasyOCR: nicht erlaubte Zeichen erhalten Wahrscheinlichkeit 0,
+    Wiederholungen und Leerzeichen werden entfernt.
+
+    Returns:
+        Liste von (text, konfidenz 0-1) pro Zeile des Stapels
+    """
+    probs = np.exp(preds - preds.max(axis=2, keepdims=True))
+    probs /= probs.sum(axis=2, keepdims=True)
+    probs[:, :, ignore_idx] = 0.0
+    probs /= probs.sum(axis=2, keepdims=True)
+    indices = probs.argmax(axis=2)
+    values = probs.max(axis=2)
+
+    results = []
+    for index, value in zip(indices, values):
+        keep = np.insert(index[1:] != index[:-1], 0, True) & (index != 0)
+        text = ''.join(characters[i - 1] for i in index[keep])
+        max_probs = value[index != 0]
+        if not len(max_probs):
+            max_probs = np.array([0.0])
+        results.append((text, float(max_probs.prod() ** (2.0 / np.sqrt(len(max_probs))))))
+    return results
+
+def _run(session, meta, inputs, ignore_idx):
+    """Führt einen Stapel gleich breiter Eingaben durch das Netz."""
+    preds = session.run(None, {session.get_inputs()[0].name: np.stack(inputs)})[0]
+    return _decode(preds, meta['characters'], ignore_idx)
+
+def recognize_batch(images, allowlist):
+    """
+    Erkennt mehrere Graustufen-Ausschnitte als je eine Textbox, ohne PyTorch. Ausschnitte mit
+    gleicher Eingabebreite laufen in einem gemeinsamen Aufruf.
+
+    Returns:
+        Liste von (text, konfidenz in Prozent) in der Reihenfolge der Eingabe
+    """
+    if not images:
+        return []
+    session, meta = _get_session()
+    img_h = meta['img_h']
+    characters = meta['characters']
+    ignore_idx = [characters.index(char) + 1 for char in set(characters) - set(allowlist)]
+
+    prepared = [_resize(img, img_h) for img in images]
+    results = [None] * len(images)
+    for max_width in sorted({width for _, width in prepared}):
+        group = [i for i, (_, width) in enumerate(prepared) if width == max_width]
+        batch = _run(session, meta, [_to_input(prepared[i][0], img_h, max_width) for i in group], ignore_idx)
+        # Unsichere Ergebnisse mit erhöhtem Kontrast wiederholen, das bessere gilt
+        retry = [j for j, (_, conf) in enumerate(batch) if conf < CONTRAST_THS]
+        if retry:
+            second = _run(session, meta, [_to_input(prepared[group[j]][0], img_h, max_width, ADJUST_CONTRAST)
+                                          for j in retry], ignore_idx)
+            for j, result in zip(retry, second):
+                if result[1] >= batch[j][1]:
+                    batch[j] = result
+        for i, (text, conf) in zip(group, batch):
+            results[i] = (text.strip(), conf * 100)
+    return results
+
+def export(lang='de'):
+    """
+    Exportiert das Erkennungsnetz des EasyOCR-Readers nach ONNX und quantisiert es auf int8.
+    Braucht torch, easyocr, onnx und onnxruntime; danach reicht onnxruntime.
+    """
+    import torch
+    import easyocr
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    if not os.path.exists(CACHE_DIR):
+        os.makedirs(CACHE_DIR)
+    # Ohne die dynamische PyTorch-Quantisierung laden, die sich nicht exportieren lässt
+    reader = easyocr.Reader([lang], gpu=False, model_storage_directory=CACHE_DIR, quantize=False)
+    img_h = easyocr.easyocr.imgH
+
+    class _MeanPool(torch.nn.Module):
+        # Ersetzt AdaptiveAvgPool2d((None, 1)), das sich mit variabler Breite nicht exportieren lässt
+        def forward(self, features):
+            return features.mean(dim=3, keepdim=True)
+
+    class _Recognizer(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, image):
+            return self.model(image, None)
+
+    model = reader.recognizer.eval()
+    model.AdaptiveAvgPool = _MeanPool()
+    float_file = MODEL_FILE + '.float.onnx'
+    # Mit Stapelgröße 1 exportieren, damit die LSTM-Anfangszustände nicht auf eine feste Größe festgelegt werden
+    torch.onnx.export(_Recognizer(model), torch.zeros(1, 1, img_h, 2 * img_h), float_file,
+                      input_names=['image'], output_names=['preds'], opset_version=17, dynamo=False,
+                      dynamic_axes={'image': {0: 'batch', 3: 'width'}, 'preds': {0: 'batch', 1: 'steps'}})
+    quantize_dynamic(float_file, MODEL_FILE, weight_type=QuantType.QInt8)
+    os.remove(float_file)
+    with open(META_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'characters': reader.character, 'img_h': img_h, 'lang': lang}, f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    import resource
+
+    parser = argparse.ArgumentParser(description='EasyOCR-Erkenner als ONNX/int8 exportieren oder vergleichen')
+    parser.add_argument('command', choices=['export', 'benchmark'],
+                        help="'export': Modell exportieren und quantisieren, "
+                             "'benchmark': Laufzeit und Speicher eines Backends in diesem Prozess messen")
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default='onnx', help='Backend für benchmark')
+    parser.add_argument('--images', type=str, help='Ordner mit den Kamerabildern (für benchmark)')
+    parser.add_argument('--limit', type=int, default=50, help='Höchstens so viele Bilder (für benchmark)')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export()
+        print(f"Modell gespeichert unter '{MODEL_FILE}'.")
+    else:
+        images_dir = args.images or os.path.join(BASE_DIR, 'camera_images')
+        start = time.perf_counter()
+        from image_evaluator import load_gray_image, extract_rois, align_rois
+        from ocr_engines import DIGITS
+        if args.backend == 'torch':
+            from ocr_engines import easyocr_recognize_batch
+            recognize = easyocr_recognize_batch
+        else:
+            recognize = lambda images: recognize_batch(images, DIGITS)
+        recognize([np.zeros((110, 80), dtype=np.uint8)])
+        print(f"Laden: {time.perf_counter() - start:.1f} s")
+
+        image_files = sorted(f for f in os.listdir(images_dir) if f.startswith('cam_') and f.endswith('.jpg'))
+        seconds = 0.0
+        count = 0
+        for image_file in image_files[:args.limit]:
+            gray_image = load_gray_image(os.path.join(images_dir, image_file))
+            if gray_image is None:
+                continue
+            crops = [crop for crop in extract_rois(gray_image, align_rois(gray_image)) if crop is not None]
+            start = time.perf_counter()
+            recognize(crops)
+            seconds += time.perf_counter() - start
+            count += 1
+        if count:
+            print(f"{args.backend}: Ø {seconds / count * 1000:.1f} ms pro Bild ({count} Bilder)")
+        print(f"Maximaler Speicherbedarf (RSS): {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
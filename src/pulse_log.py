@@ -0,0 +1,274 @@
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Impulse des Stromzählers (eine Umdrehung der Ferraris-Scheibe) als binäres Protokoll statt als
+# Textzeile "epoch,YYYY-mm-dd HH:MM:SS" in electricity_data.csv: Nach einem kurzen Kopf folgt pro
+# Impuls ein int64 mit dem Unix-Zeitstempel in Sekunden. Die Datei wird nur am Ende ergänzt und
+# lässt sich direkt als numpy.memmap lesen; Zeitbereiche findet eine binäre Suche, die stündliche
+# Auswertung ist ein np.bincount über alle Impulse.
+#
+# Die Datei liegt neben der CSV-Datei (electricity_data.csv -> electricity_data.pulses), alle
+# Funktionen nehmen daher den Pfad der CSV-Datei. Beim ersten Öffnen wird eine vorhandene
+# CSV-Datei einmalig übernommen (oder von Hand mit "python src/pulse_log.py convert").
+
+MAGIC = b'PULSELOG'
+VERSION = 1
+HEADER = struct.Struct('<8sII')  # Kennung, Version, reserviert (16 Bytes, Datensätze bleiben 8-Byte-ausgerichtet)
+RECORD_DTYPE = np.dtype('<i8')
+MIN_TIMESTAMP = 1577836800   # 2020-01-01; kleinere Werte stammen von einer ESP-Uhr ohne NTP-Zeit
+MAX_FUTURE_SECONDS = 86400   # Zeitstempel mehr als einen Tag in der Zukunft gelten als ungültig
+
+_lock = threading.Lock()
+_last = {}  # Pro Datei (inode, Größe, mtime, letzter Zeitstempel), damit append() die Datei nicht lesen muss
+
+def log_path(csv_path):
+    """Pfad des Impulsprotokolls zur CSV-Datei."""
+    return os.path.splitext(csv_path)[0] + '.pulses'
+
+def _check_header(path):
+    with open(path, 'rb') as f:
+        data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError(f"Impulsprotokoll '{path}' ist zu kurz")
+    magic, version, _ = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' ist kein Impulsprotokoll")
+    if version != VERSION:
+        raise ValueError(f"Impulsprotokoll '{path}' hat Version {version}, erwartet {VERSION}")
+
+def _write_log(path, timestamps):
+    """Schreibt ein vollständiges Protokoll über eine temporäre Datei."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0))
+        f.write(np.asarray(timestamps, dtype=RECORD_DTYPE).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _read_csv(csv_path):
+    """Liest die Zeitstempel (erste Spalte) einer CSV-Datei im bisherigen Format, sortiert."""
+    df = pd.read_csv(csv_path, header=None, usecols=[0], names=['timestamp'], dtype=str)
+    timestamps = pd.to_numeric(df['timestamp'], errors='coerce').dropna()  # Kopfzeile und kaputte Zeilen
+    return np.sort(timestamps.to_numpy(dtype=np.int64), kind='stable')
+
+def convert_csv(csv_path):
+    """
+    Übernimmt alle Impulse aus der CSV-Datei und ersetzt ein vorhandenes Protokoll.
+
+    Returns:
+        Anzahl der übernommenen Impulse
+    """
+    timestamps = _read_csv(csv_path)
+    path = log_path(csv_path)
+    with _lock:
+        _write_log(path, timestamps)
+        _last.pop(path, None)
+    return len(timestamps)
+
+def open_log(csv_path):
+    """Legt das Protokoll an (bei vorhandener CSV-Datei aus deren Impulsen) und prüft den Kopf."""
+    path = log_path(csv_path)
+    if not os.path.exists(path):
+        with _lock:
+            if not os.path.exists(path):
+                if os.path.exists(csv_path):
+                    timestamps = _read_csv(csv_path)
+                    _write_log(path, timestamps)
+                    print(f"Stromzähler: {len(timestamps)} Impulse aus '{csv_path}' übernommen ({path}).")
+                else:
+                    _write_log(path, [])
+    _check_header(path)
+    return path
+
+def _file_state(path):
+    """Kennzeichen der Datei; ändert sich, sobald ein anderer Prozess sie ergänzt oder ersetzt."""
+    st = os.stat(path)
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+def _last_timestamp(path):
+    """Letzter gespeicherter Zeitstempel; ein nach einem Absturz halb geschriebener Datensatz wird abgeschnitten."""
+    state = _file_state(path)
+    cached = _last.get(path)
+    if cached is not None and cached[:3] == state:
+        return cached[3]
+    size = state[1]
+    partial = (size - HEADER.size) % RECORD_DTYPE.itemsize
+    if partial:
+        print(f"Stromzähler: unvollständigen Datensatz am Ende von '{path}' entfernt.")
+        with open(path, 'r+b') as f:
+            f.truncate(size - partial)
+        size -= partial
+    last = None
+    if size > HEADER.size:
+        with open(path, 'rb') as f:
+            f.seek(size - RECORD_DTYPE.itemsize)
+            last = int(np.frombuffer(f.read(RECORD_DTYPE.itemsize), dtype=RECORD_DTYPE)[0])
+    _last[path] = _file_state(path) + (last,)
+    return last
+
+def parse_batch(text, now=None):
+    """
+    Liest alle Zeitstempel eines Uploads (eine Zahl pro Zeile, Kopfzeilen werden übergangen) auf
+    einmal ein, prüft sie und sortiert sie.
+
+    Args:
+        text: Inhalt des Uploads
+        now: Aktueller Unix-Zeitstempel (Standard: jetzt)
+
+    Returns:
+        (aufsteigend sortierte Zeitstempel als numpy-Array, Anzahl ungültiger Zeitstempel)
+    """
+    lines = [line.strip() for line in text.split('\n')]
+    numbers = [line for line in lines if line.isascii() and line.isdigit()]
+    # Mehr als 18 Ziffern passen nicht in ein int64 (und sind ohnehin kein gültiger Zeitstempel)
+    values = np.array([int(line) for line in numbers if len(line) <= 18], dtype=RECORD_DTYPE)
+    now = time.time() if now is None else now
+    valid = (values >= MIN_TIMESTAMP) & (values <= now + MAX_FUTURE_SECONDS)
+    return np.sort(values[valid]), int(len(numbers) - np.count_nonzero(valid))
+
+def _stored(path):
+    """Alle gespeicherten Zeitstempel einer Protokolldatei als schreibgeschützte memmap."""
+    count = (os.path.getsize(path) - HEADER.size) // RECORD_DTYPE.itemsize
+    if count <= 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER.size, shape=(count,))
+
+def _unstored(path, values, last):
+    """
+    Impulse eines sortierten Blocks, die noch nicht im Protokoll stehen. Verglichen wird als
+    Multimenge: Kommt ein Zeitstempel im Block n-mal und im Protokoll m-mal vor, bleiben n - m
+    davon übrig. Ein erneut gesendeter Block fällt so ganz weg, echte Impulse in derselben
+    Sekunde bleiben erhalten. Gelesen wird nur der Teil des Protokolls ab dem ältesten Impuls.
+    """
+    if last is None or values[0] > last:
+        return values
+    stored = _stored(path)
+    tail = np.array(stored[np.searchsorted(stored, values[0], side='left'):])
+    del stored
+    keys, counts = np.unique(values, return_counts=True)
+    present = np.searchsorted(tail, keys, side='right') - np.searchsorted(tail, keys, side='left')
+    return np.repeat(keys, np.maximum(counts - present, 0))
+
+def append(csv_path, timestamps):
+    """
+    Hängt Impulse an das Protokoll an, unabhängig von dessen Länge in O(1) pro Impuls. Alle
+    Impulse werden in einem Schreibvorgang angehängt und mit einem fsync gesichert.
+
+    Die binäre Suche setzt aufsteigende Zeitstempel voraus. Der Block wird daher sortiert, und
+    Impulse, die schon im Protokoll stehen (z.B. aus einem erneut gesendeten Block), werden
+    übergangen, damit sie in den Verbrauchssummen nicht doppelt zählen (siehe _unstored).
+    Verspätete Impulse, die älter als der letzte gespeicherte sind, werden einsortiert; das
+    Protokoll wird dazu über eine temporäre Datei neu geschrieben.
+
+    Args:
+        csv_path: Pfad der CSV-Datei, neben der das Protokoll liegt
+        timestamps: Unix-Zeitstempel in Sekunden
+
+    Returns:
+        (gespeicherte Zeitstempel als numpy-Array, Anzahl davon, die älter als der bisher
+        letzte Impuls waren und einsortiert wurden)
+    """
+    path = open_log(csv_path)
+    values = np.asarray(timestamps, dtype=RECORD_DTYPE)
+    if len(values) == 0:
+        return values, 0
+    values = np.sort(values)
+    with _lock:
+        last = _last_timestamp(path)
+        new = _unstored(path, values, last)
+        duplicates = len(values) - len(new)
+        if duplicates:
+            print(f"Stromzähler: {duplicates} bereits gespeicherte Impulse übergangen.")
+        merged = 0 if last is None else int(np.searchsorted(new, last, side='left'))
+        if merged:
+            print(f"Stromzähler: {merged} ältere Impulse einsortiert.")
+            stored = _stored(path)
+            _write_log(path, np.sort(np.concatenate([stored, new]), kind='stable'))
+            del stored
+            _last.pop(path, None)
+        elif len(new):
+            with open(path, 'ab') as f:
+                f.write(new.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            _last[path] = _file_state(path) + (int(new[-1]),)
+    return new, merged
+
+def read_all(csv_path):
+    """Alle Zeitstempel als schreibgeschützte numpy.memmap (leeres Array, solange nichts gespeichert ist)."""
+    return _stored(open_log(csv_path))
+
+def _to_epoch(value):
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    return int(value.timestamp())
+
+def time_range(csv_path, start=None, end=None):
+    """
+    Impulse im Zeitraum [start, end) über eine binäre Suche.
+
+    Args:
+        start, end: Unix-Zeitstempel oder datetime; None für offen
+
+    Returns:
+        Ausschnitt der memmap (ohne Kopie)
+    """
+    timestamps = read_all(csv_path)
+    start, end = _to_epoch(start), _to_epoch(end)
+    lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+    hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='left'))
+    return timestamps[lo:hi]
+
+def hourly_counts(csv_path, start=None, end=None):
+    """
+    Anzahl der Impulse pro Stunde (Ortszeit) mit np.bincount.
+
+    Gezählt wird über volle UTC-Stunden; das passt zur Ortszeit, solange deren Abstand zu UTC
+    ganze Stunden beträgt. Bei der Zeitumstellung im Herbst fallen wie bisher beide Stunden
+    mit derselben Uhrzeit zusammen.
+
+    Returns:
+        Liste von ('YYYY-mm-dd HH:00', anzahl), nach Stunde sortiert, nur Stunden mit Impulsen
+    """
+    timestamps = time_range(csv_path, start, end)
+    if len(timestamps) == 0:
+        return []
+    hours = timestamps // 3600
+    first = int(hours[0])
+    counts = np.bincount(hours - first)
+    result = []
+    for offset in np.flatnonzero(counts):
+        label = datetime.fromtimestamp((first + int(offset)) * 3600).strftime('%Y-%m-%d %H:00')
+        if result and result[-1][0] == label:
+            result[-1] = (label, result[-1][1] + int(counts[offset]))
+        else:
+            result.append((label, int(counts[offset])))
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Impulsprotokoll des Stromzählers aus der CSV-Datei erzeugen oder anzeigen')
+    parser.add_argument('command', choices=['convert', 'info'],
+                        help="'convert': CSV-Datei übernehmen (ersetzt ein vorhandenes Protokoll), "
+                             "'info': Anzahl und Zeitraum der gespeicherten Impulse")
+    parser.add_argument('--csv', type=str, help='CSV-Datei, neben der das Protokoll liegt')
+    args = parser.parse_args()
+
+    csv_path = args.csv or os.path.join(os.path.dirname(__file__), 'electricity_data.csv')
+    if args.command == 'convert':
+        count = convert_csv(csv_path)
+        print(f"{count} Impulse nach '{log_path(csv_path)}' übernommen.")
+    else:
+        timestamps = read_all(csv_path)
+        print(f"Impulsprotokoll: {log_path(csv_path)}")
+        print(f"Impulse: {len(timestamps)}")
+        if len(timestamps):
+            print(f"Zeitraum: {datetime.fromtimestamp(int(timestamps[0]))} bis {datetime.fromtimestamp(int(timestamps[-1]))}")
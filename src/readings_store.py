@@ -0,0 +1,342 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+import pandas as pd
+import rollups
+
+# Zählerstände des Gaszählers in SQLite statt in der CSV-Datei: Für jedes Bild wurde bisher
+# die ganze CSV gelesen, nach dem Zeitstempel durchsucht, sortiert und komplett neu geschrieben.
+# Hier ist jede Zeile über den Zeitstempel indiziert, ein erkannter Stand wird mit einem UPDATE
+# eingetragen und der Verbrauch aus dem Nachbarstand berechnet, beides in O(log n).
+#
+# Die Datenbank liegt neben der CSV-Datei (gas_data.csv -> gas_data.sqlite3), alle Funktionen
+# nehmen daher weiter den Pfad der CSV-Datei. Beim ersten Öffnen wird eine vorhandene CSV-Datei
+# einmalig übernommen; mit export_csv() entsteht wieder eine CSV im bisherigen Format.
+
+# Spalten der CSV-Datei und der Tabelle in derselben Reihenfolge
+COLUMNS = [
+    ('Timestamp', 'timestamp'),
+    ('Temperature', 'temperature'),
+    ('Humidity', 'humidity'),
+    ('ImageFile', 'image_file'),
+    ('Number', 'number'),
+    ('Verbrauch', 'verbrauch'),
+    ('Kosten_pro_Stunde', 'kosten_pro_stunde'),
+    ('Verworfen', 'verworfen'),
+]
+PRICE_PER_KWH_CENT = 21.11  # Für Kosten_pro_Stunde, wie in calculate_historical_data.py
+MAX_PLAUSIBLE_WATTS = 10000  # Höhere Werte gelten als Ausreißer und werden nicht eingetragen
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+def store_path(csv_path):
+    """Pfad der Datenbank zur CSV-Datei."""
+    return os.path.splitext(csv_path)[0] + '.sqlite3'
+
+def _connect(csv_path):
+    """Öffnet eine eigene Verbindung pro Aufruf (wie ocr_jobs), die Tabelle wird beim ersten Mal angelegt."""
+    db_path = store_path(csv_path)
+    if db_path not in _initialized:
+        _init_db(csv_path, db_path)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def _init_db(csv_path, db_path):
+    """Legt Tabelle und Indizes an und übernimmt einmalig die vorhandene CSV-Datei."""
+    with _init_lock:
+        if db_path in _initialized:
+            return
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS readings (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    temperature TEXT,
+                    humidity TEXT,
+                    image_file TEXT,
+                    number TEXT,
+                    value REAL,
+                    verbrauch REAL,
+                    kosten_pro_stunde REAL,
+                    verworfen TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_readings_timestamp ON readings (timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_readings_image_file ON readings (image_file)")
+            conn.execute("CREATE TABLE IF NOT EXISTS store_info (key TEXT PRIMARY KEY, value TEXT)")
+            # Die Übernahme der CSV läuft in einer Schreibtransaktion, damit parallele Prozesse sie nur einmal ausführen
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM store_info WHERE key = 'csv_imported'").fetchone() is None:
+                    if os.path.exists(csv_path):
+                        count = _import_rows(conn, csv_path)
+                        print(f"Zählerstände: {count} Zeilen aus '{csv_path}' übernommen ({db_path}).")
+                    conn.execute("INSERT INTO store_info (key, value) VALUES ('csv_imported', ?)",
+                                 (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        _initialized.add(db_path)
+
+def _parse_number(number):
+    """Zählerstand als Zahl ("1234,56", "1234.56" oder leer)."""
+    if number is None:
+        return None
+    try:
+        return float(str(number).strip().strip('"').replace(',', '.'))
+    except ValueError:
+        return None
+
+def _import_rows(conn, csv_path):
+    """Übernimmt alle Zeilen einer CSV-Datei; unbekannte Spalten werden ignoriert."""
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    rows = []
+    for record in df.to_dict('records'):
+        values = {column: (record.get(csv_column) or None) for csv_column, column in COLUMNS}
+        if not values['timestamp']:
+            continue
+        number = values['number']
+        if number is not None:
+            number = number.strip('"').replace(',', '.')
+        rows.append((values['timestamp'], values['temperature'], values['humidity'], values['image_file'],
+                     number, _parse_number(number), _parse_number(values['verbrauch']),
+                     _parse_number(values['kosten_pro_stunde']), values['verworfen']))
+    conn.executemany("INSERT INTO readings (timestamp, temperature, humidity, image_file, number, value, "
+                     "verbrauch, kosten_pro_stunde, verworfen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+def open_store(csv_path):
+    """Legt die Datenbank an bzw. übernimmt die CSV-Datei, ohne etwas zu ändern."""
+    _connect(csv_path).close()
+
+def add_reading(csv_path, timestamp, temperature, humidity, image_file):
+    """Legt eine neue Zeile für ein empfangenes Bild an, noch ohne Zählerstand."""
+    conn = _connect(csv_path)
+    try:
+        conn.execute("INSERT INTO readings (timestamp, temperature, humidity, image_file) VALUES (?, ?, ?, ?)",
+                     (timestamp, temperature, humidity, image_file))
+    finally:
+        conn.close()
+
+def _watts(previous, current):
+    """Verbrauch zwischen zwei Ständen ((zeitstempel, wert)) wie bisher: Differenz * 1000 / Stunden."""
+    seconds = (datetime.strptime(current[0], '%Y-%m-%d %H:%M:%S') -
+               datetime.strptime(previous[0], '%Y-%m-%d %H:%M:%S')).total_seconds()
+    if seconds <= 0:
+        return None
+    return round((current[1] - previous[1]) * 1000 / (seconds / 3600), 2)
+
+def _neighbor(conn, timestamp, row_id, before):
+    """Nächste Zeile mit Zählerstand vor bzw. nach einem Zeitstempel (über den Index)."""
+    if before:
+        sql = ("SELECT timestamp, value FROM readings WHERE value IS NOT NULL AND id != ? AND timestamp < ? "
+               "ORDER BY timestamp DESC LIMIT 1")
+    else:
+        sql = ("SELECT id, timestamp, value FROM readings WHERE value IS NOT NULL AND id != ? AND timestamp > ? "
+               "ORDER BY timestamp LIMIT 1")
+    return conn.execute(sql, (row_id, timestamp)).fetchone()
+
+def _attributed(value, base):
+    """Verbrauch in m³, der einem Stand gegenüber seinem Vorgänger zugerechnet wird (0, wenn einer fehlt)."""
+    if value is None or base is None:
+        return 0.0
+    return value - base
+
+def set_number(csv_path, timestamp, number):
+    """
+    Trägt einen erkannten Zählerstand in die Zeile mit diesem Zeitstempel ein und berechnet den
+    Verbrauch zum vorherigen Stand. Auch der Verbrauch des nächsten Standes wird neu berechnet,
+    da die Bilder (z.B. mit mehreren OCR-Workern) nicht in zeitlicher Reihenfolge fertig werden.
+    Die Verbrauchssummen (rollups.py) werden um die Änderung beider Stände fortgeschrieben.
+
+    Args:
+        number: Erkannter Zahlenwert (z.B. "1234,56")
+
+    Returns:
+        (Zeile gefunden, Verbrauch in Watt oder None)
+    """
+    clean_value = str(number).strip('"').replace(',', '.')
+    value = _parse_number(clean_value)
+    changes = []
+    conn = _connect(csv_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT id, value FROM readings WHERE timestamp = ? ORDER BY id LIMIT 1",
+                               (timestamp,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return False, None
+            row_id, old_value = row
+            previous = _neighbor(conn, timestamp, row_id, before=True)
+            consumption = _watts(previous, (timestamp, value)) if previous and value is not None else None
+            # Ein früherer Ablehnungsgrund gilt nicht mehr
+            conn.execute("UPDATE readings SET number = ?, value = ?, verbrauch = COALESCE(?, verbrauch), "
+                         "verworfen = NULL WHERE id = ?", (clean_value, value, consumption, row_id))
+            following = _neighbor(conn, timestamp, row_id, before=False)
+            if following and value is not None:
+                next_consumption = _watts((timestamp, value), (following[1], following[2]))
+                if next_consumption is not None:
+                    conn.execute("UPDATE readings SET verbrauch = ? WHERE id = ?", (next_consumption, following[0]))
+            # Änderung des zugerechneten Verbrauchs für diesen und den folgenden Stand
+            base = previous[1] if previous else None
+            changes.append((timestamp, _attributed(value, base) - _attributed(old_value, base)))
+            if following:
+                changes.append((following[1],
+                                _attributed(following[2], value if value is not None else base) -
+                                _attributed(following[2], old_value if old_value is not None else base)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    try:
+        rollups.add_gas(csv_path, changes, [(timestamp, value)] if value is not None else [])
+    except Exception as e:
+        print(f"Fehler beim Fortschreiben der Verbrauchssummen: {e}")
+    return True, consumption
+
+def set_rejected(csv_path, timestamp, reason):
+    """Trägt den Grund ein, aus dem das Bild vor der OCR verworfen wurde. Returns: True, wenn die Zeile existiert."""
+    conn = _connect(csv_path)
+    try:
+        return conn.execute("UPDATE readings SET verworfen = ? WHERE id = "
+                            "(SELECT id FROM readings WHERE timestamp = ? ORDER BY id LIMIT 1)",
+                            (reason, timestamp)).rowcount > 0
+    finally:
+        conn.close()
+
+def values(csv_path):
+    """Alle Zählerstände als DataFrame mit den Spalten Timestamp und Value, sortiert nach Zeitstempel."""
+    conn = _connect(csv_path)
+    try:
+        rows = conn.execute("SELECT timestamp, value FROM readings WHERE value IS NOT NULL "
+                            "ORDER BY timestamp").fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame(rows, columns=['Timestamp', 'Value'])
+
+def previous_value(csv_path, timestamp, lookback=50):
+    """
+    Letzter plausibler Stand vor einem Zeitstempel, ohne alle Stände zu laden. Ein Stand gilt wie in
+    image_evaluator.load_readings als Ausreißer, wenn er größer als der auf ihn folgende Stand ist.
+
+    Returns:
+        (Zeitstempel, Zählerstand) oder None
+    """
+    conn = _connect(csv_path)
+    try:
+        earlier = conn.execute("SELECT timestamp, value FROM readings WHERE value IS NOT NULL AND timestamp < ? "
+                               "ORDER BY timestamp DESC LIMIT ?", (timestamp, lookback)).fetchall()
+        later = conn.execute("SELECT value FROM readings WHERE value IS NOT NULL AND timestamp >= ? "
+                             "ORDER BY timestamp LIMIT 1", (timestamp,)).fetchone()
+    finally:
+        conn.close()
+    following = later[0] if later else None
+    for candidate_timestamp, value in earlier:
+        if following is None or value <= following:
+            return candidate_timestamp, float(value)
+        following = value
+    return None
+
+def time_span(csv_path):
+    """Ältester und neuester Zeitstempel ('YYYY-mm-dd HH:MM:SS') oder (None, None) ohne Zeilen."""
+    conn = _connect(csv_path)
+    try:
+        return conn.execute("SELECT min(timestamp), max(timestamp) FROM readings").fetchone()
+    finally:
+        conn.close()
+
+def load_frame(csv_path, start=None, end=None):
+    """
+    Alle Zeilen im Format der bisherigen CSV-Datei (Spalten wie COLUMNS), sortiert nach Zeitstempel.
+
+    Args:
+        start, end: Zeitstempel ('YYYY-mm-dd HH:MM:SS') für [start, end) über den Index; None für offen
+    """
+    sql = f"SELECT {', '.join(column for _, column in COLUMNS)} FROM readings WHERE 1 = 1"
+    params = []
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND timestamp < ?"
+        params.append(end)
+    conn = _connect(csv_path)
+    try:
+        rows = conn.execute(sql + " ORDER BY timestamp, id", params).fetchall()
+    finally:
+        conn.close()
+    df = pd.DataFrame(rows, columns=[csv_column for csv_column, _ in COLUMNS])
+    df[['Verbrauch', 'Kosten_pro_Stunde']] = df[['Verbrauch', 'Kosten_pro_Stunde']].astype(float)
+    return df
+
+def export_csv(csv_path, output_path=None):
+    """Schreibt alle Zeilen als CSV-Datei (Standard: die CSV-Datei selbst). Returns: Anzahl der Zeilen."""
+    df = load_frame(csv_path)
+    output_path = output_path or csv_path
+    tmp_file = f"{output_path}.{os.getpid()}.tmp"
+    df.to_csv(tmp_file, index=False)
+    os.replace(tmp_file, output_path)
+    return len(df)
+
+def recalculate_consumption(csv_path):
+    """
+    Berechnet Verbrauch und Kosten pro Stunde für alle aufeinanderfolgenden Stände neu, in einem
+    Durchlauf über den Index und einer Transaktion.
+
+    Returns:
+        (Anzahl aktualisierter Zeilen, Anzahl möglicher Zeilen)
+    """
+    conn = _connect(csv_path)
+    try:
+        rows = conn.execute("SELECT id, timestamp, value FROM readings WHERE value IS NOT NULL "
+                            "ORDER BY timestamp").fetchall()
+        updates = []
+        for (_, prev_timestamp, prev_value), (row_id, timestamp, value) in zip(rows, rows[1:]):
+            watts = _watts((prev_timestamp, prev_value), (timestamp, value))
+            # Negative Werte (Zähler zurückgesetzt) und unplausibel hohe Werte ignorieren
+            if watts is not None and 0 <= watts < MAX_PLAUSIBLE_WATTS:
+                updates.append((watts, round(watts / 1000 * PRICE_PER_KWH_CENT, 2), row_id))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("UPDATE readings SET verbrauch = ?, kosten_pro_stunde = ? WHERE id = ?", updates)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return len(updates), max(0, len(rows) - 1)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Zählerstände aus der CSV-Datei übernehmen oder als CSV exportieren')
+    parser.add_argument('command', choices=['import', 'export'],
+                        help="'import': CSV-Datei einmalig übernehmen (geschieht auch automatisch beim ersten Zugriff), "
+                             "'export': alle Zeilen als CSV-Datei schreiben")
+    parser.add_argument('--csv', type=str, help='CSV-Datei, neben der die Datenbank liegt')
+    parser.add_argument('--output', type=str, help='Ziel des Exports (Standard: die CSV-Datei selbst)')
+    args = parser.parse_args()
+
+    csv_path = args.csv or os.path.join(os.path.dirname(__file__), 'gas_data.csv')
+    if args.command == 'import':
+        open_store(csv_path)
+        print(f"Datenbank: {store_path(csv_path)}")
+    else:
+        count = export_csv(csv_path, args.output)
+        print(f"{count} Zeilen nach '{args.output or csv_path}' exportiert.")
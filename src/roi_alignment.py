@@ -0,0 +1,150 @@
+import os
+import threading
+import cv2
+import numpy as np
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+REFERENCE_FILE = os.getenv("ROI_REFERENCE_FILE", os.path.join(BASE_DIR, 'data', 'roi_reference.npz'))
+# --- Ende Konfiguration ---
+
+# Ausrichtung der ROIs bei verrutschter Kamera: Jedes Bild wird verkleinert mit einem Referenzbild
+# verglichen, zu dem die ROI-Koordinaten passen. Die Verschiebung wird per Phasenkorrelation
+# bestimmt und zwischengespeichert. Für jedes weitere Bild wird nur geprüft, ob es bei der
+# gespeicherten Verschiebung noch zur Referenz passt (Korrelation der Kantenbilder); erst wenn
+# nicht, wird die Verschiebung neu bestimmt. Eine verrutschte Halterung verschiebt das Bild,
+# daher wird nur eine Translation geschätzt.
+
+# Referenz und Verschiebung; wird neu geladen, wenn ein anderer Worker die Datei geändert hat
+_state = None
+_state_mtime = None
+_lock = threading.Lock()
+
+def _small(gray_image, scale):
+    """Verkleinertes Bild als float32."""
+    return cv2.resize(gray_image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+def _edges(small):
+    """
+    Geglätteter Betrag des Gradienten. Unabhängig von der Helligkeit des Blitzes und ohne die
+    großen gleichmäßigen Flächen, die die Phasenkorrelation sonst zur Verschiebung 0 ziehen.
+    """
+    edges = cv2.magnitude(cv2.Sobel(small, cv2.CV_32F, 1, 0), cv2.Sobel(small, cv2.CV_32F, 0, 1))
+    return cv2.GaussianBlur(edges, (0, 0), 1.0)
+
+def _shifted_correlation(reference, image, shift):
+    """
+    Normierte Kreuzkorrelation zwischen der Referenz und dem um shift (dx, dy, auch Bruchteile
+    von Pixeln) verschobenen Bild. Das Bild wird zurückgeschoben, verglichen wird ohne Rand.
+    """
+    dx, dy = shift
+    height, width = reference.shape
+    margin_x, margin_y = int(np.ceil(abs(dx))) + 1, int(np.ceil(abs(dy))) + 1
+    if 2 * margin_x >= width or 2 * margin_y >= height:
+        return 0.0
+    aligned = cv2.warpAffine(image, np.float32([[1, 0, -dx], [0, 1, -dy]]), (width, height))
+    ref = reference[margin_y:height - margin_y, margin_x:width - margin_x]
+    img = aligned[margin_y:height - margin_y, margin_x:width - margin_x]
+    ref = ref - ref.mean()
+    img = img - img.mean()
+    norm = np.sqrt(float(np.vdot(ref, ref)) * float(np.vdot(img, img)))
+    return float(np.vdot(ref, img)) / norm if norm else 0.0
+
+def _load():
+    global _state, _state_mtime
+    try:
+        mtime = os.path.getmtime(REFERENCE_FILE)
+    except OSError:
+        return _state
+    if _state is None or mtime != _state_mtime:
+        try:
+            with np.load(REFERENCE_FILE) as data:
+                _state = {key: data[key] for key in ('reference', 'scale', 'shift')}
+            _state['edges'] = _edges(_state['reference'])
+            _state_mtime = mtime
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warnung: ROI-Referenzbild konnte nicht gelesen werden: {e}")
+    return _state
+
+def _save(state):
+    global _state, _state_mtime
+    reference_dir = os.path.dirname(REFERENCE_FILE)
+    if reference_dir and not os.path.exists(reference_dir):
+        os.makedirs(reference_dir)
+    # Eindeutige temporäre Datei pro Prozess, damit parallele Worker sich nicht in die Quere kommen
+    tmp_file = f"{REFERENCE_FILE}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_file, **state)
+    os.replace(tmp_file, REFERENCE_FILE)
+    _state = dict(state, edges=_edges(state['reference']))
+    _state_mtime = os.path.getmtime(REFERENCE_FILE)
+
+def set_reference(gray_image, scale):
+    """Speichert ein (ungedrehtes) Graustufenbild als Referenz, zu der die ROI-Koordinaten passen."""
+    with _lock:
+        _save({
+            'reference': _small(gray_image, scale),
+            'scale': np.float32(scale),
+            'shift': np.zeros(2, dtype=np.float32)
+        })
+
+def roi_offset(gray_image, config):
+    """
+    Bestimmt, um wie viele Pixel die ROIs für dieses Bild verschoben werden müssen. Ohne
+    Referenzbild wird das Bild selbst zur Referenz (Verschiebung 0).
+
+    Args:
+        gray_image: Ungedrehtes Graustufenbild
+        config: Abschnitt "alignment" der OCR-Konfiguration
+
+    Returns:
+        (dx, dy) in ganzen Pixeln im Koordinatensystem der ROIs (um 180 Grad gedrehtes Bild)
+    """
+    scale = config["scale"]
+    small = _small(gray_image, scale)
+    with _lock:
+        state = _load()
+    if state is None or state['reference'].shape != small.shape or float(state['scale']) != scale:
+        print("ROI-Ausrichtung: Neues Referenzbild gespeichert.")
+        set_reference(gray_image, scale)
+        return 0, 0
+
+    shift = state['shift']
+    edges = _edges(small)
+    # Schnelle Prüfung: passt das Bild bei der gespeicherten Verschiebung noch zur Referenz?
+    if _shifted_correlation(state['edges'], edges, shift * scale) < config["min_correlation"]:
+        window = cv2.createHanningWindow(small.shape[::-1], cv2.CV_32F)
+        # phaseCorrelate verändert seine Eingaben, daher mit Kopien
+        (dx, dy), response = cv2.phaseCorrelate(state['edges'].copy(), edges.copy(), window)
+        new_shift = np.array([dx / scale, dy / scale], dtype=np.float32)
+        if response < config["min_response"] or np.abs(new_shift).max() > config["max_shift"]:
+            print(f"Warnung: ROI-Ausrichtung unsicher (Antwort {response:.2f}, "
+                  f"Verschiebung {new_shift[0]:.0f}/{new_shift[1]:.0f} px), alte Verschiebung bleibt.")
+        elif np.abs(new_shift - shift).max() >= 1:
+            print(f"ROI-Ausrichtung: Bild um {new_shift[0]:.0f}/{new_shift[1]:.0f} px verschoben.")
+            with _lock:
+                _save({'reference': state['reference'], 'scale': state['scale'], 'shift': new_shift})
+            shift = new_shift
+
+    # Die ROI-Koordinaten beziehen sich auf das um 180 Grad gedrehte Bild
+    return -int(round(float(shift[0]))), -int(round(float(shift[1])))
+
+def shift_rois(rois, offset):
+    """Gibt die ROI-Definitionen um offset (dx, dy) verschoben zurück."""
+    dx, dy = offset
+    return [dict(roi, x=roi["x"] + dx, y=roi["y"] + dy) for roi in rois]
+
+
+if __name__ == "__main__":
+    import argparse
+    from ocr_config import load_config
+
+    parser = argparse.ArgumentParser(description='Referenzbild für die ROI-Ausrichtung festlegen')
+    parser.add_argument('image', type=str, help='Kamerabild, zu dem die ROI-Koordinaten passen')
+    args = parser.parse_args()
+
+    gray_image = cv2.imdecode(np.fromfile(args.image, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray_image is None:
+        print(f"Fehler: Bild konnte nicht geladen werden: '{args.image}'")
+    else:
+        set_reference(gray_image, load_config()["alignment"]["scale"])
+        print(f"Referenzbild gespeichert unter '{REFERENCE_FILE}'.")
@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+
+# Stapelverarbeitung aller ROIs eines Bildes: Die ROI-Geometrie wird einmal pro Bildgröße in
+# Ausschnittsgrenzen übersetzt, die Ausschnitte landen in einem gemeinsamen Stapel (Anzahl, H, W)
+# und jede Vorverarbeitungs-Variante wird direkt in einen eigenen Stapel geschrieben.
+#
+# Gemessen mit 6 ROIs von 80x110 Pixeln: NumPy-Indexoperationen über den ganzen Stapel und
+# gestapelte Filteraufrufe mit Rand sind langsamer als ein OpenCV-Aufruf pro Ausschnitt, der
+# ohne neue Speicherbelegung in den Stapel schreibt. Deshalb bleibt die Schleife in OpenCV.
+
+def compile_rois(rois):
+    """
+    Übersetzt die ROI-Definitionen (Koordinaten im um 180 Grad gedrehten Bild) in Arrays.
+
+    Returns:
+        Dictionary mit "boxes" (Anzahl x 4: x, y, w, h), der gemeinsamen Stapelgröße
+        "height"/"width" und einem Cache der Ausschnittsgrenzen pro Bildgröße
+    """
+    boxes = np.array([[roi["x"], roi["y"], roi["w"], roi["h"]] for roi in rois], dtype=np.int64)
+    return {
+        "boxes": boxes,
+        "height": int(boxes[:, 3].max()),
+        "width": int(boxes[:, 2].max()),
+        "slices": {}
+    }
+
+def _frame_slices(geometry, frame_shape):
+    """
+    Ausschnittsgrenzen (y0, y1, x0, x1) aller ROIs im ungedrehten Bild, einmal pro Bildgröße
+    berechnet. None für ROIs, die außerhalb des Bildes liegen oder leer sind.
+    """
+    if frame_shape not in geometry["slices"]:
+        height, width = frame_shape
+        slices = []
+        for x, y, w, h in geometry["boxes"].tolist():
+            if x >= 0 and y >= 0 and w > 0 and h > 0 and x + w <= width and y + h <= height:
+                slices.append((height - y - h, height - y, width - x - w, width - x))
+            else:
+                slices.append(None)
+        geometry["slices"][frame_shape] = slices
+    return geometry["slices"][frame_shape]
+
+def extract_stack(geometry, gray_image):
+    """
+    Schneidet alle ROIs aus dem ungedrehten Graustufenbild in einen gemeinsamen Stapel.
+    Jeder Ausschnitt wird dabei um 180 Grad gedreht, das ganze Bild dagegen nicht.
+
+    Returns:
+        (Stapel der Form (Anzahl, H, W), unten/rechts mit 0 aufgefüllt; Liste der Ausschnitte
+        als Sichten auf den Stapel, None für ROIs außerhalb des Bildes)
+    """
+    stack = np.zeros((len(geometry["boxes"]), geometry["height"], geometry["width"]), dtype=np.uint8)
+    crops = []
+    for i, bounds in enumerate(_frame_slices(geometry, gray_image.shape[:2])):
+        if bounds is None:
+            crops.append(None)
+            continue
+        y0, y1, x0, x1 = bounds
+        crop = stack[i, :y1 - y0, :x1 - x0]
+        crops.append(cv2.rotate(gray_image[y0:y1, x0:x1], cv2.ROTATE_180, dst=crop))
+    return stack, crops
+
+def _output_stack(images, scale=1):
+    """Legt einen Ausgabestapel an, in den jeder Ausschnitt (ggf. vergrößert) passt."""
+    height = max(img.shape[0] for img in images) * scale
+    width = max(img.shape[1] for img in images) * scale
+    return np.empty((len(images), height, width), dtype=np.uint8)
+
+def preprocess_batch(images, variant):
+    """
+    Berechnet eine Vorverarbeitungs-Variante für mehrere Graustufen-Ausschnitte. Die Ergebnisse
+    werden in einen gemeinsamen Stapel geschrieben; zurückgegeben werden Sichten darauf.
+
+    Returns:
+        Liste der Varianten in der Reihenfolge der Eingabe
+    """
+    if variant == "original" or not images:
+        return list(images)
+
+    results = []
+    if variant == "adaptive":
+        # Adaptive Threshold
+        out = _output_stack(images)
+        for i, img in enumerate(images):
+            h, w = img.shape[:2]
+            results.append(cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                 cv2.THRESH_BINARY_INV, 11, 2, dst=out[i, :h, :w]))
+        return results
+    if variant == "minimal":
+        # Minimale Verarbeitung mit Otsu-Thresholding
+        out = _output_stack(images)
+        for i, img in enumerate(images):
+            h, w = img.shape[:2]
+            blurred = cv2.GaussianBlur(img, (3, 3), 0, dst=out[i, :h, :w])
+            results.append(cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU, dst=blurred)[1])
+        return results
+    if variant == "resized":
+        # Vergrößerte Version für bessere OCR
+        out = _output_stack(images, scale=3)
+        for i, img in enumerate(images):
+            h, w = img.shape[:2]
+            resized = cv2.resize(img, (w * 3, h * 3), dst=out[i, :h * 3, :w * 3], interpolation=cv2.INTER_CUBIC)
+            results.append(cv2.threshold(resized, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU, dst=resized)[1])
+        return results
+    raise ValueError(f"Unbekannte Bildvariante: {variant}")
+
+def make_strip(images, gap):
+    """
+    Legt Ausschnitte mit Abstand nebeneinander auf einen Streifen, vertikal zentriert. Der
+    Hintergrund wird mit dem Median der Randpixel aller Ausschnitte gefüllt.
+
+    Returns:
+        (Streifen, Liste der horizontalen Bereiche (x0, x1) der Ausschnitte auf dem Streifen)
+    """
+    height = max(img.shape[0] for img in images)
+    width = sum(img.shape[1] for img in images) + gap * (len(images) + 1)
+    border = np.concatenate([np.concatenate([img[:, 0], img[:, -1], img[0, :], img[-1, :]]) for img in images])
+    strip = np.full((height + 2 * gap, width), int(np.median(border)), dtype=np.uint8)
+
+    slots = []
+    x = gap
+    for img in images:
+        h, w = img.shape[:2]
+        y = gap + (height - h) // 2
+        strip[y:y + h, x:x + w] = img
+        slots.append((x, x + w))
+        x += w + gap
+    return strip, slots
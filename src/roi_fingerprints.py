@@ -0,0 +1,82 @@
+import os
+import threading
+import numpy as np
+from digit_classifier import features
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+FINGERPRINT_FILE = os.getenv("ROI_FINGERPRINT_FILE", os.path.join(BASE_DIR, 'data', 'roi_fingerprints.npz'))
+# --- Ende Konfiguration ---
+
+# Zuletzt akzeptierte Ausschnitte pro ROI; wird neu geladen, wenn ein anderer Worker die Datei geändert hat
+_last = None
+_last_mtime = None
+_lock = threading.Lock()
+
+def _load():
+    global _last, _last_mtime
+    try:
+        mtime = os.path.getmtime(FINGERPRINT_FILE)
+    except OSError:
+        return _last
+    if _last is None or mtime != _last_mtime:
+        try:
+            with np.load(FINGERPRINT_FILE) as data:
+                _last = {key: data[key] for key in ('features', 'digits', 'confs')}
+            _last_mtime = mtime
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warnung: ROI-Fingerabdrücke konnten nicht gelesen werden: {e}")
+    return _last
+
+def find_unchanged(images, min_correlation):
+    """
+    Vergleicht jeden ROI-Ausschnitt mit dem zuletzt per OCR erkannten Ausschnitt derselben ROI
+    (normierte Kreuzkorrelation der verkleinerten Bilder).
+
+    Returns:
+        Pro ROI (ziffer, konfidenz) des letzten Bildes, wenn sich der Ausschnitt nicht verändert hat, sonst None
+    """
+    with _lock:
+        last = _load()
+    if last is None or len(last['digits']) != len(images):
+        return [None] * len(images)
+
+    correlation = np.einsum('ij,ij->i', features(images), last['features'])
+    return [(str(digit), float(conf)) if digit != '' and corr >= min_correlation else None
+            for corr, digit, conf in zip(correlation, last['digits'], last['confs'])]
+
+def store(images, digits, confs, update):
+    """
+    Speichert die Ausschnitte der ROIs, deren Ziffer neu bestimmt wurde (update[i] True), als
+    Vergleichsbasis für die nächsten Bilder. Übernommene ROIs behalten ihren bisherigen
+    Ausschnitt, damit sich langsame Änderungen (z.B. eine drehende Rolle) nicht unbemerkt aufsummieren.
+    """
+    global _last, _last_mtime
+    if not any(update):
+        return
+    new_features = features(images)
+    with _lock:
+        last = _load()
+        if last is None or len(last['digits']) != len(images):
+            last = {
+                'features': np.zeros_like(new_features),
+                'digits': np.array([''] * len(images), dtype='<U1'),
+                'confs': np.zeros(len(images), dtype=np.float32)
+            }
+            update = [True] * len(images)
+        last = {key: value.copy() for key, value in last.items()}
+        for i, changed in enumerate(update):
+            if changed:
+                last['features'][i] = new_features[i]
+                last['digits'][i] = digits[i]
+                last['confs'][i] = confs[i]
+
+        fingerprint_dir = os.path.dirname(FINGERPRINT_FILE)
+        if fingerprint_dir and not os.path.exists(fingerprint_dir):
+            os.makedirs(fingerprint_dir)
+        # Eindeutige temporäre Datei pro Prozess, damit parallele Worker sich nicht in die Quere kommen
+        tmp_file = f"{FINGERPRINT_FILE}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_file, **last)
+        os.replace(tmp_file, FINGERPRINT_FILE)
+        _last = last
+        _last_mtime = os.path.getmtime(FINGERPRINT_FILE)
@@ -0,0 +1,256 @@
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+import pulse_log
+
+# --- Konfiguration ---
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+ROLLUP_DB = os.getenv("ROLLUP_DB", os.path.join(BASE_DIR, 'data', 'rollups.sqlite3'))
+ROTATIONS_PER_KWH = float(os.getenv("ELECTRICITY_ROTATIONS_PER_KWH", "75"))
+ELECTRICITY_PRICE_PER_KWH_EURO = float(os.getenv("ELECTRICITY_COST_PER_KWH_EURO", "0.4017"))
+# --- Ende Konfiguration ---
+
+# Verbrauchssummen pro Stunde, Tag, ISO-Woche und Monat (Ortszeit), die beim Eintreffen der Daten
+# fortgeschrieben werden, statt electricity_hourly.csv und gas_hourly.csv von Hand neu zu erzeugen.
+# Pro Zähler und Zeitraum gibt es eine Zeile mit kWh, Kosten, Anzahl der Impulse (Strom) sowie
+# kleinstem und größtem Zählerstand (Gas). Fehlt eine Zählerart noch, werden ihre Zeilen beim
+# ersten Zugriff einmalig aus dem Impulsprotokoll bzw. der Zählerstands-Datenbank aufgebaut.
+#
+# Beim Gas wird der Verbrauch zwischen zwei Ständen dem Zeitraum des späteren Standes
+# zugerechnet. Wird ein Stand nachträglich eingetragen oder korrigiert, liefert
+# readings_store.set_number die Änderung für diesen und den folgenden Stand. Kleinster und
+# größter Stand werden dabei nur erweitert; "python src/rollups.py rebuild" baut alles neu auf.
+
+GRAINS = ['hour', 'day', 'week', 'month']
+
+_init_lock = threading.Lock()
+_initialized = False
+
+def _connect():
+    """Öffnet eine eigene Verbindung pro Aufruf (wie ocr_jobs), die Tabelle wird beim ersten Mal angelegt."""
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                db_dir = os.path.dirname(ROLLUP_DB)
+                if db_dir and not os.path.exists(db_dir):
+                    os.makedirs(db_dir)
+                conn = sqlite3.connect(ROLLUP_DB, timeout=30, isolation_level=None)
+                try:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS rollups (
+                            meter TEXT NOT NULL,
+                            grain TEXT NOT NULL,
+                            period TEXT NOT NULL,
+                            kwh REAL NOT NULL DEFAULT 0,
+                            cost REAL NOT NULL DEFAULT 0,
+                            pulses INTEGER NOT NULL DEFAULT 0,
+                            reading_min REAL,
+                            reading_max REAL,
+                            PRIMARY KEY (meter, grain, period)
+                        ) WITHOUT ROWID
+                    """)
+                    conn.execute("CREATE TABLE IF NOT EXISTS rollup_info (meter TEXT PRIMARY KEY, built TEXT NOT NULL)")
+                finally:
+                    conn.close()
+                _initialized = True
+    conn = sqlite3.connect(ROLLUP_DB, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def periods(moment):
+    """Bezeichnungen der Zeiträume eines Zeitpunkts (datetime) in der Reihenfolge von GRAINS."""
+    return [moment.strftime('%Y-%m-%d %H:00'), moment.strftime('%Y-%m-%d'),
+            moment.strftime('%G-W%V'), moment.strftime('%Y-%m')]
+
+def _pulse_rows(timestamps):
+    """Fasst Impulse (Unix-Zeitstempel) pro Zeitraum zusammen: {(grain, period): anzahl}."""
+    totals = defaultdict(int)
+    if len(timestamps) == 0:
+        return totals
+    hours, counts = np.unique(np.asarray(timestamps, dtype=np.int64) // 3600, return_counts=True)
+    for hour, count in zip(hours, counts):
+        for grain, period in zip(GRAINS, periods(datetime.fromtimestamp(int(hour) * 3600))):
+            totals[(grain, period)] += int(count)
+    return totals
+
+def _gas_rows(changes, readings):
+    """
+    Fasst Änderungen beim Gas pro Zeitraum zusammen.
+
+    Args:
+        changes: Liste von (zeitstempel, änderung des zugerechneten Verbrauchs in m³)
+        readings: Liste von (zeitstempel, zählerstand) für kleinsten und größten Stand
+
+    Returns:
+        {(grain, period): [m³, kleinster stand, größter stand]}
+    """
+    totals = defaultdict(lambda: [0.0, None, None])
+    for timestamp, delta in changes:
+        for key in zip(GRAINS, periods(datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S'))):
+            totals[key][0] += delta
+    for timestamp, value in readings:
+        for key in zip(GRAINS, periods(datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S'))):
+            entry = totals[key]
+            entry[1] = value if entry[1] is None else min(entry[1], value)
+            entry[2] = value if entry[2] is None else max(entry[2], value)
+    return totals
+
+def _upsert(conn, meter, rows):
+    """Addiert kWh, Kosten und Impulse und erweitert kleinsten/größten Stand, in einer Anweisung pro Zeile."""
+    conn.executemany("""
+        INSERT INTO rollups (meter, grain, period, kwh, cost, pulses, reading_min, reading_max)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (meter, grain, period) DO UPDATE SET
+            kwh = kwh + excluded.kwh,
+            cost = cost + excluded.cost,
+            pulses = pulses + excluded.pulses,
+            reading_min = min(COALESCE(reading_min, excluded.reading_min), COALESCE(excluded.reading_min, reading_min)),
+            reading_max = max(COALESCE(reading_max, excluded.reading_max), COALESCE(excluded.reading_max, reading_max))
+    """, [(meter, grain, period) + values for (grain, period), values in rows.items()])
+
+def _electricity_values(totals):
+    return {key: (count / ROTATIONS_PER_KWH, count / ROTATIONS_PER_KWH * ELECTRICITY_PRICE_PER_KWH_EURO,
+                  count, None, None) for key, count in totals.items()}
+
+def _gas_values(totals):
+    # gas_data_evaluator importiert readings_store, das wiederum rollups importiert, daher erst hier
+    from gas_data_evaluator import BRENNWERT, ZUSTANDSZAHL, PRICE_PER_KWH_EURO as GAS_PRICE_PER_KWH_EURO
+    values = {}
+    for key, (m3, reading_min, reading_max) in totals.items():
+        kwh = m3 * ZUSTANDSZAHL * BRENNWERT
+        values[key] = (kwh, kwh * GAS_PRICE_PER_KWH_EURO, 0, reading_min, reading_max)
+    return values
+
+def _gas_history(gas_csv):
+    """Verbrauch aller Stände aus der Zählerstands-Datenbank, jeweils dem späteren Stand zugerechnet."""
+    import readings_store  # readings_store ruft add_gas auf, daher erst hier importieren
+    df = readings_store.values(gas_csv)
+    timestamps = df['Timestamp'].tolist()
+    values = df['Value'].astype(float).tolist()
+    changes = [(timestamp, value - previous)
+               for timestamp, value, previous in zip(timestamps[1:], values[1:], values)]
+    return _gas_rows(changes, list(zip(timestamps, values)))
+
+def _write(meter, rows, rebuild_source):
+    """
+    Schreibt Zeilen einer Zählerart in einer Transaktion. Ist die Zählerart noch nicht aufgebaut,
+    werden stattdessen alle Zeilen aus rebuild_source() erzeugt (die neuen Daten sind dort enthalten).
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM rollup_info WHERE meter = ?", (meter,)).fetchone() is None:
+                conn.execute("DELETE FROM rollups WHERE meter = ?", (meter,))
+                rows = rebuild_source()
+                conn.execute("INSERT INTO rollup_info (meter, built) VALUES (?, ?)",
+                             (meter, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                print(f"Verbrauchssummen ({meter}): {len(rows)} Zeilen aufgebaut ({ROLLUP_DB}).")
+            _upsert(conn, meter, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+def add_pulses(electricity_csv, timestamps):
+    """Rechnet neu gespeicherte Impulse (Unix-Zeitstempel) in die Summen ein."""
+    _write('electricity', _electricity_values(_pulse_rows(timestamps)),
+           lambda: _electricity_values(_pulse_rows(pulse_log.read_all(electricity_csv))))
+
+def add_gas(gas_csv, changes, readings):
+    """
+    Rechnet einen eingetragenen Gas-Zählerstand in die Summen ein.
+
+    Args:
+        changes: Liste von (zeitstempel, änderung des Verbrauchs in m³), siehe readings_store.set_number
+        readings: Liste von (zeitstempel, zählerstand)
+    """
+    _write('gas', _gas_values(_gas_rows(changes, readings)), lambda: _gas_values(_gas_history(gas_csv)))
+
+def open_rollups(electricity_csv, gas_csv):
+    """Baut fehlende Zählerarten aus den vorhandenen Daten auf."""
+    add_pulses(electricity_csv, [])
+    add_gas(gas_csv, [], [])
+
+def rebuild(electricity_csv, gas_csv):
+    """Baut alle Summen neu auf (z.B. nach geänderten Preisen)."""
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM rollup_info")
+    finally:
+        conn.close()
+    open_rollups(electricity_csv, gas_csv)
+
+def query(meter, grain, start=None, end=None):
+    """
+    Summen eines Zählers, nach Zeitraum sortiert.
+
+    Args:
+        meter: 'electricity' oder 'gas'
+        grain: 'hour', 'day', 'week' oder 'month'
+        start, end: Bezeichnungen der Zeiträume (z.B. '2025-01-01'), end ist eingeschlossen
+
+    Returns:
+        Liste von Dicts mit period, kwh, cost, pulses, reading_min, reading_max
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"Unbekannter Zeitraum: {grain}")
+    sql = "SELECT period, kwh, cost, pulses, reading_min, reading_max FROM rollups WHERE meter = ? AND grain = ?"
+    params = [meter, grain]
+    if start is not None:
+        sql += " AND period >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND period <= ?"
+        params.append(end)
+    conn = _connect()
+    try:
+        rows = conn.execute(sql + " ORDER BY period", params).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(['period', 'kwh', 'cost', 'pulses', 'reading_min', 'reading_max'], row)) for row in rows]
+
+def totals(meter):
+    """
+    Summen eines Zählers über alle Zeiträume (aus den Monatssummen).
+
+    Returns:
+        Dict mit kwh, cost und pulses
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT COALESCE(sum(kwh), 0), COALESCE(sum(cost), 0), COALESCE(sum(pulses), 0) "
+                           "FROM rollups WHERE meter = ? AND grain = 'month'", (meter,)).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(['kwh', 'cost', 'pulses'], row))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Verbrauchssummen pro Stunde, Tag, Woche und Monat anzeigen oder neu aufbauen')
+    parser.add_argument('command', choices=['show', 'rebuild'])
+    parser.add_argument('--meter', choices=['electricity', 'gas'], default='electricity')
+    parser.add_argument('--grain', choices=GRAINS, default='day')
+    parser.add_argument('--electricity-csv', type=str,
+                        default=os.path.join(os.path.dirname(__file__), 'electricity_data.csv'))
+    parser.add_argument('--gas-csv', type=str, default=os.path.join(os.path.dirname(__file__), 'gas_data.csv'))
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        rebuild(args.electricity_csv, args.gas_csv)
+    else:
+        open_rollups(args.electricity_csv, args.gas_csv)
+        for row in query(args.meter, args.grain):
+            reading = ''
+            if row['reading_min'] is not None:
+                reading = f"  Stand {row['reading_min']:.2f} - {row['reading_max']:.2f}"
+            print(f"{row['period']:<16} {row['kwh']:10.3f} kWh {row['cost']:9.2f} € {row['pulses']:7d} Impulse{reading}")
@@ -1,10 +1,7 @@
 from flask import Flask, request, jsonify
 import os
-import csv
 from datetime import datetime
 import argparse
-import sys
-import subprocess
 import time
 import threading
 from dotenv import load_dotenv
@@ -12,21 +9,11 @@ from dotenv import load_dotenv
 # Lade Umgebungsvariablen aus .env-Datei
 load_dotenv()
 
-# Importiere image_evaluator direkt, da wir jetzt im selben Verzeichnis sind
-try:
-    from image_evaluator import evaluate_image
-except ImportError:
-    print("Warnung: image_evaluator konnte nicht importiert werden. Stelle sicher, dass image_evaluator.py im selben Verzeichnis liegt.")
-    # Definiere eine Dummy-Funktion für den Fall, dass das Modul nicht importiert werden kann
-    def evaluate_image(image_path, csv_path):
-        print(f"Hinweis: Bildauswertung nicht verfügbar. Bild {image_path} wurde nicht ausgewertet.")
-        return None
-
-# Importiere den Electricity Evaluator für die Stromverbrauchsberechnung
-try:
-    import electricity_evaluator
-except ImportError:
-    print("Warnung: electricity_evaluator konnte nicht importiert werden. Stelle sicher, dass electricity_evaluator.py im selben Verzeichnis liegt.")
+import ocr_jobs
+import readings_store
+import pulse_log
+import rollups
+import archive
 
 app = Flask(__name__)
 
@@ -50,31 +37,17 @@ if not os.path.exists(DATA_DIR):
 ELECTRICITY_CSV = os.getenv("ELECTRICITY_CSV", os.path.join(os.path.dirname(__file__), "electricity_data.csv"))
 ELECTRICITY_METRICS_CSV = os.getenv("ELECTRICITY_METRICS_CSV", os.path.join(DATA_DIR, "stromzaehler_log.csv"))
 
-# CSV-Header erstellen, falls die Datei noch nicht existiert
-if not os.path.exists(SENSOR_CSV):
-    with open(SENSOR_CSV, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['Timestamp', 'Temperature', 'Humidity', 'ImageFile', 'Number'])
-# Prüfen, ob die Number-Spalte in der CSV existiert, falls die CSV bereits vorhanden ist
-else:
-    try:
-        with open(SENSOR_CSV, 'r', newline='') as csvfile:
-            reader = csv.reader(csvfile)
-            header = next(reader, None)
-            if header and 'Number' not in header:
-                # Füge Number-Spalte hinzu
-                header.append('Number')
-                rows = list(reader)
-                with open(SENSOR_CSV, 'w', newline='') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(header)
-                    for row in rows:
-                        # Füge leeren Wert für Number hinzu
-                        if len(row) < len(header):
-                            row.append('')
-                        writer.writerow(row)
-    except Exception as e:
-        print(f"Warnung: Fehler beim Überprüfen/Aktualisieren des CSV-Headers: {e}")
+def oeffne_datenspeicher():
+    """
+    Öffnet die Datenspeicher beim Start des Servers (nicht beim Import, den z.B. die
+    Worker-Prozesse der OCR als __mp_main__ erneut ausführen).
+    """
+    # Zählerstands-Datenbank neben der Sensor-CSV anlegen; eine vorhandene CSV wird dabei einmalig übernommen
+    readings_store.open_store(SENSOR_CSV)
+    # Ebenso das Impulsprotokoll des Stromzählers neben der Umdrehungs-CSV
+    pulse_log.open_log(ELECTRICITY_CSV)
+    # Verbrauchssummen pro Stunde/Tag/Woche/Monat beim ersten Start aus den vorhandenen Daten aufbauen
+    rollups.open_rollups(ELECTRICITY_CSV, SENSOR_CSV)
 
 def bereinige_alte_dateien():
     """Löscht Dateien, die älter als 240 Stunden sind, aus camera_images und cache."""
@@ -86,10 +59,11 @@ def bereinige_alte_dateien():
     for verzeichnis in verzeichnisse:
         if not os.path.exists(verzeichnis):
             continue
-            
-        for dateiname in os.listdir(verzeichnis):
-            dateipfad = os.path.join(verzeichnis, dateiname)
-            if os.path.isfile(dateipfad):
+        
+        # Auch Unterordner durchsuchen (z.B. cache/debug/<bildname>/)
+        for ordner, _, dateinamen in os.walk(verzeichnis, topdown=False):
+            for dateiname in dateinamen:
+                dateipfad = os.path.join(ordner, dateiname)
                 datei_aenderungszeit = os.path.getmtime(dateipfad)
                 alter = aktuelle_zeit - datei_aenderungszeit
                 
@@ -99,25 +73,54 @@ def bereinige_alte_dateien():
                         geloescht_gesamt += 1
                     except Exception as e:
                         print(f"Fehler beim Löschen von {dateipfad}: {e}")
+            
+            # Leere Unterordner entfernen
+            if ordner != verzeichnis and not os.listdir(ordner):
+                try:
+                    os.rmdir(ordner)
+                except OSError:
+                    pass
     
     if geloescht_gesamt > 0:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Bereinigung: {geloescht_gesamt} alte Dateien gelöscht")
     
+    # Abgeschlossene OCR-Jobs ebenfalls nach 240 Stunden vergessen
+    try:
+        ocr_jobs.purge_finished(max_alter_sekunden)
+    except Exception as e:
+        print(f"Fehler beim Bereinigen der OCR-Warteschlange: {e}")
+    
+    # Monatsweises Parquet-Archiv fortschreiben (nur mit installiertem pyarrow)
+    if archive.is_available():
+        try:
+            archive.sync(ELECTRICITY_CSV, SENSOR_CSV)
+        except Exception as e:
+            print(f"Fehler beim Schreiben des Archivs: {e}")
+    
     # Planen der nächsten Bereinigung in 1 Stunde
     threading.Timer(3600, bereinige_alte_dateien).start()
 
+def stromverbrauch_metriken():
+    """
+    Anzahl der Umdrehungen, Verbrauch und Kosten aller gespeicherten Impulse. Die Werte stammen
+    aus den Verbrauchssummen, die bei jedem Upload aus dem Impulsprotokoll fortgeschrieben werden.
+    """
+    totals = rollups.totals('electricity')
+    return {
+        'rotation_count': totals['pulses'],
+        'kwh_consumed': totals['kwh'],
+        'total_cost_euro': totals['cost']
+    }
+
 def aktualisiere_stromverbrauchsdaten():
     """
     Aktualisiert die Stromverbrauchsdaten, indem die Metriken neu berechnet werden.
     Diese Funktion wird nach dem Empfang neuer Daten aufgerufen.
     """
     try:
-        if 'electricity_evaluator' in sys.modules:
-            metrics = electricity_evaluator.get_latest_metrics(ELECTRICITY_CSV)
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Stromverbrauchsdaten aktualisiert")
-            print(f"Anzahl Umdrehungen: {metrics['rotation_count']}, Verbrauch: {metrics['kwh_consumed']:.4f} kWh, Kosten: {metrics['total_cost_euro']:.3f} €")
-        else:
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Electricity Evaluator ist nicht verfügbar.")
+        metrics = stromverbrauch_metriken()
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Stromverbrauchsdaten aktualisiert")
+        print(f"Anzahl Umdrehungen: {metrics['rotation_count']}, Verbrauch: {metrics['kwh_consumed']:.4f} kWh, Kosten: {metrics['total_cost_euro']:.3f} €")
     except Exception as e:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Fehler bei der Aktualisierung der Stromverbrauchsdaten: {e}")
 
@@ -137,57 +140,31 @@ def upload():
     with open(filename, "w") as f:
         f.write(data)
     
-    # CSV-Daten verarbeiten
-    csv_lines = data.strip().split('\n')
-    
-    # Filtere Header-Zeilen heraus für die Zählung der Datenpunkte
-    valid_data_points = [line for line in csv_lines if line.strip() and line.strip().isdigit()]
+    # Den ganzen Upload auf einmal einlesen: gültige Zeitstempel, aufsteigend sortiert
+    # (nach einem Ausfall des ESP kann ein Upload tausende Zeilen enthalten)
+    pulses, invalid = pulse_log.parse_batch(data)
     
     # Log-Ausgabe
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Daten empfangen und in {filename} gespeichert")
-    print(f"Anzahl der Datenpunkte: {len(valid_data_points)}")
+    print(f"Anzahl der Datenpunkte: {len(pulses)}" + (f" ({invalid} ungültige Zeitstempel übergangen)" if invalid else ""))
     
-    # Daten auch in electricity_data.csv schreiben und Metriken berechnen
-    for line in csv_lines:
-        line = line.strip()
-        if line and line.isdigit() and not line.startswith('timestamp'):  # Nur numerische Timestamps
-            # Timestamp in das electricity_evaluator-Modul einspeiisen
-            if 'electricity_evaluator' in sys.modules:
-                try:
-                    # Füge den Eintrag hinzu und berechne die Metriken
-                    results = electricity_evaluator.add_electricity_data_entry(ELECTRICITY_CSV, int(line))
-                    print(f"Neuer Stromzähler-Eintrag verarbeitet: {results['time']}")
-                except Exception as e:
-                    print(f"Fehler bei der Verarbeitung des Stromzähler-Eintrags: {e}")
-                    
-                    # Fallback: Schreibe die Daten direkt in die CSV, wie zuvor
-                    electricity_data_file = ELECTRICITY_CSV
-                    if os.path.exists(electricity_data_file):
-                        with open(electricity_data_file, 'a') as tf:
-                            time_str = datetime.fromtimestamp(int(line)).strftime('%Y-%m-%d %H:%M:%S')
-                            tf.write(f"{line},{time_str}\n")
-                    else:
-                        # Neue Datei erstellen mit Header
-                        with open(electricity_data_file, 'w') as tf:
-                            tf.write("timestamp,time\n")
-                            time_str = datetime.fromtimestamp(int(line)).strftime('%Y-%m-%d %H:%M:%S')
-                            tf.write(f"{line},{time_str}\n")
-            else:
-                # Fallback: Schreibe die Daten direkt in die CSV, wie zuvor
-                electricity_data_file = ELECTRICITY_CSV
-                if os.path.exists(electricity_data_file):
-                    with open(electricity_data_file, 'a') as tf:
-                        time_str = datetime.fromtimestamp(int(line)).strftime('%Y-%m-%d %H:%M:%S')
-                        tf.write(f"{line},{time_str}\n")
-                else:
-                    # Neue Datei erstellen mit Header
-                    with open(electricity_data_file, 'w') as tf:
-                        tf.write("timestamp,time\n")
-                        time_str = datetime.fromtimestamp(int(line)).strftime('%Y-%m-%d %H:%M:%S')
-                        tf.write(f"{line},{time_str}\n")
+    # Alle Impulse mit einem Schreibvorgang und einem fsync an das Impulsprotokoll anhängen
+    # (electricity_data.pulses neben ELECTRICITY_CSV)
+    if len(pulses):
+        try:
+            appended, merged = pulse_log.append(ELECTRICITY_CSV, pulses)
+            skipped = len(pulses) - len(appended)
+            print(f"{len(appended)} Impulse im Impulsprotokoll gespeichert"
+                  + (f", davon {merged} ältere einsortiert" if merged else "")
+                  + (f" ({skipped} bereits gespeicherte übergangen)" if skipped else ""))
+            # Nur die tatsächlich gespeicherten Impulse in die Verbrauchssummen einrechnen, damit ein
+            # erneut gesendeter Upload nicht doppelt zählt
+            rollups.add_pulses(ELECTRICITY_CSV, appended)
+        except Exception as e:
+            print(f"Fehler beim Speichern der Impulse: {e}")
     
-    # Nach dem Hinzufügen aller Daten die Metriken aktualisieren
-    if valid_data_points and 'electricity_evaluator' in sys.modules:
+    # Nach dem Hinzufügen aller Daten die Metriken einmal pro Upload aktualisieren
+    if len(pulses):
         aktualisiere_stromverbrauchsdaten()
     
     return "OK", 200
@@ -205,10 +182,6 @@ def receive_image():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{UPLOAD_FOLDER}/cam_{timestamp}.jpg"
     
-    # Bild speichern
-    with open(filename, 'wb') as f:
-        f.write(img_data)
-    
     # Sensor-Daten aus dem Header extrahieren
     temperature = request.headers.get('X-Temperature', 'N/A')
     humidity = request.headers.get('X-Humidity', 'N/A')
@@ -216,57 +189,44 @@ def receive_image():
     # Aktueller Zeitstempel im Format für die CSV-Datei
     csv_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    # Speichere zunächst die Sensordaten in CSV ohne OCR-Nummer
-    with open(SENSOR_CSV, 'a', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow([
-            csv_timestamp,
-            temperature,
-            humidity,
-            filename,
-            ""  # Leere Spalte für Number, wird später durch Bildauswertung gefüllt
-        ])
+    # Speichere zunächst die Sensordaten ohne OCR-Nummer, die Bildauswertung trägt sie später ein
+    readings_store.add_reading(SENSOR_CSV, csv_timestamp, temperature, humidity, filename)
     
-    print(f"Bild empfangen und gespeichert: {filename}")
+    print(f"Bild empfangen: {filename}")
     print(f"Bildgröße: {len(img_data)} Bytes")
     print(f"Temperatur: {temperature} °C, Luftfeuchtigkeit: {humidity} %")
     
-    # Bildauswertung asynchron starten (nur informativ ausgeben)
-    print("Starte Bildauswertung...")
-    
-    try:
-        # Versuche die Bildauswertung direkt als Funktion aufzurufen
-        abs_image_path = os.path.abspath(filename)
-        abs_csv_path = os.path.abspath(SENSOR_CSV)
-        
-        # Führe die Bildauswertung aus
-        number = evaluate_image(abs_image_path, abs_csv_path)
-        
-        if number:
-            print(f"Bildauswertung abgeschlossen. Erkannte Nummer: {number}")
-        else:
-            print("Bildauswertung ohne erkannte Nummer abgeschlossen.")
-            
-            # Alternative: Starte die Bildauswertung als Prozess (nur wenn der direkte Import fehlgeschlagen ist)
-            if 'evaluate_image' not in globals() or globals()['evaluate_image'].__module__ != 'image_evaluator':
-                try:
-                    # Führe das Skript in einem separaten Prozess aus
-                    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'image_evaluator.py')
-                    subprocess.Popen([sys.executable, script_path, '--image', abs_image_path, '--csv', abs_csv_path],
-                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    print(f"Bildauswertung als separater Prozess gestartet.")
-                except Exception as e:
-                    print(f"Fehler beim Starten der Bildauswertung als Prozess: {e}")
-    except Exception as e:
-        print(f"Fehler bei der Bildauswertung: {e}")
+    # Bildauswertung als Hintergrund-Job einreihen, die ESP32-CAM wartet nicht auf die OCR
+    # (der Job liegt in einer SQLite-Warteschlange und übersteht einen Neustart des Servers).
+    # Die OCR dekodiert das Bild direkt aus dem Speicher, gespeichert wird es im Hintergrund.
+    # Der Worker-Pool wird nur beim Start des Servers gestartet, nie aus einer Anfrage heraus.
+    job_id = ocr_jobs.enqueue(os.path.abspath(filename), os.path.abspath(SENSOR_CSV), image_data=img_data)
+    print(f"Bildauswertung eingereiht (Job {job_id})")
     
     return jsonify({
-        'status': 'success',
-        'message': 'Bild und Sensordaten erfolgreich empfangen',
+        'status': 'accepted',
+        'message': 'Bild und Sensordaten erfolgreich empfangen, Bildauswertung eingereiht',
+        'job_id': job_id,
+        'job_url': f"/api/camera/jobs/{job_id}",
         'filename': filename,
         'temperature': temperature,
         'humidity': humidity
-    })
+    }), 202
+
+@app.route('/api/camera/jobs/<job_id>', methods=['GET'])
+def get_camera_job(job_id):
+    """
+    API-Endpunkt zum Abfragen des Status eines OCR-Jobs (queued, running, done, failed)
+    """
+    job = ocr_jobs.get_job(job_id)
+    
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unbekannter Job: {job_id}'
+        }), 404
+    
+    return jsonify(job)
 
 @app.route('/api/electricity/metrics', methods=['GET'])
 def get_electricity_metrics():
@@ -274,35 +234,58 @@ def get_electricity_metrics():
     API-Endpunkt zum Abrufen der aktuellen Stromverbrauchsmetriken
     """
     try:
-        if 'electricity_evaluator' in sys.modules:
-            metrics = electricity_evaluator.get_latest_metrics(ELECTRICITY_CSV)
-            return jsonify({
-                'status': 'success',
-                'rotation_count': metrics['rotation_count'],
-                'kwh_consumed': round(metrics['kwh_consumed'], 4),
-                'total_cost_euro': round(metrics['total_cost_euro'], 3),
-                'last_update': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'Electricity Evaluator ist nicht verfügbar'
-            }), 500
+        metrics = stromverbrauch_metriken()
+        return jsonify({
+            'status': 'success',
+            'rotation_count': metrics['rotation_count'],
+            'kwh_consumed': round(metrics['kwh_consumed'], 4),
+            'total_cost_euro': round(metrics['total_cost_euro'], 3),
+            'last_update': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': f'Fehler beim Abrufen der Stromverbrauchsmetriken: {str(e)}'
         }), 500
 
+@app.route('/api/rollups/<meter>/<grain>', methods=['GET'])
+def get_rollups(meter, grain):
+    """
+    API-Endpunkt für die Verbrauchssummen eines Zählers (electricity oder gas) pro hour, day, week
+    oder month; optional eingeschränkt mit ?start=...&end=... (Bezeichnungen der Zeiträume)
+    """
+    if meter not in ('electricity', 'gas') or grain not in rollups.GRAINS:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unbekannter Zähler oder Zeitraum: {meter}/{grain}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'meter': meter,
+        'grain': grain,
+        'rows': rollups.query(meter, grain, request.args.get('start'), request.args.get('end'))
+    })
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Startet den Server für die Gaszähler-Auswertung")
     parser.add_argument('--port', type=int, default=int(os.getenv("SERVER_PORT", "5000")),
                         help='Port, auf dem der Server lauschen soll (Standard: 5000)')
     args = parser.parse_args()
+    debug = os.getenv("SERVER_DEBUG", "True").lower() == "true"
+
+    # Im Debug-Modus führt der Reloader von Werkzeug diesen Block zweimal aus: im überwachenden
+    # Prozess und im Prozess, der die Anfragen bedient (WERKZEUG_RUN_MAIN=true). Datenspeicher,
+    # Bereinigungs-Timer und OCR-Worker-Pool gehören nur in den bedienenden Prozess.
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        oeffne_datenspeicher()
+
+        # Starte den Bereinigungs-Timer
+        bereinige_alte_dateien()
 
-    # Starte den Bereinigungs-Timer
-    bereinige_alte_dateien()
+        # OCR-Worker-Pool starten; die Worker laden ihre Modelle sofort und arbeiten liegengebliebene Jobs ab
+        ocr_jobs.start()
 
     # Server starten
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Server wird gestartet auf http://0.0.0.0:{args.port}")
-    app.run(host='0.0.0.0', port=args.port, debug=bool(os.getenv("SERVER_DEBUG", "True").lower() == "true")) 
\ No newline at end of file
+    app.run(host='0.0.0.0', port=args.port, debug=debug) 
\ No newline at end of file
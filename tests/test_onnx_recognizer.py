@@ -0,0 +1,124 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import onnx_recognizer
+
+IMG_H = 64
+CHARACTERS = '0123456789ab'
+META = {'characters': CHARACTERS, 'img_h': IMG_H}
+
+
+def _logits(text, prob, classes):
+    """Logits für eine Zeile: Leerzeichen und die Zeichen von text abwechselnd, jedes mit Wahrscheinlichkeit prob."""
+    steps = [0]
+    for char in text:
+        steps += [CHARACTERS.index(char) + 1, 0]
+    rows = np.full((len(steps), classes), (1.0 - prob) / (classes - 1))
+    rows[np.arange(len(steps)), steps] = prob
+    return np.log(rows)
+
+
+class _Input:
+    name = 'image'
+
+
+class FakeSession:
+    """Ersatz für onnxruntime.InferenceSession: gibt pro Aufruf die geplanten (text, wahrscheinlichkeit) zurück."""
+
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.inputs = []
+
+    def get_inputs(self):
+        return [_Input()]
+
+    def run(self, output_names, feed):
+        batch = feed['image']
+        self.inputs.append(batch)
+        planned = self.outputs.pop(0)
+        assert len(planned) == len(batch)
+        rows = [_logits(text, prob, len(CHARACTERS) + 1) for text, prob in planned]
+        steps = max(len(row) for row in rows)
+        # Kürzere Zeilen mit sicheren Leerzeichen auffüllen
+        blank = np.log(np.full(len(CHARACTERS) + 1, 1e-9))
+        blank[0] = 0.0
+        return [np.stack([np.vstack([row] + [blank] * (steps - len(row))) for row in rows]).astype(np.float32)]
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(outputs):
+        fake = FakeSession(outputs)
+        monkeypatch.setattr(onnx_recognizer, '_get_session', lambda: (fake, META))
+        return fake
+    return install
+
+
+def _digit_crop(height, width, seed):
+    return np.random.default_rng(seed).integers(0, 256, (height, width), dtype=np.uint8)
+
+
+def test_batch_is_grouped_by_width_and_decoded_in_input_order(session):
+    fake = session([[('12', 0.99), ('7', 0.99)], [('345', 0.99)]])
+    images = [_digit_crop(110, 80, 0), _digit_crop(30, 200, 1), _digit_crop(110, 80, 2)]
+
+    results = onnx_recognizer.recognize_batch(images, '0123456789')
+
+    assert [text for text, _ in results] == ['12', '345', '7']
+    assert all(conf > 90 for _, conf in results)
+    # Hohe Ziffern: Breite 2 * IMG_H, der breite Ausschnitt: ceil(200 / 30) * IMG_H
+    assert [batch.shape for batch in fake.inputs] == [(2, 1, IMG_H, 2 * IMG_H), (1, 1, IMG_H, 7 * IMG_H)]
+    for batch in fake.inputs:
+        assert batch.dtype == np.float32
+        assert batch.min() >= -1.0 and batch.max() <= 1.0
+
+
+def test_characters_outside_the_allowlist_are_ignored():
+    classes = len(CHARACTERS) + 1
+    preds = np.log(np.full((1, 3, classes), 0.01))
+    preds[0, 1, CHARACTERS.index('a') + 1] = np.log(0.8)
+    preds[0, 1, CHARACTERS.index('5') + 1] = np.log(0.15)
+    preds[0, [0, 2], 0] = np.log(0.9)
+    ignore_idx = [CHARACTERS.index(char) + 1 for char in 'ab']
+
+    assert onnx_recognizer._decode(preds, CHARACTERS, ignore_idx)[0][0] == '5'
+    assert onnx_recognizer._decode(preds, CHARACTERS, [])[0][0] == 'a'
+
+
+def test_repeated_characters_are_collapsed_unless_separated_by_blank():
+    classes = len(CHARACTERS) + 1
+    steps = [2, 2, 0, 2, 3, 3]  # "1", "1", Leer, "1", "2", "2" -> "112"
+    preds = np.log(np.full((1, len(steps), classes), 0.01))
+    preds[0, np.arange(len(steps)), steps] = np.log(0.9)
+
+    text, conf = onnx_recognizer._decode(preds, CHARACTERS, [])[0]
+
+    assert text == '112'
+    assert 0.0 < conf <= 1.0
+
+
+def test_unsure_results_are_retried_with_more_contrast(session):
+    fake = session([[('8', 0.05)], [('8', 0.99)]])
+
+    results = onnx_recognizer.recognize_batch([_digit_crop(110, 80, 3)], '0123456789')
+
+    assert len(fake.inputs) == 2
+    assert results[0][0] == '8' and results[0][1] > 90
+
+
+def test_input_matches_easyocr_align_collate():
+    pytest.importorskip('torch')
+    recognition = pytest.importorskip('easyocr.recognition')
+    from PIL import Image
+
+    for height, width in [(110, 80), (30, 200), (64, 64)]:
+        resized, max_width = onnx_recognizer._resize(_digit_crop(height, width, 4), IMG_H)
+        expected = recognition.AlignCollate(imgH=IMG_H, imgW=max_width, keep_ratio_with_pad=True)(
+            [Image.fromarray(resized, 'L')]).numpy()[0]
+        actual = onnx_recognizer._to_input(resized, IMG_H, max_width)
+        assert actual.shape == expected.shape
+        assert np.abs(actual - expected).max() < 1e-5
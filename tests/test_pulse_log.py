@@ -0,0 +1,85 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import pulse_log
+
+BASE = 1700000000
+NOW = BASE + 86400
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    return str(tmp_path / 'electricity_data.csv')
+
+
+def _stored(csv_path):
+    return [int(value) - BASE for value in pulse_log.read_all(csv_path)]
+
+
+def _append(csv_path, offsets):
+    stored, merged = pulse_log.append(csv_path, [BASE + offset for offset in offsets])
+    return [int(value) - BASE for value in stored], merged
+
+
+def test_parse_batch_skips_headers_and_counts_invalid_numbers():
+    text = "\n".join(["timestamp", str(BASE + 20), str(BASE + 10), "123", str(NOW + 2 * 86400),
+                      "9" * 25, "abc", "²", ""])
+    values, invalid = pulse_log.parse_batch(text, now=NOW)
+    assert values.dtype == pulse_log.RECORD_DTYPE
+    assert [int(value) - BASE for value in values] == [10, 20]
+    # Vor 2020, mehr als einen Tag in der Zukunft und zu lang für int64
+    assert invalid == 3
+
+
+def test_append_sorts_batch(csv_path):
+    assert _append(csv_path, [30, 10, 20]) == ([10, 20, 30], 0)
+    assert _stored(csv_path) == [10, 20, 30]
+
+
+def test_resent_batch_is_skipped(csv_path):
+    _append(csv_path, [10, 20, 20, 30])
+    assert _append(csv_path, [10, 20, 20, 30]) == ([], 0)
+    assert _stored(csv_path) == [10, 20, 20, 30]
+
+
+def test_same_second_pulses_across_the_last_pulse_are_kept(csv_path):
+    _append(csv_path, [10, 20])
+    # Ein Impuls in Sekunde 20 ist schon gespeichert, der zweite ist neu; ebenso beide in Sekunde 30
+    assert _append(csv_path, [20, 20, 30, 30]) == ([20, 30, 30], 0)
+    assert _stored(csv_path) == [10, 20, 20, 30, 30]
+
+
+def test_late_pulses_are_sorted_into_the_log(csv_path):
+    _append(csv_path, [10, 20, 30])
+    assert _append(csv_path, [5, 10, 15, 40]) == ([5, 15, 40], 2)
+    assert _stored(csv_path) == [5, 10, 15, 20, 30, 40]
+    assert _append(csv_path, [5, 15]) == ([], 0)
+
+
+def test_cached_last_pulse_follows_a_replaced_log(csv_path):
+    _append(csv_path, [10, 20, 30])
+    # Ein anderer Prozess ersetzt das Protokoll (z.B. "pulse_log.py convert")
+    pulse_log._write_log(pulse_log.log_path(csv_path), [BASE + 1, BASE + 2])
+    assert _append(csv_path, [2, 3]) == ([3], 0)
+    assert _stored(csv_path) == [1, 2, 3]
+
+
+def test_partial_record_is_truncated(csv_path):
+    _append(csv_path, [10, 20])
+    pulse_log._last.clear()
+    with open(pulse_log.log_path(csv_path), 'ab') as f:
+        f.write(b'\x01\x02\x03')
+    assert _append(csv_path, [30]) == ([30], 0)
+    assert _stored(csv_path) == [10, 20, 30]
+
+
+def test_time_range_and_hourly_counts(csv_path):
+    hour = 3600 - BASE % 3600
+    _append(csv_path, [hour + 1, hour + 2, hour + 3600, hour + 7200 + 5])
+    assert len(pulse_log.time_range(csv_path, BASE + hour, BASE + hour + 3600)) == 2
+    assert [count for _, count in pulse_log.hourly_counts(csv_path)] == [2, 1, 1]
+    assert np.asarray(pulse_log.time_range(csv_path)).tolist() == list(pulse_log.read_all(csv_path))
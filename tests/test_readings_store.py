@@ -0,0 +1,78 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import readings_store
+import rollups
+from gas_data_evaluator import BRENNWERT, ZUSTANDSZAHL
+
+TIMESTAMPS = ['2025-03-01 10:00:00', '2025-03-01 11:00:00', '2025-03-01 12:00:00']
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(rollups, 'ROLLUP_DB', str(tmp_path / 'rollups.sqlite3'))
+    monkeypatch.setattr(rollups, '_initialized', False)
+    path = str(tmp_path / 'gas_data.csv')
+    for timestamp in TIMESTAMPS:
+        readings_store.add_reading(path, timestamp, '20.5', '40', f'cam_{timestamp[11:13]}.jpg')
+    return path
+
+
+def _consumption(csv_path):
+    return readings_store.load_frame(csv_path)['Verbrauch'].tolist()
+
+
+def _gas_m3(period):
+    row = {row['period']: row for row in rollups.query('gas', 'hour')}[period]
+    return row['kwh'] / (ZUSTANDSZAHL * BRENNWERT)
+
+
+def test_unknown_timestamp_is_reported(csv_path):
+    assert readings_store.set_number(csv_path, '2025-03-01 09:00:00', '99,9') == (False, None)
+
+
+def test_correcting_a_middle_reading_updates_the_following_row(csv_path):
+    for timestamp, number in zip(TIMESTAMPS, ['100,0', '100,5', '101,0']):
+        readings_store.set_number(csv_path, timestamp, number)
+    assert _consumption(csv_path)[1:] == [500.0, 500.0]
+
+    assert readings_store.set_number(csv_path, TIMESTAMPS[1], '100,2') == (True, 200.0)
+    assert _consumption(csv_path)[1:] == [200.0, 800.0]
+    frame = readings_store.load_frame(csv_path)
+    assert frame['Number'].tolist() == ['100.0', '100.2', '101.0']
+    # Die Verbrauchssummen folgen der Korrektur beider Stände
+    assert _gas_m3('2025-03-01 11:00') == pytest.approx(0.2)
+    assert _gas_m3('2025-03-01 12:00') == pytest.approx(0.8)
+
+
+def test_readings_finished_out_of_order(csv_path):
+    readings_store.set_number(csv_path, TIMESTAMPS[2], '101,0')
+    readings_store.set_number(csv_path, TIMESTAMPS[0], '100,0')
+    readings_store.set_number(csv_path, TIMESTAMPS[1], '100,5')
+    assert _consumption(csv_path)[1:] == [500.0, 500.0]
+    assert _gas_m3('2025-03-01 11:00') == pytest.approx(0.5)
+    assert _gas_m3('2025-03-01 12:00') == pytest.approx(0.5)
+
+
+def test_rejected_reason_is_cleared_by_a_reading(csv_path):
+    assert readings_store.set_rejected(csv_path, TIMESTAMPS[0], 'zu dunkel')
+    assert readings_store.load_frame(csv_path)['Verworfen'].tolist()[0] == 'zu dunkel'
+    readings_store.set_number(csv_path, TIMESTAMPS[0], '100,0')
+    assert readings_store.load_frame(csv_path)['Verworfen'].tolist()[0] is None
+
+
+def test_previous_value_skips_outliers(csv_path):
+    for timestamp, number in zip(TIMESTAMPS, ['100,0', '900,0', '101,0']):
+        readings_store.set_number(csv_path, timestamp, number)
+    assert readings_store.previous_value(csv_path, '2025-03-01 13:00:00') == (TIMESTAMPS[2], 101.0)
+    # Der Ausreißer 900 ist größer als der folgende Stand 101
+    assert readings_store.previous_value(csv_path, TIMESTAMPS[2]) == (TIMESTAMPS[0], 100.0)
+
+
+def test_load_frame_range(csv_path):
+    frame = readings_store.load_frame(csv_path, TIMESTAMPS[1], TIMESTAMPS[2])
+    assert frame['Timestamp'].tolist() == [TIMESTAMPS[1]]
+    assert readings_store.time_span(csv_path) == (TIMESTAMPS[0], TIMESTAMPS[2])
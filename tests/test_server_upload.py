@@ -0,0 +1,46 @@
+import importlib
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+pytest.importorskip('flask')
+
+import pulse_log
+import rollups
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('UPLOAD_FOLDER', str(tmp_path / 'camera_images'))
+    server = importlib.import_module('server')
+    monkeypatch.setattr(server, 'DATA_DIR', str(tmp_path / 'data'))
+    monkeypatch.setattr(server, 'ELECTRICITY_CSV', str(tmp_path / 'electricity_data.csv'))
+    monkeypatch.setattr(rollups, 'ROLLUP_DB', str(tmp_path / 'rollups.sqlite3'))
+    monkeypatch.setattr(rollups, '_initialized', False)
+    return server.app.test_client()
+
+
+def _metrics(client):
+    return client.get('/api/electricity/metrics').get_json()
+
+
+def test_retried_upload_is_counted_once(client, tmp_path):
+    now = int(time.time())
+    body = "timestamp\n" + "\n".join(str(now - 3600 + i * 30) for i in range(100)) + "\n"
+    assert client.post('/upload', data=body).status_code == 200
+    assert client.post('/upload', data=body).status_code == 200
+
+    assert len(pulse_log.read_all(str(tmp_path / 'electricity_data.csv'))) == 100
+    assert _metrics(client)['rotation_count'] == 100
+    assert sum(row['pulses'] for row in rollups.query('electricity', 'hour')) == 100
+
+
+def test_late_pulses_and_invalid_lines(client):
+    now = int(time.time())
+    client.post('/upload', data=f"{now - 60}\n{now - 30}\n")
+    response = client.post('/upload', data=f"{now - 7200}\n{'9' * 30}\nabc\n123\n")
+    assert response.status_code == 200
+    assert _metrics(client)['rotation_count'] == 3